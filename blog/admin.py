@@ -1,5 +1,13 @@
+from collections import defaultdict
+
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
 from django.utils.html import format_html
+from . import rollups
+from .cache import bump_generation
+from .counters import rebuild_counters
 from .models import Category, Tag, UserProfile, Post, Comment
 
 
@@ -12,9 +20,16 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at']
 
+    def get_queryset(self, request):
+        # Count in the changelist query instead of once per row
+        return super().get_queryset(request).annotate(
+            post_total=Count('post', distinct=True)
+        )
+
     def post_count(self, obj):
-        return obj.post_set.count()
+        return obj.post_total
     post_count.short_description = 'Posts'
+    post_count.admin_order_field = 'post_total'
 
 
 @admin.register(Tag)
@@ -26,9 +41,16 @@ class TagAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at']
 
+    def get_queryset(self, request):
+        # Count in the changelist query instead of once per row
+        return super().get_queryset(request).annotate(
+            post_total=Count('post', distinct=True)
+        )
+
     def post_count(self, obj):
-        return obj.post_set.count()
+        return obj.post_total
     post_count.short_description = 'Posts'
+    post_count.admin_order_field = 'post_total'
 
 
 @admin.register(UserProfile)
@@ -65,13 +87,15 @@ class PostAdmin(admin.ModelAdmin):
         'title', 'author', 'status', 'category', 'published_at',
         'view_count', 'featured', 'comment_count'
     ]
+    list_select_related = ['author', 'category']
     list_filter = [
         'status', 'featured', 'category', 'created_at', 'published_at'
     ]
     search_fields = ['title', 'content', 'author__username']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = [
-        'created_at', 'updated_at', 'view_count', 'get_reading_time'
+        'created_at', 'updated_at', 'view_count', 'comment_count',
+        'word_count', 'reading_time'
     ]
     date_hierarchy = 'published_at'
     filter_horizontal = ['tags']
@@ -93,16 +117,13 @@ class PostAdmin(admin.ModelAdmin):
         ('Timestamps & Stats', {
             'fields': (
                 'created_at', 'updated_at', 'published_at',
-                'view_count', 'get_reading_time'
+                'view_count', 'comment_count', 'word_count',
+                'reading_time'
             ),
             'classes': ('collapse',)
         }),
     )
 
-    def comment_count(self, obj):
-        return obj.get_comment_count()
-    comment_count.short_description = 'Comments'
-
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new post
             obj.author = request.user
@@ -113,6 +134,7 @@ class PostAdmin(admin.ModelAdmin):
 class CommentAdmin(admin.ModelAdmin):
     """Admin interface for Comment model"""
     list_display = ['post', 'author', 'active', 'created_at', 'is_reply_to']
+    list_select_related = ['post', 'author', 'parent__author']
     list_filter = ['active', 'created_at', 'post']
     search_fields = ['content', 'author__username', 'post__title']
     readonly_fields = ['created_at', 'updated_at']
@@ -136,15 +158,38 @@ class CommentAdmin(admin.ModelAdmin):
             return f"Reply to: {obj.parent.author.username}"
         return "Original comment"
     is_reply_to.short_description = 'Type'
+    is_reply_to.admin_order_field = 'parent__author__username'
 
     def make_active(self, request, queryset):
-        queryset.update(active=True)
+        self._update_active(queryset, True)
     make_active.short_description = "Mark selected comments as active"
 
     def make_inactive(self, request, queryset):
-        queryset.update(active=False)
+        self._update_active(queryset, False)
     make_inactive.short_description = "Mark selected comments as inactive"
 
+    def _update_active(self, queryset, active):
+        # Bulk updates skip the counter and cache signals: recount the
+        # posts, move the changed comments in the rollups of the day they
+        # were written and invalidate cached pages
+        sign = 1 if active else -1
+        with transaction.atomic():
+            changed = queryset.exclude(active=active).select_for_update()
+            pks, deltas = [], defaultdict(lambda: {'comment_count': 0})
+            for pk, post_id, created_at in changed.values_list(
+                    'pk', 'post_id', 'created_at'):
+                pks.append(pk)
+                day = timezone.localdate(created_at)
+                deltas[post_id, day]['comment_count'] += sign
+            if not pks:
+                return
+            Comment.objects.filter(pk__in=pks).update(active=active)
+            rebuild_counters(Post.objects.filter(
+                pk__in={post_id for post_id, _ in deltas}
+            ))
+            rollups.add(deltas)
+        bump_generation()
+
 
 # Customize admin site header and title
 admin.site.site_header = "Blog Administration"
@@ -0,0 +1,26 @@
+"""
+Authentication backend loading the reader's profile with the user.
+
+Nearly every page checks the signed-in user's role, in views
+(``can_create_posts()``, ``can_moderate()``) and in ``base.html``'s
+navigation, through ``request.user.userprofile``. ``ProfileBackend``
+loads the user for each request with the profile joined, so all of those
+checks read the profile cached on ``request.user`` instead of querying it
+the first time one of them runs.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileBackend(ModelBackend):
+    """``ModelBackend`` whose ``get_user()`` joins ``userprofile``."""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related(
+                'userprofile'
+            ).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,413 @@
+"""
+Write-behind buffers for high-frequency writes.
+
+Hot paths such as post views record their increments in memory and the
+buffer writes them to the database in batches, instead of issuing one
+UPDATE per request against the busiest rows.
+
+Buffers write in two steps. A worker process first *stages* what it
+holds: one bulk INSERT into a staging table (``StagedView``,
+``StagedReadingProgress``), which no page reads or locks. ``flush()`` then
+*applies* everything staged, by any process, to the real tables and
+deletes the applied rows in the same transaction. A failed apply leaves
+the rows staged for the next one, and the ``flush_view_counts`` and
+``flush_reading_progress`` commands apply what every worker has handed
+over, not just their own buffer.
+
+Workers stage and apply once their threshold is reached. Server
+processes also run ``start_timer()`` (see ``blogproject/wsgi.py``): it
+stages what an idle worker holds within ``HANDOFF_SECONDS`` and applies
+it once the buffer's interval has passed. Whatever is left in memory is
+written when the process exits.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups, trending
+from .cache import bump_reader_state
+from .models import (
+    Post, ReadingProgress, StagedReadingProgress, StagedView,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds the timer leaves recorded items in a process's memory
+HANDOFF_SECONDS = 1
+# Staged rows deleted per statement
+DELETE_BATCH_SIZE = 500
+
+
+class WriteBehindBuffer:
+    """
+    Thread-safe in-process buffer flushed on a size threshold or interval.
+
+    Subclasses set the staging ``model`` and its ``staged_fields`` (the
+    columns read back, in ``merge`` argument order) and implement
+    ``empty`` (a fresh pending container), ``merge`` (fold one recorded
+    item into the pending container), ``restore`` (put a batch back),
+    ``staged_rows`` (staging model instances of a batch) and ``write``
+    (persist a batch, inside the transaction that deletes its staged
+    rows).
+    """
+    threshold_setting = None
+    interval_setting = None
+    default_threshold = 100
+    default_interval = 10  # seconds
+    model = None
+    staged_fields = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = self.empty()
+        self._size = 0
+        self._last_flush = time.monotonic()
+        # Rows staged by this process since its last apply
+        self._staged = False
+
+    @property
+    def threshold(self):
+        return getattr(settings, self.threshold_setting,
+                       self.default_threshold)
+
+    @property
+    def interval(self):
+        return getattr(settings, self.interval_setting,
+                       self.default_interval)
+
+    def empty(self):
+        raise NotImplementedError
+
+    def merge(self, pending, *args):
+        raise NotImplementedError
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def staged_rows(self, batch):
+        raise NotImplementedError
+
+    def record(self, *args):
+        """Add one item to the buffer, flushing if a limit was reached."""
+        with self._lock:
+            self.merge(self._pending, *args)
+            self._size += 1
+            due = (
+                self._size >= self.threshold or
+                time.monotonic() - self._last_flush >= self.interval
+            )
+        if due:
+            # Only one thread writes at a time; the others keep buffering
+            # instead of queueing up behind the flush.
+            self.flush(blocking=False)
+
+    def drain(self):
+        """Atomically take everything pending and reset the buffer."""
+        with self._lock:
+            batch, self._pending = self._pending, self.empty()
+            self._size = 0
+        return batch
+
+    def restore(self, batch):
+        """Put a batch that could not be written back into the buffer."""
+        raise NotImplementedError
+
+    def stage(self):
+        """
+        Hand everything pending over to the staging table; returns the
+        number of distinct keys staged. If the insert fails the batch is
+        merged back.
+        """
+        batch = self.drain()
+        if not batch:
+            return 0
+        try:
+            self.model.objects.bulk_create(
+                self.staged_rows(batch), batch_size=DELETE_BATCH_SIZE
+            )
+        except Exception:
+            self.restore(batch)
+            raise
+        self._staged = True
+        return len(batch)
+
+    def apply(self):
+        """
+        Write every staged row, whichever process staged it, and delete
+        it. Returns the number of distinct keys written.
+        """
+        with transaction.atomic():
+            # Concurrent applies wait here and then skip the rows this
+            # one deletes
+            rows = list(self.model.objects.select_for_update().values_list(
+                'pk', *self.staged_fields
+            ).order_by())
+            if not rows:
+                return 0
+            batch = self.empty()
+            for row in rows:
+                self.merge(batch, *row[1:])
+            self.write(batch)
+            ids = [row[0] for row in rows]
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                self.model.objects.filter(
+                    pk__in=ids[start:start + DELETE_BATCH_SIZE]
+                ).delete()
+        return len(batch)
+
+    def flush(self, blocking=True):
+        """
+        Write all pending items to the database.
+
+        Returns the number of distinct keys written. A failed write
+        leaves the items staged for the next flush.
+        """
+        if not self._flush_lock.acquire(blocking=blocking):
+            return 0
+        try:
+            self._last_flush = time.monotonic()
+            self.stage()
+            written = self.apply()
+            self._staged = False
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def tick(self):
+        """
+        Timer step: stage what is pending, then flush once the interval
+        has passed if this process staged anything since its last flush.
+        """
+        self.stage()
+        elapsed = time.monotonic() - self._last_flush
+        if self._staged and elapsed >= self.interval:
+            self.flush(blocking=False)
+
+
+class ViewCountBuffer(WriteBehindBuffer):
+    """
+    Buffers post view increments keyed by post id.
+
+    A flush groups posts by their pending increment and issues one
+    ``UPDATE ... SET view_count = view_count + n`` per distinct ``n``,
+    so increments are applied by the database and never overwrite each
+    other. The same flush adds the views to today's analytics rollups and
+    to the current hour's trending buckets.
+    """
+    threshold_setting = 'BLOG_VIEW_COUNT_FLUSH_THRESHOLD'
+    interval_setting = 'BLOG_VIEW_COUNT_FLUSH_INTERVAL'
+    model = StagedView
+    staged_fields = ('post_id', 'count')
+
+    def empty(self):
+        return Counter()
+
+    def merge(self, pending, post_id, count=1):
+        pending[post_id] += count
+
+    def restore(self, batch):
+        with self._lock:
+            self._pending.update(batch)
+            self._size += sum(batch.values())
+
+    def staged_rows(self, batch):
+        return [
+            StagedView(post_id=post_id, count=count)
+            for post_id, count in batch.items()
+        ]
+
+    def pending_for(self, post_id):
+        """
+        Views of a post still in this process's memory. Staged views are
+        not included; they are applied within the flush interval.
+        """
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def write(self, batch):
+        # Posts deleted since their views were recorded are skipped
+        existing = set(Post.objects.filter(
+            pk__in=list(batch)
+        ).values_list('pk', flat=True).order_by())
+        batch = {
+            post_id: count for post_id, count in batch.items()
+            if post_id in existing
+        }
+        if not batch:
+            return
+        by_increment = defaultdict(list)
+        for post_id, count in batch.items():
+            by_increment[count].append(post_id)
+        # Runs inside the transaction of apply()
+        for count, post_ids in by_increment.items():
+            Post.objects.filter(pk__in=post_ids).update(
+                view_count=F('view_count') + count
+            )
+        today = timezone.localdate()
+        rollups.add({
+            (post_id, today): {'view_count': count}
+            for post_id, count in batch.items()
+        })
+        trending.add_views(batch)
+
+
+class ReadingProgressBuffer(WriteBehindBuffer):
+    """
+    Buffers reading progress keyed by ``(user_id, post_id)``.
+
+    Repeated pings for the same reader and post coalesce into the highest
+    percentage seen. Applying a batch creates the rows of new readers,
+    then locks every row of the batch and raises each to the maximum of
+    the stored and buffered values with one bulk UPDATE. Decisions are
+    taken on the locked values, so concurrent applies neither lower a
+    reader's progress nor count a completion twice. Pings for posts that
+    are missing or unpublished, or from deleted users, are dropped.
+    Readers reaching ``ReadingProgress.COMPLETED_PERCENTAGE`` for the
+    first time are added to today's analytics rollups.
+    """
+    threshold_setting = 'BLOG_READING_PROGRESS_FLUSH_THRESHOLD'
+    interval_setting = 'BLOG_READING_PROGRESS_FLUSH_INTERVAL'
+    default_threshold = 500
+    default_interval = 30
+    model = StagedReadingProgress
+    staged_fields = ('user_id', 'post_id', 'progress_percentage')
+
+    def empty(self):
+        return {}
+
+    def merge(self, pending, user_id, post_id, percentage):
+        key = (user_id, post_id)
+        pending[key] = max(pending.get(key, 0), percentage)
+
+    def restore(self, batch):
+        with self._lock:
+            for (user_id, post_id), percentage in batch.items():
+                self.merge(self._pending, user_id, post_id, percentage)
+            self._size += len(batch)
+
+    def staged_rows(self, batch):
+        return [
+            StagedReadingProgress(
+                user_id=user_id, post_id=post_id,
+                progress_percentage=percentage
+            )
+            for (user_id, post_id), percentage in batch.items()
+        ]
+
+    def write(self, batch):
+        # Runs inside the transaction of apply()
+        post_ids = set(Post.objects.published().filter(
+            pk__in={post_id for _, post_id in batch}
+        ).values_list('pk', flat=True).order_by())
+        user_ids = set(User.objects.filter(
+            pk__in={user_id for user_id, _ in batch}
+        ).values_list('pk', flat=True))
+        batch = {
+            key: percentage for key, percentage in batch.items()
+            if key[0] in user_ids and key[1] in post_ids
+        }
+        if not batch:
+            return
+        # Every row of the batch exists from here on, so all of them can
+        # be locked; a concurrent insert of the same row waits for ours
+        ReadingProgress.objects.bulk_create(
+            [
+                ReadingProgress(user_id=user_id, post_id=post_id)
+                for user_id, post_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        rows = ReadingProgress.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in batch},
+            post_id__in={post_id for _, post_id in batch},
+        ).order_by()
+        now = timezone.now()
+        threshold = ReadingProgress.COMPLETED_PERCENTAGE
+        completed = Counter()
+        changed = []
+        for row in rows:
+            percentage = batch.get((row.user_id, row.post_id))
+            if percentage is None:
+                continue
+            if percentage >= threshold > row.progress_percentage:
+                completed[row.post_id] += 1
+            row.progress_percentage = max(
+                row.progress_percentage, percentage
+            )
+            row.last_read_at = now
+            changed.append(row)
+        ReadingProgress.objects.bulk_update(
+            changed, ['progress_percentage', 'last_read_at']
+        )
+        today = timezone.localdate()
+        rollups.add({
+            (post_id, today): {'completed_reads': count}
+            for post_id, count in completed.items()
+        })
+        readers = {user_id for user_id, _ in batch}
+        transaction.on_commit(lambda: bump_reader_state(readers))
+
+    def pending_for(self, user_id, post_ids):
+        """Progress of a reader on ``post_ids`` not written yet."""
+        with self._lock:
+            return {
+                post_id: self._pending[user_id, post_id]
+                for post_id in post_ids
+                if (user_id, post_id) in self._pending
+            }
+
+
+# Process-wide buffers used by PostDetailView and the progress endpoints
+view_counts = ViewCountBuffer()
+reading_progress = ReadingProgressBuffer()
+BUFFERS = (view_counts, reading_progress)
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def start_timer():
+    """
+    Start the thread writing this process's buffers while it is idle.
+    Called once per server process; later calls do nothing.
+    """
+    global _timer
+    with _timer_lock:
+        if _timer is None:
+            _timer = threading.Thread(
+                target=_run_timer, name='blog-buffers', daemon=True
+            )
+            _timer.start()
+
+
+def _run_timer():
+    while True:
+        time.sleep(HANDOFF_SECONDS)
+        for buffer in BUFFERS:
+            try:
+                buffer.tick()
+            except Exception:
+                # Items stay buffered or staged; the next tick retries
+                logger.exception('Could not write %s',
+                                 type(buffer).__name__)
+            finally:
+                close_old_connections()
+
+
+@atexit.register
+def _flush_on_exit():
+    # Best effort: don't lose buffered writes when a worker shuts down
+    for buffer in BUFFERS:
+        try:
+            buffer.flush()
+        except Exception:
+            pass
@@ -0,0 +1,164 @@
+"""
+Site-wide caching helpers.
+
+Cached pages and fragments are keyed on a *content generation* token that
+changes whenever a Post, Category, Tag or Comment is saved or deleted
+(see ``blog.signals``). Changing the generation makes every previously
+cached entry unreachable at once, so readers never see stale content after
+an edit; the orphaned entries simply expire. The generation and the time
+it last changed also serve as ETag and Last-Modified validators, so
+clients revalidating unchanged pages get a 304 without the view running.
+
+The cache backend comes from ``CACHES['default']`` (local memory unless
+``CACHE_URL`` points at a shared backend such as Redis or a file cache).
+Use a shared backend when running several worker processes so that an
+edit in one worker invalidates the pages cached by the others.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+GENERATION_KEY = 'blog:content-generation'
+GENERATION_TIME_KEY = 'blog:content-generation-time'
+
+
+def get_timeout():
+    """Default lifetime in seconds of cached pages and fragments."""
+    return getattr(settings, 'BLOG_CACHE_TIMEOUT', 300)
+
+
+def get_generation():
+    """Return the current content generation token."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # add() only succeeds for the first process, so concurrent
+        # requests agree on a single token
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def get_generation_time():
+    """
+    When content last changed, as far as the cache knows. If the cache
+    lost track, the first caller's time is used, which can only make
+    clients revalidate more often than needed.
+    """
+    changed = cache.get(GENERATION_TIME_KEY)
+    if changed is None:
+        cache.add(GENERATION_TIME_KEY, timezone.now(), None)
+        changed = cache.get(GENERATION_TIME_KEY)
+    return changed
+
+
+def bump_generation():
+    """Invalidate every cached page and fragment."""
+    cache.set_many({
+        GENERATION_KEY: uuid.uuid4().hex,
+        GENERATION_TIME_KEY: timezone.now(),
+    }, None)
+
+
+def _reader_state_key(user_id):
+    return f'blog:reader-state:{user_id}'
+
+
+def get_reader_state_version(user_id):
+    """
+    Token that changes whenever a reader's reactions or reading progress
+    are written (see ``blog.reader_state``).
+    """
+    return cache.get(_reader_state_key(user_id), 0)
+
+
+def bump_reader_state(user_ids):
+    """Mark the reactions or progress of ``user_ids`` as changed."""
+    token = uuid.uuid4().hex
+    cache.set_many(
+        {_reader_state_key(user_id): token for user_id in user_ids}, None
+    )
+
+
+def make_key(name, *parts):
+    """Build a generation-aware cache key for ``name`` and ``parts``."""
+    digest = hashlib.md5(
+        ':'.join(str(part) for part in parts).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    return f'blog:{name}:{get_generation()}:{digest}'
+
+
+def cached(name, builder, *parts, timeout=None):
+    """
+    Return the cached value for ``name``/``parts``, calling ``builder()``
+    to compute and store it on a miss.
+
+    Builders must return fully evaluated data (lists, not lazy querysets)
+    so that a cache hit runs no queries.
+    """
+    key = make_key(name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, get_timeout() if timeout is None else timeout)
+    return value
+
+
+def cached_response(name):
+    """
+    View decorator caching successful GET responses per full path until
+    the content generation changes.
+
+    Only for pages that look the same to every visitor, such as feeds and
+    sitemaps.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            # Feeds and sitemaps contain absolute URLs on the request host
+            key = make_key(
+                f'response:{name}', request.get_host(),
+                request.get_full_path()
+            )
+            hit = cache.get(key)
+            if hit is not None:
+                content, headers = hit
+                return HttpResponse(content, headers=headers)
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+            if response.status_code == 200 and not response.streaming:
+                cache.set(
+                    key, (response.content, dict(response.headers)),
+                    get_timeout()
+                )
+            return response
+        return wrapped
+    return decorator
+
+
+def content_etag(request, *args, **kwargs):
+    """ETag of a page that only changes with the content generation."""
+    return hashlib.md5(
+        f'{get_generation()}:{request.get_full_path()}'.encode(),
+        usedforsecurity=False
+    ).hexdigest()
+
+
+def content_last_modified(request, *args, **kwargs):
+    return get_generation_time()
+
+
+# Answers revalidation with 304 Not Modified from the cache alone, without
+# running the view, while the content generation is unchanged
+content_conditional = condition(
+    etag_func=content_etag, last_modified_func=content_last_modified
+)
@@ -0,0 +1,127 @@
+"""
+Conditional GET for pages built from posts and comments.
+
+Each page supplies a *validator*: one cheap query returning the latest
+modification time of the rows the page renders plus any other values
+that change its markup (counters, names). From it the page gets a
+``Last-Modified`` header and an ``ETag`` that also covers the URL and the
+visitor, since logged-in users see personalised markup and forms embed
+CSRF tokens. Revalidation requests whose validators still match get a 304
+without the view running.
+
+Responses that displayed flash messages are sent with ``no-store`` and no
+validators, so a browser never revalidates its way back to a stale
+"Comment added!" banner.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_reader_state_version
+
+
+class Validator:
+    """Result of a page's validator query."""
+
+    def __init__(self, last_modified, *state):
+        self.last_modified = last_modified
+        self.state = state
+
+    def etag(self, request):
+        user = ''
+        if request.user.is_authenticated:
+            # Lists show the reader's own reactions and progress
+            user = (f'{request.user.pk}:'
+                    f'{get_reader_state_version(request.user.pk)}')
+        # Forms on the page embed a token derived from the CSRF secret,
+        # whether it came in with the request or was issued rendering it
+        csrf = request.META.get('CSRF_COOKIE', '')
+        data = f'{user}:{csrf}:{request.get_full_path()}:{self.state!r}'
+        return quote_etag(hashlib.md5(
+            data.encode(), usedforsecurity=False
+        ).hexdigest())
+
+    def timestamp(self):
+        if self.last_modified is not None:
+            return int(self.last_modified.timestamp())
+
+
+def not_modified(request, validator):
+    """Return a 304 response if the client's copy is current, else None."""
+    if request.method not in ('GET', 'HEAD') or validator is None:
+        return None
+    return get_conditional_response(
+        request, etag=validator.etag(request),
+        last_modified=validator.timestamp()
+    )
+
+
+def _showed_messages(request):
+    storage = getattr(request, '_messages', None)
+    return storage is not None and storage.used
+
+
+def add_validators(request, response, validator):
+    """Set ETag and Last-Modified on a full response once it is rendered."""
+    if (request.method not in ('GET', 'HEAD') or validator is None or
+            response.status_code != 200):
+        return response
+
+    def finish(response):
+        if _showed_messages(request):
+            patch_cache_control(response, no_store=True)
+            return response
+        response.headers.setdefault('ETag', validator.etag(request))
+        timestamp = validator.timestamp()
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+        return response
+
+    if getattr(response, 'is_rendered', True):
+        return finish(response)
+    response.add_post_render_callback(finish)
+    return response
+
+
+def conditional_page(get_validator):
+    """
+    Decorator for function views; ``get_validator(request, *args,
+    **kwargs)`` returns a ``Validator`` (or None to skip validation).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            validator = None
+            if request.method in ('GET', 'HEAD'):
+                validator = get_validator(request, *args, **kwargs)
+            response = not_modified(request, validator)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                add_validators(request, response, validator)
+            return response
+        return wrapped
+    return decorator
+
+
+class ConditionalPageMixin:
+    """
+    Conditional GET for class-based views implementing
+    ``get_validator()``. ``not_modified_response()`` runs whenever a 304
+    is sent, for work the page still has to account for.
+    """
+
+    def get_validator(self):
+        return None
+
+    def not_modified_response(self, response):
+        return response
+
+    def get(self, request, *args, **kwargs):
+        validator = self.get_validator()
+        response = not_modified(request, validator)
+        if response is not None:
+            return self.not_modified_response(response)
+        response = super().get(request, *args, **kwargs)
+        return add_validators(request, response, validator)
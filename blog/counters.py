@@ -0,0 +1,77 @@
+"""
+Denormalized engagement counters stored on Post.
+
+``Post.comment_count`` counts active comments and ``Post.<type>_count``
+counts reactions of each type. The signal handlers in ``blog.signals``
+adjust them with database-side increments inside the same transaction as
+the comment/reaction write; ``rebuild_counters()`` recomputes them from
+the source tables and ``find_drift()`` reports posts whose stored values
+no longer match.
+"""
+from django.db.models import (
+    Count, F, IntegerField, OuterRef, Q, Subquery
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Post, PostReaction, REACTION_CHOICES
+
+
+def reaction_field(reaction_type):
+    """Name of the Post field counting reactions of ``reaction_type``."""
+    return f'{reaction_type}_count'
+
+
+COUNTER_FIELDS = ['comment_count'] + [
+    reaction_field(reaction_type) for reaction_type, _ in REACTION_CHOICES
+]
+
+
+def adjust(post_id, **deltas):
+    """Add ``deltas`` to one post's counters in a single UPDATE."""
+    updates = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items() if delta
+    }
+    if post_id is not None and updates:
+        Post.objects.filter(pk=post_id).update(**updates)
+
+
+def _count(queryset):
+    """Correlated COUNT(*) subquery over rows pointing at the outer post."""
+    counts = queryset.filter(post=OuterRef('pk')).order_by().values(
+        'post').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def actual_counts():
+    """Expressions computing every counter from the source tables."""
+    expressions = {
+        'comment_count': _count(Comment.objects.filter(active=True)),
+    }
+    for reaction_type, _ in REACTION_CHOICES:
+        expressions[reaction_field(reaction_type)] = _count(
+            PostReaction.objects.filter(reaction_type=reaction_type)
+        )
+    return expressions
+
+
+def find_drift(queryset=None):
+    """
+    Return posts whose stored counters differ from the source tables,
+    annotated with ``actual_<field>`` for each counter.
+    """
+    queryset = Post.objects.all() if queryset is None else queryset
+    annotations = {
+        f'actual_{field}': expression
+        for field, expression in actual_counts().items()
+    }
+    mismatch = Q()
+    for field in COUNTER_FIELDS:
+        mismatch |= ~Q(**{field: F(f'actual_{field}')})
+    return queryset.annotate(**annotations).filter(mismatch)
+
+
+def rebuild_counters(queryset=None):
+    """Recompute the counters of ``queryset`` (default: all posts)."""
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.update(**actual_counts())
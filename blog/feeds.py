@@ -0,0 +1,130 @@
+"""
+RSS and Atom feeds of published posts.
+
+There is one feed for the whole site and one per category, tag and
+author, each available as RSS 2.0 and Atom 1.0. Items come from
+``Post.get_absolute_url()`` with ``published_at`` and ``updated_at`` as
+their dates; posts are loaded with ``for_list()`` so feeds never read the
+article bodies.
+"""
+from django.contrib.auth.models import User
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .models import Category, Post, Tag
+
+# Posts listed in each feed
+FEED_SIZE = 20
+
+
+class LatestPostsFeed(Feed):
+    title = 'Blog - Programming & Technology'
+    description = (
+        'Latest posts about programming, technology and web development.'
+    )
+
+    def link(self):
+        return reverse('blog:post_list')
+
+    def posts(self, obj):
+        """Published posts in the feed, before ordering and slicing."""
+        return Post.objects.published()
+
+    def items(self, obj):
+        return self.posts(obj).for_list().order_by(
+            '-published_at', '-pk')[:FEED_SIZE]
+
+    def item_title(self, post):
+        return post.title
+
+    def item_description(self, post):
+        return post.excerpt or post.summary
+
+    def item_pubdate(self, post):
+        return post.published_at
+
+    def item_updateddate(self, post):
+        return post.updated_at
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.category.name] if post.category else []
+
+
+class CategoryFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug)
+
+    def title(self, category):
+        return f'{category.name} - {LatestPostsFeed.title}'
+
+    def description(self, category):
+        return category.description or f'Latest posts in {category.name}.'
+
+    def link(self, category):
+        return category.get_absolute_url()
+
+    def posts(self, category):
+        return Post.objects.published().filter(category=category)
+
+
+class TagFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def title(self, tag):
+        return f'#{tag.name} - {LatestPostsFeed.title}'
+
+    def description(self, tag):
+        return f'Latest posts tagged {tag.name}.'
+
+    def link(self, tag):
+        return tag.get_absolute_url()
+
+    def posts(self, tag):
+        return Post.objects.published().filter(tags=tag)
+
+
+class AuthorFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        name = author.get_full_name() or author.username
+        return f'{name} - {LatestPostsFeed.title}'
+
+    def description(self, author):
+        return f'Latest posts by {author.get_full_name() or author.username}.'
+
+    def link(self, author):
+        return reverse('blog:post_list')
+
+    def posts(self, author):
+        return Post.objects.published().filter(author=author)
+
+
+class AtomFeedMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class LatestPostsAtomFeed(AtomFeedMixin, LatestPostsFeed):
+    pass
+
+
+class CategoryAtomFeed(AtomFeedMixin, CategoryFeed):
+    pass
+
+
+class TagAtomFeed(AtomFeedMixin, TagFeed):
+    pass
+
+
+class AuthorAtomFeed(AtomFeedMixin, AuthorFeed):
+    pass
@@ -65,12 +65,11 @@ class CustomUserCreationForm(UserCreationForm):
 
         if commit:
             user.save()
-            # Create or update user profile with selected role
-            # get_or_create prevents errors if profile already exists
-            # and ensures every user has a profile with proper role
-            profile, created = UserProfile.objects.get_or_create(user=user)
+            # Set the selected role on the profile the post_save signal
+            # just created with the user
+            profile = user.userprofile
             profile.role = self.cleaned_data["role"]
-            profile.save()
+            profile.save(update_fields=['role', 'updated_at'])
         return user
 
 
@@ -0,0 +1,210 @@
+"""
+Image renditions for avatars, featured images and CKEditor uploads.
+
+Uploads are stored as uploaded; resized renditions of each original are
+generated off the request path by a small thread pool and written to
+the same storage under ``renditions/``, mirroring the original path::
+
+    posts/beach.jpg -> renditions/posts/beach-card.jpg
+                       renditions/posts/beach-card.webp
+
+Every rendition exists in the original's format (JPEG, or PNG for
+images that may be transparent) and as WebP. Rendition names are
+derived from the original name, so templates can build their URLs
+without a lookup; until an image has been processed they fall back to
+the original (see ``blog.templatetags.blog_images``).
+
+Originals of kinds listed in ``ORIGINAL_LIMITS`` are shrunk in place by
+the same job, so storage never keeps, say, a camera-sized avatar.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+from ckeditor_uploader.backends import PillowBackend
+
+logger = logging.getLogger(__name__)
+
+RENDITION_ROOT = 'renditions'
+
+# Longest side in pixels of each rendition, per kind of image
+RENDITIONS = {
+    'avatar': {'small': 64, 'medium': 150, 'large': 300},
+    'featured': {'thumb': 400, 'card': 800, 'hero': 1600},
+    'upload': {'medium': 800, 'large': 1200},
+}
+
+# Longest side in pixels kept of originals, per kind of image; other
+# kinds keep their original size. Avatars are never shown larger.
+ORIGINAL_LIMITS = {'avatar': 300}
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Kind of renditions made for each model image field
+FIELD_KINDS = {'avatar': 'avatar', 'featured_image': 'featured'}
+
+# Seconds before an unprocessed image is checked again in storage
+MISSING_RECHECK = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def fallback_extension(name):
+    """Extension of the non-WebP renditions of ``name``."""
+    extension = os.path.splitext(name)[1].lower()
+    return '.png' if extension in ('.png', '.gif') else '.jpg'
+
+
+def rendition_name(name, size, webp=False):
+    """Storage name of the ``size`` rendition of the original ``name``."""
+    stem = os.path.splitext(name)[0]
+    extension = '.webp' if webp else fallback_extension(name)
+    return f'{RENDITION_ROOT}/{stem}-{size}{extension}'
+
+
+def _ready_key(name):
+    digest = hashlib.md5(name.encode(), usedforsecurity=False).hexdigest()
+    return f'blog:renditions:{digest}'
+
+
+def renditions_ready(name, kind):
+    """
+    Whether every rendition of ``name`` has been generated.
+
+    The answer is cached: workers mark images as ready when they finish,
+    and other processes check storage once and remember the result.
+    """
+    key = _ready_key(name)
+    ready = cache.get(key)
+    if ready is None:
+        # The last file written by process_image()
+        largest = list(RENDITIONS[kind])[-1]
+        ready = default_storage.exists(
+            rendition_name(name, largest, webp=True)
+        )
+        cache.set(key, ready, None if ready else MISSING_RECHECK)
+    return ready
+
+
+def _encode(image, fmt, quality):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(
+            buffer, 'JPEG', quality=quality, optimize=True, progressive=True
+        )
+    elif fmt == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def _replace(storage, name, content):
+    # Renditions are regenerated in place, never renamed by the storage
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, content)
+
+
+def process_image(name, kind, storage=None):
+    """
+    Generate every rendition of the stored image ``name``.
+
+    Returns the names written. Runs synchronously; use ``schedule()`` from
+    request code.
+    """
+    storage = storage or default_storage
+    with storage.open(name) as original:
+        image = Image.open(original)
+        if getattr(image, 'is_animated', False):
+            # Resizing would drop the animation; keep serving the original
+            return []
+        image.load()
+    original_format = image.format
+    # Respect camera orientation before resizing
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA' if 'transparency' in image.info or 'A' in image.mode
+            else 'RGB'
+        )
+    fallback = 'PNG' if fallback_extension(name) == '.png' else 'JPEG'
+
+    written = []
+    limit = ORIGINAL_LIMITS.get(kind)
+    if (limit and max(image.size) > limit and
+            original_format in ('JPEG', 'PNG', 'WEBP')):
+        image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+        quality = WEBP_QUALITY if original_format == 'WEBP' else JPEG_QUALITY
+        _replace(storage, name, _encode(image, original_format, quality))
+        written.append(name)
+    for size, pixels in RENDITIONS[kind].items():
+        rendition = image.copy()
+        rendition.thumbnail((pixels, pixels), Image.Resampling.LANCZOS)
+        for webp, fmt, quality in ((False, fallback, JPEG_QUALITY),
+                                   (True, 'WEBP', WEBP_QUALITY)):
+            target = rendition_name(name, size, webp=webp)
+            _replace(storage, target, _encode(rendition, fmt, quality))
+            written.append(target)
+    cache.set(_ready_key(name), True, None)
+    return written
+
+
+def get_executor():
+    """Shared worker pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BLOG_IMAGE_WORKERS', 2),
+                thread_name_prefix='blog-images'
+            )
+    return _executor
+
+
+def _process_logged(name, kind):
+    try:
+        process_image(name, kind)
+    except Exception:
+        # Pages keep serving the original; the next save retries
+        logger.exception('Could not create renditions of %s', name)
+
+
+def schedule(name, kind):
+    """
+    Queue rendition generation for ``name`` once the current transaction
+    commits, so the request does not wait for image work.
+
+    With ``BLOG_IMAGE_SYNC`` enabled (tests, management commands) the
+    renditions are generated immediately instead, and errors propagate.
+    """
+    if not name:
+        return
+    cache.delete(_ready_key(name))
+    if getattr(settings, 'BLOG_IMAGE_SYNC', False):
+        process_image(name, kind)
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(_process_logged, name, kind)
+        )
+
+
+class RenditionPillowBackend(PillowBackend):
+    """CKEditor upload backend that also queues renditions of images."""
+
+    def save_as(self, filepath):
+        saved_path = super().save_as(filepath)
+        if self.is_image:
+            schedule(saved_path, 'upload')
+        return saved_path
@@ -0,0 +1,227 @@
+"""
+Local load-test driver.
+
+Replays a weighted mix of the blog's pages against a running server
+(e.g. ``gunicorn blogproject.wsgi`` as in the ``Procfile``) from several
+threads and reports throughput and latency percentiles, overall and per
+URL name. Concrete URLs are drawn from the database the server uses,
+typically filled by ``manage.py generate_fake_data``; the same ``seed``
+replays the same sequence of requests.
+
+Only the standard library is used, so the driver runs wherever the
+project does. Readers can be logged in, in which case every thread signs
+in through the login form first and the mix includes personal pages.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, build_opener
+
+from django.urls import reverse
+
+from .instrumentation import PERCENTILES, percentile
+from .models import Category, Post, Tag
+
+# Relative frequency of each page in the mix, as (label, weight). Labels
+# are URL names, except post_list_search: the post list with a query
+PUBLIC_MIX = (
+    ('post_detail', 40),
+    ('landing_page', 15),
+    ('post_list', 15),
+    ('category_detail', 8),
+    ('tag_detail', 8),
+    ('post_list_search', 5),
+    ('post_feed', 3),
+    ('sitemap_section', 2),
+    ('about', 2),
+    ('advanced_search', 2),
+)
+# Added to the mix when requests are made as a signed-in reader
+READER_MIX = (
+    ('profile', 5),
+    ('analytics_dashboard', 2),
+)
+
+SAMPLE_SIZE = 200
+SEARCH_TERMS = ('django', 'cache', 'query', 'template', 'python')
+
+
+class URLMix:
+    """Draws weighted random paths from the published content."""
+
+    def __init__(self, rng, signed_in=False):
+        self.rng = rng
+        mix = PUBLIC_MIX + (READER_MIX if signed_in else ())
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        published = Post.objects.published()
+        self.slugs = {
+            'post': list(published.order_by('-published_at').values_list(
+                'slug', flat=True)[:SAMPLE_SIZE]),
+            'category': list(Category.objects.order_by('pk').values_list(
+                'slug', flat=True)[:SAMPLE_SIZE]),
+            'tag': list(Tag.objects.order_by('pk').values_list(
+                'slug', flat=True)[:SAMPLE_SIZE]),
+        }
+        if not self.slugs['post']:
+            raise ValueError('There are no published posts to request.')
+
+    def _slug(self, kind):
+        return self.rng.choice(self.slugs[kind] or self.slugs['post'])
+
+    def draw(self):
+        """Return ``(url name, path)`` for the next request."""
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == 'post_detail':
+            path = reverse('blog:post_detail', args=[self._slug('post')])
+        elif name in ('category_detail', 'tag_detail'):
+            kind = name.split('_')[0]
+            if not self.slugs[kind]:
+                return self.draw()
+            path = reverse(f'blog:{name}', args=[self._slug(kind)])
+        elif name == 'post_list_search':
+            path = reverse('blog:post_list') + '?' + urlencode(
+                {'query': self.rng.choice(SEARCH_TERMS)}
+            )
+        elif name == 'sitemap_section':
+            path = reverse('blog:sitemap_section', args=['posts'])
+        else:
+            path = reverse(f'blog:{name}')
+        return name, path
+
+
+def _sign_in(opener, base_url, username, password):
+    login_url = base_url + reverse('blog:login')
+    opener.open(login_url).read()
+    token = next(
+        (cookie.value for cookie in opener.cookie_jar
+         if cookie.name == 'csrftoken'), ''
+    )
+    data = urlencode({
+        'username': username, 'password': password,
+        'csrfmiddlewaretoken': token,
+    }).encode()
+    opener.addheaders = [('Referer', login_url)]
+    opener.open(login_url, data).read()
+    if not any(cookie.name == 'sessionid' for cookie in opener.cookie_jar):
+        raise ValueError(f'Could not sign in as {username}.')
+
+
+def _opener():
+    jar = CookieJar()
+    opener = build_opener(HTTPCookieProcessor(jar))
+    opener.cookie_jar = jar
+    return opener
+
+
+def run(base_url, requests, concurrency=4, seed=0, username=None,
+        password=None, timeout=30):
+    """
+    Send ``requests`` requests over ``concurrency`` threads. Returns a
+    ``Report``.
+    """
+    base_url = base_url.rstrip('/')
+    # Draw every path up front so a seed always replays the same mix,
+    # whatever order the threads run in
+    mix = URLMix(random.Random(seed), signed_in=username is not None)
+    queue = [mix.draw() for _ in range(requests)]
+    report = Report()
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        opener = _opener()
+        try:
+            if username is not None:
+                _sign_in(opener, base_url, username, password)
+        except (OSError, ValueError) as exc:
+            errors.append(exc)
+            return
+        while True:
+            with lock:
+                if not queue:
+                    return
+                name, path = queue.pop()
+            start = time.perf_counter()
+            try:
+                with opener.open(base_url + path, timeout=timeout) as reply:
+                    reply.read()
+                    status = reply.status
+            except HTTPError as exc:
+                status = exc.code
+            except URLError:
+                status = None
+            report.add(name, time.perf_counter() - start, status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    report.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.stop()
+    if errors and not report.count:
+        raise errors[0]
+    return report
+
+
+class Report:
+    """Latencies and failures collected by ``run()``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.started = self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def add(self, name, seconds, status):
+        with self._lock:
+            self.latencies[name].append(seconds * 1000)
+            if status is None or status >= 400:
+                self.failures[name] += 1
+
+    @property
+    def count(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def throughput(self):
+        """Requests per second over the whole run."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.count / elapsed if elapsed else 0.0
+
+    def rows(self):
+        """
+        ``(name, requests, failures, {pNN: ms})`` per URL name, busiest
+        first, followed by the overall row named ``'all'``.
+        """
+        rows = []
+        everything = []
+        for name, values in sorted(self.latencies.items(),
+                                   key=lambda item: -len(item[1])):
+            everything.extend(values)
+            rows.append((name, len(values), self.failures[name],
+                         self._percentiles(values)))
+        rows.append(('all', len(everything), sum(self.failures.values()),
+                     self._percentiles(everything)))
+        return rows
+
+    @staticmethod
+    def _percentiles(values):
+        ordered = sorted(values)
+        if not ordered:
+            return {}
+        return {
+            f'p{percent}': percentile(ordered, percent)
+            for percent in PERCENTILES
+        }
@@ -0,0 +1,97 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from blog.models import Category, Post
+
+PARAGRAPH = (
+    'Django keeps list pages fast when they only load the columns their '
+    'cards render, leaving long article bodies in the database. '
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare memory and latency of loading published posts with full '
+        'rows versus for_list(). The fixture is created inside a '
+        'transaction that is rolled back, so no data is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=10000,
+            help='Number of posts in the fixture (default 10000).',
+        )
+        parser.add_argument(
+            '--paragraphs', type=int, default=40,
+            help='Paragraphs of HTML content per post (default 40).',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Timed runs per queryset; the best is reported.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_fixture(options['posts'], options['paragraphs'])
+            querysets = {
+                'full rows': Post.objects.published().select_related(
+                    'author', 'category'),
+                'for_list()': Post.objects.published().for_list(),
+            }
+            self.stdout.write(
+                f'{"queryset":<12} {"rows":>7} {"best ms":>10} '
+                f'{"peak MiB":>10}'
+            )
+            for label, queryset in querysets.items():
+                queryset = queryset.order_by('-published_at')
+                rows, seconds, peak = self.measure(
+                    queryset, options['repeat']
+                )
+                self.stdout.write(
+                    f'{label:<12} {rows:>7} {seconds * 1000:>10.1f} '
+                    f'{peak / 2 ** 20:>10.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def create_fixture(self, count, paragraphs):
+        author = User.objects.create_user(username='benchmark-author')
+        category = Category.objects.create(
+            name='Benchmark', slug='benchmark-fixture'
+        )
+        content = f'<p>{PARAGRAPH}</p>' * paragraphs
+        now = timezone.now()
+        posts = []
+        for i in range(count):
+            post = Post(
+                title=f'Benchmark post {i}', slug=f'benchmark-post-{i}',
+                author=author, category=category, content=content,
+                excerpt='', status='published',
+                published_at=now - timedelta(minutes=i),
+            )
+            post.process_content()
+            posts.append(post)
+        Post.objects.bulk_create(posts, batch_size=500)
+        self.stdout.write(
+            f'Created {count} posts of {len(content)} bytes of HTML each.'
+        )
+
+    def measure(self, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(list(queryset.all()))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Memory is measured separately so tracing does not skew timings
+        tracemalloc.start()
+        posts = list(queryset.all())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del posts
+        return rows, best, peak
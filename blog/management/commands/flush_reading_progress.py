@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from blog.buffers import reading_progress
+
+
+class Command(BaseCommand):
+    help = (
+        'Write buffered reading progress to the database. Worker processes '
+        'hand their progress over to a staging table within a second and '
+        'apply it on their threshold and interval; this applies all staged '
+        'progress now, whichever process recorded it.'
+    )
+
+    def handle(self, *args, **options):
+        written = reading_progress.flush()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Flushed reading progress for {written} reader/post '
+                f'pair(s).'
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from blog.buffers import view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Write buffered post views to the database. Worker processes '
+        'hand their views over to a staging table within a second and '
+        'apply them on their threshold and interval; this applies every '
+        'staged view now, whichever process recorded it.'
+    )
+
+    def handle(self, *args, **options):
+        written = view_counts.flush()
+        self.stdout.write(
+            self.style.SUCCESS(f'Flushed view counts for {written} post(s).')
+        )
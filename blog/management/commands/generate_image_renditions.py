@@ -0,0 +1,70 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from blog.images import FIELD_KINDS, process_image, renditions_ready
+from blog.models import Post, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate missing renditions of avatars, featured images and '
+        'CKEditor uploads, e.g. for images uploaded before renditions '
+        'existed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate renditions that already exist.',
+        )
+
+    def handle(self, *args, **options):
+        images = []
+        for model, field_name in ((UserProfile, 'avatar'),
+                                  (Post, 'featured_image')):
+            names = model.objects.exclude(
+                **{field_name: ''}
+            ).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values_list(field_name, flat=True)
+            images.extend((name, FIELD_KINDS[field_name]) for name in names)
+        images.extend(
+            (name, 'upload')
+            for name in self.uploads(settings.CKEDITOR_UPLOAD_PATH)
+        )
+
+        processed = failed = 0
+        for name, kind in images:
+            if not options['force'] and renditions_ready(name, kind):
+                continue
+            try:
+                process_image(name, kind)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'{name}: {exc}')
+            else:
+                processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated renditions for {processed} image(s); '
+                f'{failed} failed.'
+            )
+        )
+
+    def uploads(self, path):
+        """Yield uploaded image names below ``path``, skipping thumbnails."""
+        try:
+            directories, files = default_storage.listdir(path)
+        except (FileNotFoundError, NotImplementedError):
+            return
+        for filename in files:
+            stem, extension = os.path.splitext(filename)
+            if stem.endswith('_thumb') or filename.startswith('.'):
+                continue
+            if extension.lower() in ('.jpg', '.jpeg', '.png', '.gif',
+                                     '.webp'):
+                yield os.path.join(path, filename)
+        for directory in directories:
+            yield from self.uploads(os.path.join(path, directory))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from blog.instrumentation import PERCENTILES
+from blog.loadtest import run
+from blog.seed import PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a weighted mix of blog pages against a running server and '
+        'report throughput and latency percentiles. Start the server '
+        'first, e.g. "gunicorn blogproject.wsgi --workers 4", on a '
+        'database filled by generate_fake_data (about 12 seconds per 1000 '
+        'posts, so seed before timing anything). Without DEBUG the server '
+        'redirects plain HTTP to HTTPS, so give an https:// --base-url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://127.0.0.1:8000',
+            help='Server to load (default http://127.0.0.1:8000).',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Total number of requests (default 1000).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Number of concurrent clients (default 4).',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed; the same seed replays the same requests.',
+        )
+        parser.add_argument(
+            '--username',
+            help='Sign every client in as this user, adding personal '
+                 'pages to the mix.',
+        )
+        parser.add_argument(
+            '--password', default=PASSWORD,
+            help='Password of --username (default: the generated users\' '
+                 'password).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = run(
+                options['base_url'], options['requests'],
+                concurrency=options['concurrency'], seed=options['seed'],
+                username=options['username'], password=options['password'],
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        columns = ''.join(f'{f"p{p} ms":>10}' for p in PERCENTILES)
+        self.stdout.write(f'{"page":<22}{"requests":>9}{"failed":>8}{columns}')
+        for name, count, failed, percentiles in report.rows():
+            values = ''.join(
+                f'{percentiles[f"p{p}"]:>10.1f}' for p in PERCENTILES
+            )
+            self.stdout.write(f'{name:<22}{count:>9}{failed:>8}{values}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.count} requests at {report.throughput:.1f} requests/s '
+            f'with {options["concurrency"]} concurrent clients.'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill the plain text, word count, reading time and term vector '
+        'stored on posts from their HTML content'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts written per UPDATE batch (default 500).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = list(Post.CONTENT_DERIVED_FIELDS)
+        posts = Post.objects.only('pk', 'title', 'content').order_by('pk')
+        batch = []
+        count = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            post.process_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                Post.objects.bulk_update(batch, fields)
+                count += len(batch)
+                batch = []
+        if batch:
+            Post.objects.bulk_update(batch, fields)
+            count += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed content of {count} post(s).')
+        )
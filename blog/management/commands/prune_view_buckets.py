@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from blog.trending import TRENDING_WINDOW, prune_buckets
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete hourly view buckets that no longer count towards trending '
+        'scores. Long-term view history is kept in the daily rollups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=TRENDING_WINDOW,
+            help=f'Hours of buckets to keep (default {TRENDING_WINDOW}).',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_buckets(options['hours'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} view bucket(s).')
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from blog.counters import COUNTER_FIELDS, find_drift, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the denormalized comment and reaction counters on posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report posts whose counters have drifted; exits '
+                 'with an error if any are found.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(find_drift())
+        for post in drifted:
+            changes = ', '.join(
+                f'{field} {getattr(post, field)} -> '
+                f'{getattr(post, f"actual_{field}")}'
+                for field in COUNTER_FIELDS
+                if getattr(post, field) != getattr(post, f'actual_{field}')
+            )
+            self.stdout.write(f'{post.pk} {post.slug}: {changes}')
+
+        if options['check']:
+            if drifted:
+                raise CommandError(
+                    f'{len(drifted)} post(s) have drifted counters.'
+                )
+            self.stdout.write(self.style.SUCCESS('All counters are correct.'))
+            return
+
+        count = rebuild_counters()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt counters for {count} post(s); '
+                f'{len(drifted)} had drifted.'
+            )
+        )
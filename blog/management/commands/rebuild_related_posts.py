@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from blog.related import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the related posts of every published post from shared '
+        'tags, categories and term vectors. Run after migrating and after '
+        'bulk imports that bypass model signals.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Stored {count} related post link(s).')
+        )
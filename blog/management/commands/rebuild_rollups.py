@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from blog.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the daily analytics rollups from comments, reactions, '
+        'reading progress and published posts. Recorded views are kept, '
+        'since they are not stored per day anywhere else. Run once after '
+        'migrating to fill the rollups with existing activity.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt rollups; {count} post day(s).')
+        )
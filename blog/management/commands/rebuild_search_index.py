@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all posts'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        posts = Post.objects.only('pk', 'title', 'excerpt', 'plain_text')
+        count = backend.rebuild(posts)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indexed {count} post(s) with '
+                f'{backend.__class__.__name__}.'
+            )
+        )
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from blog.models import NewsletterIssue, NewsletterSubscription
+from blog.newsletter import (
+    build_issue, dispatch, new_posts, pending_subscriptions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mail a digest of the posts published since the last newsletter to '
+        'every active subscriber. Re-run with --issue to resume an '
+        'interrupted issue; subscribers already sent it are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--issue', type=int,
+            help='Resume sending an existing issue instead of building one.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.BLOG_NEWSLETTER_BATCH_SIZE,
+            help='Subscribers read and recorded per batch.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be sent without creating or sending.',
+        )
+
+    def handle(self, *args, **options):
+        if options['issue']:
+            try:
+                issue = NewsletterIssue.objects.get(pk=options['issue'])
+            except NewsletterIssue.DoesNotExist:
+                raise CommandError(f'No newsletter issue {options["issue"]}.')
+        elif options['dry_run']:
+            _, posts = new_posts(timezone.now())
+            subscribers = NewsletterSubscription.objects.filter(
+                is_active=True
+            ).count()
+            self.stdout.write(
+                f'A new issue of {posts.count()} post(s) would be sent to '
+                f'{subscribers} subscriber(s).'
+            )
+            return
+        else:
+            issue = build_issue()
+            if issue is None:
+                self.stdout.write('No posts published since the last issue.')
+                return
+
+        if options['dry_run']:
+            pending = pending_subscriptions(issue).count()
+            self.stdout.write(
+                f'Issue {issue.pk} would be sent to {pending} subscriber(s).'
+            )
+            return
+
+        sent, failed = dispatch(issue, batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Issue {issue.pk}: sent {sent} message(s).')
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'{failed} message(s) failed; re-run with --issue {issue.pk} '
+                'to retry them.'
+            ))
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+from blog.utils import html_to_text
+
+SQLITE_FTS_TABLE = 'blog_post_fts'
+POSTGRES_SEARCH_TABLE = 'blog_post_search'
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the full-text index table for the current database vendor
+    and fill it from the existing posts.
+    """
+    vendor = schema_editor.connection.vendor
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.only('pk', 'title', 'excerpt', 'content')
+
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5('
+            f"title, excerpt, body, tokenize = 'porter unicode61')"
+        )
+        for post in posts.iterator():
+            schema_editor.execute(
+                f'INSERT INTO {SQLITE_FTS_TABLE} '
+                f'(rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)',
+                [post.pk, post.title, post.excerpt,
+                 html_to_text(post.content)]
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {POSTGRES_SEARCH_TABLE} ('
+            f'post_id bigint PRIMARY KEY '
+            f'REFERENCES blog_post (id) ON DELETE CASCADE, '
+            f'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {POSTGRES_SEARCH_TABLE}_document_gin '
+            f'ON {POSTGRES_SEARCH_TABLE} USING GIN (document)'
+        )
+        for post in posts.iterator():
+            schema_editor.execute(
+                f'INSERT INTO {POSTGRES_SEARCH_TABLE} (post_id, document) '
+                f"VALUES (%s, setweight(to_tsvector('english', %s), 'A') || "
+                f"setweight(to_tsvector('english', %s), 'B') || "
+                f"setweight(to_tsvector('english', %s), 'D'))",
+                [post.pk, post.title, post.excerpt,
+                 html_to_text(post.content)]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'DROP TABLE IF EXISTS {POSTGRES_SEARCH_TABLE}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_newslettersubscription_alter_post_content_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+REACTION_TYPES = ['like', 'love', 'laugh', 'wow', 'sad', 'angry']
+
+
+def backfill_counters(apps, schema_editor):
+    """Fill the new counters from the existing comments and reactions."""
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    PostReaction = apps.get_model('blog', 'PostReaction')
+
+    def count(queryset):
+        counts = queryset.filter(post=OuterRef('pk')).order_by().values(
+            'post').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    updates = {'comment_count': count(Comment.objects.filter(active=True))}
+    for reaction_type in REACTION_TYPES:
+        updates[f'{reaction_type}_count'] = count(
+            PostReaction.objects.filter(reaction_type=reaction_type)
+        )
+    Post.objects.update(**updates)
+
+
+def counter_field():
+    return models.PositiveIntegerField(default=0, editable=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=counter_field(),
+        ),
+    ] + [
+        migrations.AddField(
+            model_name='post',
+            name=f'{reaction_type}_count',
+            field=counter_field(),
+        )
+        for reaction_type in REACTION_TYPES
+    ] + [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
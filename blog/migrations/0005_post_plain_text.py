@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+from blog.utils import estimate_reading_time, html_to_text
+
+
+def process_existing_posts(apps, schema_editor):
+    """Derive the text fields of existing posts from their content."""
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('pk', 'content').iterator(chunk_size=500):
+        post.plain_text = html_to_text(post.content)
+        post.word_count = len(post.plain_text.split())
+        post.reading_time = estimate_reading_time(post.word_count)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(
+                batch, ['plain_text', 'word_count', 'reading_time']
+            )
+            batch = []
+    Post.objects.bulk_update(
+        batch, ['plain_text', 'word_count', 'reading_time']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='plain_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(
+                default=1, editable=False, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            process_existing_posts, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,146 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:30
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+REACTION_TYPES = ['like', 'love', 'laugh', 'wow', 'sad', 'angry']
+# ReadingProgress.COMPLETED_PERCENTAGE
+COMPLETED_PERCENTAGE = 90
+
+
+def _per_day(queryset, date_field):
+    """``(post_id, date, count)`` of ``queryset`` grouped per post and day."""
+    rows = queryset.annotate(day=TruncDate(date_field)).values(
+        'post_id', 'day'
+    ).annotate(total=Count('pk')).order_by()
+    return [(row['post_id'], row['day'], row['total']) for row in rows]
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Fill the new rollups from the existing posts, comments, reactions and
+    reading progress. Views were only counted per post so far; each
+    post's views are credited to the day it was published.
+    """
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    PostReaction = apps.get_model('blog', 'PostReaction')
+    ReadingProgress = apps.get_model('blog', 'ReadingProgress')
+    PostDailyStats = apps.get_model('blog', 'PostDailyStats')
+    AuthorDailyStats = apps.get_model('blog', 'AuthorDailyStats')
+
+    post_rows = defaultdict(Counter)
+    for post_id, day, total in _per_day(
+        Comment.objects.filter(active=True), 'created_at'
+    ):
+        post_rows[post_id, day]['comment_count'] += total
+    for reaction_type in REACTION_TYPES:
+        for post_id, day, total in _per_day(
+            PostReaction.objects.filter(reaction_type=reaction_type),
+            'created_at'
+        ):
+            post_rows[post_id, day][f'{reaction_type}_count'] += total
+    # The day a reader finished is not stored; their last read is the
+    # closest approximation
+    for post_id, day, total in _per_day(
+        ReadingProgress.objects.filter(
+            progress_percentage__gte=COMPLETED_PERCENTAGE
+        ),
+        'last_read_at'
+    ):
+        post_rows[post_id, day]['completed_reads'] += total
+
+    authors = {}
+    author_rows = defaultdict(Counter)
+    posts = Post.objects.annotate(day=TruncDate('published_at')).values_list(
+        'pk', 'author_id', 'status', 'day', 'view_count'
+    )
+    for post_id, author_id, status, day, views in posts.iterator():
+        authors[post_id] = author_id
+        if status == 'published' and day is not None:
+            author_rows[author_id, day]['published_posts'] += 1
+            if views:
+                post_rows[post_id, day]['view_count'] += views
+
+    for (post_id, day), counts in post_rows.items():
+        author_rows[authors[post_id], day].update(counts)
+
+    PostDailyStats.objects.bulk_create(
+        [
+            PostDailyStats(post_id=post_id, date=day, **counts)
+            for (post_id, day), counts in post_rows.items()
+        ],
+        batch_size=500,
+    )
+    AuthorDailyStats.objects.bulk_create(
+        [
+            AuthorDailyStats(author_id=author_id, date=day, **counts)
+            for (author_id, day), counts in author_rows.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_plain_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('love_count', models.PositiveIntegerField(default=0)),
+                ('laugh_count', models.PositiveIntegerField(default=0)),
+                ('wow_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('angry_count', models.PositiveIntegerField(default=0)),
+                ('completed_reads', models.PositiveIntegerField(default=0)),
+                ('published_posts', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'author daily stats',
+                'ordering': ['date'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['date'], name='blog_author_date_7809c5_idx')],
+                'unique_together': {('author', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PostDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('love_count', models.PositiveIntegerField(default=0)),
+                ('laugh_count', models.PositiveIntegerField(default=0)),
+                ('wow_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('angry_count', models.PositiveIntegerField(default=0)),
+                ('completed_reads', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='blog.post')),
+            ],
+            options={
+                'verbose_name_plural': 'post daily stats',
+                'ordering': ['date'],
+                'abstract': False,
+                'unique_together': {('post', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='blog.post')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='blog_postvi_hour_2cb678_idx')],
+                'unique_together': {('post', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from blog import related
+from blog.utils import term_vector
+
+
+def compute_term_vectors(apps, schema_editor):
+    """Derive the term vectors of existing posts from their text."""
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    posts = Post.objects.only('pk', 'title', 'plain_text')
+    for post in posts.iterator(chunk_size=500):
+        post.term_vector = term_vector(f'{post.title} {post.plain_text}')
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, ['term_vector'])
+            batch = []
+    Post.objects.bulk_update(batch, ['term_vector'])
+
+
+def build_related_posts(apps, schema_editor):
+    """Compute the related lists of existing posts from their vectors."""
+    related.rebuild(
+        apps.get_model('blog', 'Post'), apps.get_model('blog', 'RelatedPost')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_view_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='term_vector',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_from', to='blog.post')),
+            ],
+            options={
+                'ordering': ['post', 'rank'],
+                'indexes': [models.Index(fields=['post', 'rank'], name='blog_relate_post_id_0c405e_idx')],
+                'unique_together': {('post', 'related')},
+            },
+        ),
+        migrations.RunPython(
+            compute_term_vectors, migrations.RunPython.noop
+        ),
+        migrations.RunPython(
+            build_related_posts, migrations.RunPython.noop
+        ),
+    ]
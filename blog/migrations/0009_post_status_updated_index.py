@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_related_posts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', 'updated_at'], name='blog_post_status_0e6c1b_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:20
+
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """
+    Give every user a profile. Profiles are now only created with their
+    user, no longer whenever a user without one is saved.
+    """
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('blog', 'UserProfile')
+    missing = User.objects.filter(userprofile__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in missing.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_newsletter_dispatch'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_missing_profiles, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_create_missing_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StagedView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='blog.post')),
+            ],
+        ),
+    ]
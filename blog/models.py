@@ -1,10 +1,13 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Substr
+from django.db.models.query import ModelIterable
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
 from ckeditor_uploader.fields import RichTextUploadingField
-from PIL import Image
+
+from .utils import estimate_reading_time, html_to_text, term_vector
 
 
 class Category(models.Model):
@@ -79,19 +82,28 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Avatar name as last loaded or saved; None when unknown
+    _stored_avatar = None
+
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        # Resize avatar image to improve page load performance
-        if self.avatar:
-            img = Image.open(self.avatar.path)
-            # Only resize if image is larger than 300x300 pixels
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)  # Maintain aspect ratio
-                img.save(self.avatar.path)
+        if 'avatar' not in self.get_deferred_fields():
+            self._stored_avatar = self.avatar.name or ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'avatar' not in instance.get_deferred_fields():
+            instance._stored_avatar = instance.avatar.name or ''
+        return instance
+
+    def avatar_changed(self):
+        """Whether the avatar differs from the one last loaded or saved."""
+        return (self._stored_avatar is None or
+                (self.avatar.name or '') != self._stored_avatar)
 
     def can_create_posts(self):
         """Check if user can create blog posts"""
@@ -102,6 +114,56 @@ class UserProfile(models.Model):
         return self.role == 'admin'
 
 
+# Reaction types, shared by PostReaction and the per-type counters on Post
+REACTION_CHOICES = [
+    ('like', 'Like'),
+    ('love', 'Love'),
+    ('laugh', 'Laugh'),
+    ('wow', 'Wow'),
+    ('sad', 'Sad'),
+    ('angry', 'Angry'),
+]
+
+
+class DeferredContentError(Exception):
+    """
+    Raised when a post loaded for a list page lazily loads a heavy field.
+
+    Deliberately not an AttributeError, which templates would swallow.
+    """
+
+
+class ListModeIterable(ModelIterable):
+    """Yields posts flagged so that deferred heavy fields stay unloaded."""
+
+    def __iter__(self):
+        for post in super().__iter__():
+            post._list_mode = True
+            yield post
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(status='published')
+
+    def for_list(self):
+        """
+        Load only what post cards render.
+
+        The ``content``, ``plain_text`` and ``term_vector`` columns are
+        deferred and a short ``summary`` prefix of the plain text is
+        selected instead, for use as the excerpt fallback. Author and
+        category are joined. Touching a deferred heavy field on the
+        returned posts raises ``DeferredContentError`` instead of running a
+        query per row.
+        """
+        queryset = self.defer(*Post.LIST_DEFERRED_FIELDS).annotate(
+            summary=Substr('plain_text', 1, Post.LIST_SUMMARY_LENGTH)
+        ).select_related('author', 'category')
+        queryset._iterable_class = ListModeIterable
+        return queryset
+
+
 class Post(models.Model):
     """
     Main blog post model with full content management features.
@@ -146,12 +208,45 @@ class Post(models.Model):
     view_count = models.PositiveIntegerField(default=0)
     featured = models.BooleanField(default=False)
 
+    # Denormalized counters maintained by blog.signals (see blog/counters.py)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    love_count = models.PositiveIntegerField(default=0, editable=False)
+    laugh_count = models.PositiveIntegerField(default=0, editable=False)
+    wow_count = models.PositiveIntegerField(default=0, editable=False)
+    sad_count = models.PositiveIntegerField(default=0, editable=False)
+    angry_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Derived from content on save (see process_content)
+    plain_text = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(
+        default=1, editable=False, help_text="Minutes"
+    )
+    # Most frequent terms of the title and text (see blog.related)
+    term_vector = models.JSONField(default=dict, editable=False)
+
+    # Fields recomputed whenever content is saved
+    CONTENT_DERIVED_FIELDS = (
+        'plain_text', 'word_count', 'reading_time', 'term_vector'
+    )
+
+    # Heavy columns left out of list pages, and the length of the plain
+    # text prefix they select instead (see PostQuerySet.for_list)
+    LIST_DEFERRED_FIELDS = ('content', 'plain_text', 'term_vector')
+    LIST_SUMMARY_LENGTH = 300
+    _list_mode = False
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         # Most recent published posts first
         ordering = ['-published_at', '-created_at']
         indexes = [
             # Optimize queries for published posts by date
             models.Index(fields=['status', 'published_at']),
+            # Latest update of published posts (conditional GET)
+            models.Index(fields=['status', 'updated_at']),
             # Optimize author's post queries
             models.Index(fields=['author', 'status']),
             # Optimize category-based filtering
@@ -171,26 +266,177 @@ class Post(models.Model):
         # Set published_at timestamp when status changes to published
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
+            # Counted once in the author's rollups (see blog.signals)
+            self._publishing = True
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Deferred instances only save their loaded fields, so skip
+            # processing (and loading) content that was never fetched;
+            # the title still feeds the term vector
+            if 'content' not in self.get_deferred_fields():
+                self.process_content()
+            elif self.pk is not None:
+                self.refresh_term_vector()
+        elif 'content' in update_fields:
+            self.process_content()
+            kwargs['update_fields'] = (
+                set(update_fields) | set(self.CONTENT_DERIVED_FIELDS)
+            )
+        elif 'title' in update_fields:
+            self.refresh_term_vector()
+            kwargs['update_fields'] = set(update_fields) | {'term_vector'}
         super().save(*args, **kwargs)
 
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        if (self._list_mode and fields and
+                set(fields) & set(self.LIST_DEFERRED_FIELDS)):
+            raise DeferredContentError(
+                f'{", ".join(fields)} of post {self.pk} was deferred by '
+                f'for_list(); render the summary or load the post without '
+                f'for_list().'
+            )
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
+    def process_content(self):
+        """Strip the HTML content once and store its text statistics."""
+        self.plain_text = html_to_text(self.content)
+        self.word_count = len(self.plain_text.split())
+        self.reading_time = estimate_reading_time(self.word_count)
+        self.term_vector = term_vector(f'{self.title} {self.plain_text}')
+
+    def refresh_term_vector(self):
+        """
+        Recompute the term vector after a title change, reading the stored
+        text when it was not loaded.
+        """
+        if 'plain_text' in self.get_deferred_fields():
+            plain_text = Post.objects.filter(pk=self.pk).values_list(
+                'plain_text', flat=True
+            ).first() or ''
+        else:
+            plain_text = self.plain_text
+        self.term_vector = term_vector(f'{self.title} {plain_text}')
+
     def is_published(self):
         return self.status == 'published' and self.published_at
 
     def get_comment_count(self):
-        return self.comments.filter(active=True).count()
+        return self.comment_count
+
+    def get_reaction_counts(self):
+        """Reaction counts keyed by reaction type."""
+        return {
+            reaction_type: getattr(self, f'{reaction_type}_count')
+            for reaction_type, _ in REACTION_CHOICES
+        }
+
+    def get_reaction_total(self):
+        return sum(self.get_reaction_counts().values())
 
     def get_reading_time(self):
-        """Estimate reading time based on content length"""
-        words_per_minute = 200  # Average adult reading speed
-        word_count = len(self.content.split())
-        reading_time = word_count / words_per_minute
-        return max(1, round(reading_time))  # Minimum 1 minute
+        """Estimated reading time in minutes, computed on save"""
+        return self.reading_time
+
+
+class CountedModelMixin:
+    """
+    Tracks which values of a row are reflected in the Post counters.
 
+    ``counted_fields`` are remembered when a row is loaded and after each
+    save, so the signal handlers can tell how the counters must change
+    (e.g. a comment being deactivated) without re-reading the row. Saves
+    run in a transaction so the counter update commits or rolls back
+    together with the row.
+    """
+    counted_fields = ()
+    # None: not counted yet (unsaved); UNKNOWN: loaded with deferred fields
+    UNKNOWN = object()
+    _counted_state = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if any(f in instance.get_deferred_fields()
+               for f in instance.counted_attnames()):
+            instance._counted_state = cls.UNKNOWN
+        else:
+            instance.remember_counted_state()
+        return instance
+
+    @classmethod
+    def counted_attnames(cls):
+        return [cls._meta.get_field(name).attname
+                for name in cls.counted_fields]
+
+    def current_counted_state(self):
+        return tuple(getattr(self, attname)
+                     for attname in self.counted_attnames())
+
+    def remember_counted_state(self):
+        self._counted_state = self.current_counted_state()
 
-class Comment(models.Model):
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+# Reply depths indented further on post pages; deeper replies line up
+# with the last of them
+REPLY_INDENT_LEVELS = 4
+
+
+class CommentManager(models.Manager):
+    def tree_for_post(self, post):
+        """
+        Load the active comment threads of a post in a single query.
+
+        All active comments are fetched at once with their authors and
+        author profiles joined, then linked in Python: each comment gets a
+        ``thread_replies`` list of its active replies, at any depth.
+        Returns the top-level comments in creation order. Replies to an
+        inactive comment are hidden together with it.
+
+        For templates, which should not recurse, each top-level comment
+        also gets ``flat_replies``: its whole thread in reading order,
+        every reply with its ``depth`` (1 for direct replies) and an
+        ``indent`` capped at ``REPLY_INDENT_LEVELS``.
+        """
+        comments = list(
+            self.filter(post=post, active=True)
+            .select_related('author__userprofile')
+            .order_by('created_at', 'pk')
+        )
+        by_id = {comment.pk: comment for comment in comments}
+        roots = []
+        for comment in comments:
+            comment.thread_replies = []
+        for comment in comments:
+            if comment.parent_id is None:
+                roots.append(comment)
+            elif comment.parent_id in by_id:
+                by_id[comment.parent_id].thread_replies.append(comment)
+        for root in roots:
+            root.flat_replies = []
+            # Depth first without recursion, however long the thread
+            stack = [(reply, 1) for reply in reversed(root.thread_replies)]
+            while stack:
+                reply, depth = stack.pop()
+                reply.depth = depth
+                reply.indent = min(depth, REPLY_INDENT_LEVELS)
+                root.flat_replies.append(reply)
+                stack.extend(
+                    (child, depth + 1)
+                    for child in reversed(reply.thread_replies)
+                )
+        return roots
+
+
+class Comment(CountedModelMixin, models.Model):
     """
     Comment system for blog posts with moderation support.
     """
+    counted_fields = ('post', 'active')
+
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name='comments'
     )
@@ -204,6 +450,8 @@ class Comment(models.Model):
         related_name='replies'  # Enables hierarchical comment threading
     )
 
+    objects = CommentManager()
+
     class Meta:
         ordering = ['created_at']
         indexes = [
@@ -235,19 +483,107 @@ class NewsletterSubscription(models.Model):
         return self.email
 
 
-class PostReaction(models.Model):
+class NewsletterIssue(models.Model):
     """
-    Post reaction system (likes, loves, etc.).
+    A digest of the posts published since the previous issue, mailed to
+    active subscribers by ``blog.newsletter``.
     """
-    REACTION_CHOICES = [
-        ('like', 'Like'),
-        ('love', 'Love'),
-        ('laugh', 'Laugh'),
-        ('wow', 'Wow'),
-        ('sad', 'Sad'),
-        ('angry', 'Angry'),
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
     ]
 
+    subject = models.CharField(max_length=200)
+    posts = models.ManyToManyField(Post, related_name='newsletter_issues')
+    # Posts published in [period_start, period_end) are included
+    period_start = models.DateTimeField(null=True, blank=True)
+    period_end = models.DateTimeField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='draft'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class NewsletterDelivery(models.Model):
+    """
+    Outcome of mailing one issue to one subscriber. Subscribers with a
+    ``sent`` delivery are skipped when an interrupted run is resumed.
+    """
+    STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    issue = models.ForeignKey(
+        NewsletterIssue, on_delete=models.CASCADE, related_name='deliveries'
+    )
+    subscription = models.ForeignKey(
+        NewsletterSubscription, on_delete=models.CASCADE,
+        related_name='deliveries'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    attempted_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('issue', 'subscription')
+        ordering = ['issue', 'subscription']
+        verbose_name_plural = 'newsletter deliveries'
+
+    def __str__(self):
+        return f'{self.issue_id} to {self.subscription_id}: {self.status}'
+
+
+class PostReactionManager(models.Manager):
+    def toggle(self, post, user, reaction_type):
+        """
+        Toggle ``user``'s reaction to ``post``: add it, switch it to
+        ``reaction_type`` or, if it already is that type, remove it.
+
+        Runs as one transaction around a locked read of the user's row and
+        a single insert, update or delete, so the counter signals see
+        exactly one change. A concurrent first click that inserts the row
+        before us turns this click into a toggle of that row. Returns the
+        user's reaction type afterwards, or None if it was removed.
+        """
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    return self._toggle(post, user, reaction_type)
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    def _toggle(self, post, user, reaction_type):
+        reaction = self.select_for_update().filter(
+            post=post, user=user
+        ).first()
+        if reaction is None:
+            self.create(post=post, user=user, reaction_type=reaction_type)
+            return reaction_type
+        if reaction.reaction_type == reaction_type:
+            reaction.delete()
+            return None
+        reaction.reaction_type = reaction_type
+        reaction.save(update_fields=['reaction_type'])
+        return reaction_type
+
+
+class PostReaction(CountedModelMixin, models.Model):
+    """
+    Post reaction system (likes, loves, etc.).
+    """
+    REACTION_CHOICES = REACTION_CHOICES
+    counted_fields = ('post', 'reaction_type')
+
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name='reactions'
     )
@@ -259,6 +595,8 @@ class PostReaction(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PostReactionManager()
+
     class Meta:
         unique_together = ('post', 'user')  # One reaction per user per post
         ordering = ['-created_at']
@@ -275,6 +613,9 @@ class ReadingProgress(models.Model):
     """
     Track user reading progress on posts.
     """
+    # Progress at which a post counts as read in the analytics rollups
+    COMPLETED_PERCENTAGE = 90
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     progress_percentage = models.PositiveIntegerField(default=0)
@@ -288,3 +629,149 @@ class ReadingProgress(models.Model):
     def __str__(self):
         return (f'{self.user.username} - {self.post.title} '
                 f'({self.progress_percentage}%)')
+
+
+class RelatedPost(models.Model):
+    """
+    One of the most similar posts to ``post``, precomputed by
+    ``blog.related``; ``rank`` 0 is the closest.
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related_links'
+    )
+    related = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related_from'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['post', 'rank']
+        unique_together = ('post', 'related')
+        indexes = [
+            # Serves a post's related list in rank order
+            models.Index(fields=['post', 'rank']),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class PostViewBucket(models.Model):
+    """
+    Views of a post during one hour, written by the view count buffer and
+    scored by ``blog.trending``.
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='view_buckets'
+    )
+    # Start of the hour
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'hour')
+        ordering = ['-hour']
+        indexes = [
+            # Trending scans only the most recent hours
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} at {self.hour:%Y-%m-%d %H:00}'
+
+
+class StagedView(models.Model):
+    """
+    Views of a post handed over by a worker's view count buffer and not
+    yet added to the post (see ``blog.buffers``). Posts deleted in the
+    meantime are skipped when the views are applied.
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+'
+    )
+    count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.count} view(s) of {self.post_id}'
+
+
+class StagedReadingProgress(models.Model):
+    """
+    Reading progress handed over by a worker's buffer and not yet written
+    to ``ReadingProgress`` (see ``blog.buffers``).
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+'
+    )
+    progress_percentage = models.PositiveIntegerField()
+
+    def __str__(self):
+        return (f'{self.user_id} at {self.progress_percentage}% of '
+                f'{self.post_id}')
+
+
+class DailyStats(models.Model):
+    """
+    Engagement recorded on one day, maintained incrementally by
+    ``blog.rollups`` so analytics never aggregate the source tables.
+
+    Comments and reactions are counted on the day they were made, views
+    and completed reads on the day they were written.
+    """
+    date = models.DateField()
+    view_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    laugh_count = models.PositiveIntegerField(default=0)
+    wow_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    angry_count = models.PositiveIntegerField(default=0)
+    # Readers whose progress reached ReadingProgress.COMPLETED_PERCENTAGE
+    completed_reads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ['date']
+
+
+class PostDailyStats(DailyStats):
+    """
+    Daily analytics rollup of one post.
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='daily_stats'
+    )
+
+    class Meta(DailyStats.Meta):
+        unique_together = ('post', 'date')
+        verbose_name_plural = 'post daily stats'
+
+    def __str__(self):
+        return f'{self.post_id} on {self.date}'
+
+
+class AuthorDailyStats(DailyStats):
+    """
+    Daily analytics rollup of all posts by one author.
+    """
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='daily_stats'
+    )
+    published_posts = models.PositiveIntegerField(default=0)
+
+    class Meta(DailyStats.Meta):
+        unique_together = ('author', 'date')
+        # Site-wide totals aggregate every author's rows by date
+        indexes = [models.Index(fields=['date'])]
+        verbose_name_plural = 'author daily stats'
+
+    def __str__(self):
+        return f'{self.author_id} on {self.date}'
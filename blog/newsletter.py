@@ -0,0 +1,232 @@
+"""
+Newsletter dispatch.
+
+An issue collects the posts published since the previous issue
+(``build_issue()``). ``dispatch()`` mails it to every active subscriber:
+
+* the text and HTML bodies are rendered once per issue; each message
+  only substitutes the recipient's unsubscribe link,
+* subscribers are streamed from the database in chunks of
+  ``BLOG_NEWSLETTER_BATCH_SIZE`` instead of being loaded at once,
+* each batch is handed to the email backend in one ``send_messages()``
+  call, over one connection opened once per run,
+* the outcome for each recipient is written as a ``NewsletterDelivery``
+  after each batch.
+
+A batch the backend rejects does not say which message failed, so its
+messages are then sent one at a time to find out; recipients before the
+failing one may get the issue twice. Subscribers with a ``sent``
+delivery are skipped, so running ``dispatch()`` again resumes an
+interrupted issue and retries failures. A run that dies mid-batch
+re-sends at most that batch.
+"""
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.core import signing
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    NewsletterDelivery, NewsletterIssue, NewsletterSubscription, Post,
+)
+
+logger = logging.getLogger(__name__)
+
+# Stands in for the recipient's unsubscribe link in rendered bodies
+UNSUBSCRIBE_PLACEHOLDER = '__UNSUBSCRIBE_URL__'
+UNSUBSCRIBE_SALT = 'blog.newsletter.unsubscribe'
+
+TEXT_TEMPLATE = 'blog/email/newsletter.txt'
+HTML_TEMPLATE = 'blog/email/newsletter.html'
+
+
+def absolute_url(path):
+    return settings.BLOG_SITE_URL.rstrip('/') + path
+
+
+def unsubscribe_token(subscription_id):
+    return signing.dumps(subscription_id, salt=UNSUBSCRIBE_SALT)
+
+
+def subscription_from_token(token):
+    """The subscription id signed into ``token``, or None if invalid."""
+    try:
+        return signing.loads(token, salt=UNSUBSCRIBE_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def unsubscribe_url(subscription_id):
+    return absolute_url(reverse(
+        'blog:newsletter_unsubscribe',
+        args=[unsubscribe_token(subscription_id)]
+    ))
+
+
+def new_posts(now):
+    """
+    Return ``(start, posts)``: the end of the previous issue's period and
+    the posts published between it and ``now``.
+    """
+    previous = NewsletterIssue.objects.order_by('-period_end').first()
+    start = previous.period_end if previous else None
+    posts = Post.objects.published().filter(published_at__lt=now)
+    if start is not None:
+        posts = posts.filter(published_at__gte=start)
+    return start, posts
+
+
+def build_issue(now=None):
+    """
+    Create an issue of the posts published since the previous issue, or
+    return None if there are none.
+    """
+    now = now or timezone.now()
+    start, posts = new_posts(now)
+    post_ids = list(posts.values_list('pk', flat=True))
+    if not post_ids:
+        return None
+    issue = NewsletterIssue.objects.create(
+        subject=f'New on the blog: {len(post_ids)} post(s)',
+        period_start=start, period_end=now,
+    )
+    issue.posts.set(post_ids)
+    return issue
+
+
+def render_issue(issue):
+    """
+    Render the ``(text, html)`` bodies of ``issue`` with
+    ``UNSUBSCRIBE_PLACEHOLDER`` in place of the unsubscribe link.
+    """
+    posts = list(
+        issue.posts.for_list().order_by('-published_at')
+    )
+    for post in posts:
+        post.absolute_url = absolute_url(post.get_absolute_url())
+    context = {
+        'issue': issue,
+        'posts': posts,
+        'site_url': settings.BLOG_SITE_URL,
+        'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
+    }
+    return (render_to_string(TEXT_TEMPLATE, context),
+            render_to_string(HTML_TEMPLATE, context))
+
+
+def pending_subscriptions(issue):
+    """Active subscribers that have not been sent ``issue`` yet."""
+    sent = NewsletterDelivery.objects.filter(
+        issue=issue, subscription=OuterRef('pk'), status='sent'
+    )
+    return NewsletterSubscription.objects.filter(is_active=True).filter(
+        ~Exists(sent)
+    )
+
+
+def _send_one(issue, subscription_id, message):
+    """Send one message; returns ``(subscription_id, error)``."""
+    try:
+        message.send()
+    except Exception as exc:
+        logger.warning(
+            'Could not send newsletter %s to %s: %s',
+            issue.pk, message.to[0], exc
+        )
+        return subscription_id, str(exc) or repr(exc)
+    return subscription_id, ''
+
+
+def _message(issue, text, html, subscription_id, email, connection):
+    url = unsubscribe_url(subscription_id)
+    message = EmailMultiAlternatives(
+        subject=issue.subject,
+        body=text.replace(UNSUBSCRIBE_PLACEHOLDER, url),
+        to=[email],
+        connection=connection,
+        headers={'List-Unsubscribe': f'<{url}>'},
+    )
+    message.attach_alternative(
+        html.replace(UNSUBSCRIBE_PLACEHOLDER, url), 'text/html'
+    )
+    return message
+
+
+def _record(issue, results):
+    """Upsert the delivery state of one batch."""
+    now = timezone.now()
+    NewsletterDelivery.objects.bulk_create(
+        [
+            NewsletterDelivery(
+                issue=issue, subscription_id=subscription_id,
+                status='failed' if error else 'sent', error=error,
+                attempted_at=now,
+            )
+            for subscription_id, error in results
+        ],
+        update_conflicts=True,
+        unique_fields=['issue', 'subscription'],
+        update_fields=['status', 'error', 'attempted_at'],
+    )
+
+
+def dispatch(issue, batch_size=None, connection=None):
+    """
+    Mail ``issue`` to every pending subscriber.
+
+    Returns ``(sent, failed)`` counts for this run. The issue is marked
+    ``sent`` once no subscriber is left pending.
+    """
+    batch_size = batch_size or settings.BLOG_NEWSLETTER_BATCH_SIZE
+    text, html = render_issue(issue)
+    if issue.status == 'draft':
+        issue.status = 'sending'
+        issue.save(update_fields=['status'])
+
+    # Ordered by primary key so deliveries written during the scan never
+    # touch rows it has yet to reach
+    recipients = pending_subscriptions(issue).values_list(
+        'pk', 'email'
+    ).order_by('pk').iterator(chunk_size=batch_size)
+    connection = connection or get_connection()
+    sent = failed = 0
+    with connection:
+        while batch := list(islice(recipients, batch_size)):
+            batch_messages = [
+                (subscription_id, _message(
+                    issue, text, html, subscription_id, email, connection
+                ))
+                for subscription_id, email in batch
+            ]
+            try:
+                connection.send_messages(
+                    [message for _, message in batch_messages]
+                )
+            except Exception as exc:
+                logger.warning(
+                    'Could not send newsletter %s batch, sending its '
+                    'messages one at a time: %s', issue.pk, exc
+                )
+                results = [
+                    _send_one(issue, subscription_id, message)
+                    for subscription_id, message in batch_messages
+                ]
+            else:
+                results = [
+                    (subscription_id, '') for subscription_id, _ in batch
+                ]
+            _record(issue, results)
+            errors = sum(1 for _, error in results if error)
+            failed += errors
+            sent += len(results) - errors
+
+    if not pending_subscriptions(issue).exists():
+        issue.status = 'sent'
+        issue.sent_at = timezone.now()
+        issue.save(update_fields=['status', 'sent_at'])
+    return sent, failed
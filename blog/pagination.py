@@ -0,0 +1,226 @@
+"""
+Keyset (cursor) pagination for post listings.
+
+Instead of ``OFFSET n`` plus a ``COUNT(*)``, each page seeks past the
+last row of the previous page on the listing's sort key, e.g.
+``(published_at, id)``, which the ``(status, published_at)`` index
+serves directly however deep the page is. Pages are addressed by opaque
+``after`` / ``before`` cursors in the query string, so there are no page
+numbers or totals, only previous/next links.
+"""
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import date
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+# Numbered page links from before cursor pagination are ignored
+LEGACY_PAGE_PARAM = 'page'
+
+# Newest first, with the primary key breaking ties between equal dates
+POST_ORDERING = ('-published_at', '-pk')
+# Search results: best match first (see blog.search), then newest
+SEARCH_ORDERING = ('-search_rank',) + POST_ORDERING
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Cannot encode {value!r} in a cursor')
+
+
+class CursorPage(Sequence):
+    """One page of results with the cursors of its neighbours."""
+
+    def __init__(self, object_list, has_previous, has_next, paginator,
+                 params):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.paginator = paginator
+        self._params = params
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} item(s)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0])
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1])
+
+    def _querystring(self, **cursor):
+        params = self._params.copy()
+        for name in (AFTER_PARAM, BEFORE_PARAM, LEGACY_PAGE_PARAM):
+            params.pop(name, None)
+        params.update({
+            name: value for name, value in cursor.items() if value
+        })
+        return params.urlencode()
+
+    def first_querystring(self):
+        """Query string of the first page, keeping filters and search."""
+        return self._querystring()
+
+    def previous_querystring(self):
+        return self._querystring(**{BEFORE_PARAM: self.previous_cursor})
+
+    def next_querystring(self):
+        return self._querystring(**{AFTER_PARAM: self.next_cursor})
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` by seeking on ``ordering``.
+
+    ``ordering`` lists the sort key as ``order_by()`` arguments and must
+    end with a unique field (normally ``-pk``) so every row has a distinct
+    position. Key fields may be annotations such as ``search_rank``.
+    """
+
+    def __init__(self, queryset, per_page, ordering=POST_ORDERING):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def _values(self, obj):
+        return [getattr(obj, 'pk' if name == 'pk' else name)
+                for name in self.fields]
+
+    def encode_cursor(self, obj):
+        # Full isoformat: DjangoJSONEncoder would truncate microseconds,
+        # making cursors skip or repeat rows published in the same ms
+        data = json.dumps(self._values(obj), default=_encode_value)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return the key values stored in ``cursor``."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        try:
+            return [self._to_python(name, value)
+                    for name, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+
+    def _field(self, name):
+        """The model field or annotation output field of a key."""
+        meta = self.queryset.model._meta
+        try:
+            return meta.pk if name == 'pk' else meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as search ranks
+            return self.queryset.query.annotations[name].output_field
+
+    def _to_python(self, name, value):
+        # Cursors only ever hold scalars; None cannot be sought past
+        if value is None or isinstance(value, (bool, list, dict)):
+            raise InvalidCursor(value)
+        value = self._field(name).to_python(value)
+        if value is None:
+            raise InvalidCursor(value)
+        return value
+
+    def _seek(self, values, forward):
+        """Filter for rows after (or before) the position ``values``."""
+        condition = Q()
+        equal = Q()
+        for name, ordering, value in zip(self.fields, self.ordering, values):
+            descending = ordering.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering]
+
+    def get_page(self, params):
+        """
+        Return the page addressed by the cursors in ``params`` (a QueryDict
+        such as ``request.GET``). Missing or invalid cursors give the first
+        page. Runs a single query fetching one extra row to detect whether
+        there is a further page.
+        """
+        try:
+            if params.get(BEFORE_PARAM):
+                values = self.decode_cursor(params[BEFORE_PARAM])
+                rows = list(
+                    self.queryset.filter(self._seek(values, forward=False))
+                    .order_by(*self._reversed_ordering())[:self.per_page + 1]
+                )
+                has_previous = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return CursorPage(rows, has_previous, True, self, params)
+            if params.get(AFTER_PARAM):
+                values = self.decode_cursor(params[AFTER_PARAM])
+                queryset = self.queryset.filter(
+                    self._seek(values, forward=True)
+                )
+                has_previous = True
+            else:
+                queryset, has_previous = self.queryset, False
+        except InvalidCursor:
+            queryset, has_previous = self.queryset, False
+
+        rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], has_previous, has_next, self, params
+        )
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin replacing OFFSET pagination with cursor pagination.
+
+    Views set ``cursor_ordering`` (or override ``get_cursor_ordering()``)
+    to the sort key of their queryset; the queryset's own ordering is
+    replaced by it.
+    """
+    cursor_ordering = POST_ORDERING
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, page_size, self.get_cursor_ordering()
+        )
+        page = paginator.get_page(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
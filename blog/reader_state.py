@@ -0,0 +1,44 @@
+"""
+The current reader's own state on post lists.
+
+``attach()`` sets two attributes on every post shown on a page, for
+templates to render "you reacted" and "you've read 60%" badges:
+
+* ``user_reaction``: the reader's reaction type, or None,
+* ``user_progress``: the reader's reading progress percentage, or None.
+
+Both are loaded for all posts on the page at once (the main list, the
+featured, recent and trending posts) in two queries, whatever the number
+of posts. Progress still waiting in this process's write-behind buffer is
+included.
+
+Pages showing this state are personal, so their conditional GET
+validators include ``blog.cache.get_reader_state_version()``, which
+changes whenever one of the reader's reactions or progress rows is
+written.
+"""
+from .buffers import reading_progress
+from .models import PostReaction, ReadingProgress
+
+
+def attach(user, *post_lists):
+    """Set ``user_reaction`` and ``user_progress`` on every post given."""
+    posts = [post for post_list in post_lists for post in post_list]
+    for post in posts:
+        post.user_reaction = None
+        post.user_progress = None
+    if not user.is_authenticated or not posts:
+        return
+    post_ids = {post.pk for post in posts}
+    reactions = dict(PostReaction.objects.filter(
+        user=user, post_id__in=post_ids
+    ).values_list('post_id', 'reaction_type').order_by())
+    progress = dict(ReadingProgress.objects.filter(
+        user=user, post_id__in=post_ids
+    ).values_list('post_id', 'progress_percentage').order_by())
+    for post_id, percentage in reading_progress.pending_for(
+            user.pk, post_ids).items():
+        progress[post_id] = max(progress.get(post_id, 0), percentage)
+    for post in posts:
+        post.user_reaction = reactions.get(post.pk)
+        post.user_progress = progress.get(post.pk)
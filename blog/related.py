@@ -0,0 +1,351 @@
+"""
+Related post recommendations.
+
+The similarity of two published posts combines what they share:
+
+* tags, as the overlap of their tag sets (Jaccard index),
+* their category,
+* wording, as the cosine similarity of their TF-IDF weighted term
+  vectors (``Post.term_vector``, computed when content is saved).
+
+The ``RELATED_POSTS_COUNT`` most similar posts of each post are stored in
+``RelatedPost`` so post pages read them with one indexed lookup.
+
+Only posts sharing a tag, the category or one of a post's
+``CANDIDATE_TERMS`` most distinctive terms can score above zero, so
+those are the only candidates scored, at most ``MAX_CANDIDATES`` of them
+(the most recent). Term weights use document frequencies counted over
+all published posts, cached for ``FREQUENCY_TIMEOUT`` seconds.
+
+The signals in ``blog.signals`` call ``schedule()`` after a post's text,
+category, tags or status change. Changes are collected per transaction
+and refreshed once it commits, in the background worker pool shared with
+image renditions: the post's own list, the lists that include it and the
+lists it now enters. ``rebuild()`` recomputes every list; it is only run
+by the ``rebuild_related_posts`` command and after seeding.
+"""
+import heapq
+import logging
+import math
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from .cache import bump_generation
+from .images import get_executor
+from .models import Post, RelatedPost
+
+logger = logging.getLogger(__name__)
+
+# Neighbours stored per post; pages show the first few
+RELATED_POSTS_COUNT = 6
+
+TAG_WEIGHT = 0.4
+CATEGORY_WEIGHT = 0.2
+TEXT_WEIGHT = 0.4
+
+# Candidate neighbours scored per post
+CANDIDATE_TERMS = 10
+MAX_CANDIDATES = 500
+
+FREQUENCY_KEY = 'blog:related:frequencies'
+FREQUENCY_TIMEOUT = 60 * 60
+
+
+def document_frequencies():
+    """
+    ``(posts, {term: posts using it})`` over the published posts. Cached:
+    a few posts more or less barely move the weights.
+    """
+    frequencies = cache.get(FREQUENCY_KEY)
+    if frequencies is None:
+        vectors = Post.objects.published().values_list(
+            'term_vector', flat=True
+        ).order_by()
+        counts, total = Counter(), 0
+        for vector in vectors.iterator(chunk_size=1000):
+            counts.update(vector or {})
+            total += 1
+        frequencies = (total, dict(counts))
+        cache.set(FREQUENCY_KEY, frequencies, FREQUENCY_TIMEOUT)
+    return frequencies
+
+
+class Corpus:
+    """
+    Similarity features of the published posts ``post_ids``, or of every
+    published post when ``post_ids`` is None. Migrations pass their
+    historical ``post_model``.
+    """
+
+    def __init__(self, post_ids=None, post_model=Post):
+        posts = post_model.objects.filter(status='published')
+        tagged = post_model.tags.through.objects.filter(
+            post__status='published'
+        )
+        if post_ids is not None:
+            posts = posts.filter(pk__in=post_ids)
+            tagged = tagged.filter(post_id__in=post_ids)
+        self.categories = {}
+        self.published = {}
+        vectors = {}
+        for pk, category_id, published_at, vector in posts.values_list(
+                'pk', 'category_id', 'published_at', 'term_vector'
+        ).order_by():
+            self.categories[pk] = category_id
+            self.published[pk] = published_at
+            vectors[pk] = vector or {}
+
+        self.tags = defaultdict(set)
+        for post_id, tag_id in tagged.values_list('post_id', 'tag_id'):
+            self.tags[post_id].add(tag_id)
+
+        if post_ids is None:
+            # Every post is loaded: count the frequencies exactly
+            total = len(vectors)
+            frequency = Counter(
+                term for vector in vectors.values() for term in vector
+            )
+            cache.set(FREQUENCY_KEY, (total, dict(frequency)),
+                      FREQUENCY_TIMEOUT)
+        else:
+            total, frequency = document_frequencies()
+        # Terms used by many posts say little about any of them
+        self.vectors = {}
+        for pk, vector in vectors.items():
+            weighted = {
+                term: count * (math.log(
+                    (1 + total) / (1 + frequency.get(term, 0))) + 1)
+                for term, count in vector.items()
+            }
+            norm = math.sqrt(sum(w * w for w in weighted.values())) or 1
+            self.vectors[pk] = {
+                term: weight / norm for term, weight in weighted.items()
+            }
+
+    def __contains__(self, post_id):
+        return post_id in self.categories
+
+    def key_terms(self, post_id):
+        """The post's ``CANDIDATE_TERMS`` most distinctive terms."""
+        vector = self.vectors[post_id]
+        return heapq.nlargest(CANDIDATE_TERMS, vector, key=vector.get)
+
+    def similarity(self, first, second):
+        """Score in [0, 1] of how related two posts are."""
+        score = 0.0
+        first_tags, second_tags = self.tags[first], self.tags[second]
+        if first_tags and second_tags:
+            score += TAG_WEIGHT * (
+                len(first_tags & second_tags) / len(first_tags | second_tags)
+            )
+        category = self.categories[first]
+        if category is not None and category == self.categories[second]:
+            score += CATEGORY_WEIGHT
+        first_vector, second_vector = self.vectors[first], self.vectors[second]
+        if len(first_vector) > len(second_vector):
+            first_vector, second_vector = second_vector, first_vector
+        score += TEXT_WEIGHT * sum(
+            weight * second_vector.get(term, 0.0)
+            for term, weight in first_vector.items()
+        )
+        return score
+
+    def neighbours(self, post_id, candidates, limit=RELATED_POSTS_COUNT):
+        """The ``limit`` most similar candidates as ``(score, post_id)``."""
+        scores = (
+            (self.similarity(post_id, other), other)
+            for other in candidates if other != post_id and other in self
+        )
+        return heapq.nlargest(
+            limit, (pair for pair in scores if pair[0] > 0)
+        )
+
+
+def _candidates(corpus, post_id):
+    """Published posts that may share something with ``post_id``."""
+    condition = Q(term_vector__has_any_keys=corpus.key_terms(post_id))
+    if corpus.tags[post_id]:
+        condition |= Q(tags__in=corpus.tags[post_id])
+    if corpus.categories[post_id] is not None:
+        condition |= Q(category_id=corpus.categories[post_id])
+    return set(
+        Post.objects.published().filter(condition).exclude(pk=post_id)
+        .order_by('-published_at').values_list('pk', flat=True)
+        .distinct()[:MAX_CANDIDATES]
+    )
+
+
+def _write(lists, replace=True, model=RelatedPost):
+    """Store the lists given as ``{post_id: [(score, id)]}``."""
+    links = [
+        model(post_id=post_id, related_id=related_id, rank=rank, score=score)
+        for post_id, pairs in lists.items()
+        for rank, (score, related_id) in enumerate(pairs)
+    ]
+    with transaction.atomic():
+        if replace:
+            model.objects.filter(post_id__in=list(lists)).delete()
+        model.objects.bulk_create(links, batch_size=1000)
+    return len(links)
+
+
+def refresh(post_ids, lists=()):
+    """
+    Update related lists after ``post_ids`` changed, were unpublished or
+    were deleted: their own lists, the lists that include them and the
+    lists they now score high enough to enter. The lists of ``lists`` are
+    recomputed as well. Returns the ids of the lists written.
+    """
+    post_ids = set(post_ids)
+    # Lists losing or rescoring a post are recomputed from scratch
+    recompute = post_ids | set(lists) | set(
+        RelatedPost.objects.filter(related_id__in=post_ids)
+        .values_list('post_id', flat=True)
+    )
+    owners = Corpus(recompute)
+    candidates = {
+        post_id: _candidates(owners, post_id)
+        for post_id in recompute if post_id in owners
+    }
+    corpus = Corpus(recompute.union(*candidates.values()))
+    written = {post_id: [] for post_id in recompute}
+    for post_id, others in candidates.items():
+        written[post_id] = corpus.neighbours(post_id, others)
+
+    # Other lists only change by taking in a changed post that now beats
+    # their weakest link
+    entering = defaultdict(list)
+    for post_id in post_ids & set(candidates):
+        for owner in candidates[post_id] - recompute:
+            if owner in corpus:
+                score = corpus.similarity(owner, post_id)
+                if score > 0:
+                    entering[owner].append((score, post_id))
+    if entering:
+        stored = defaultdict(list)
+        for owner, related_id, score in RelatedPost.objects.filter(
+                post_id__in=list(entering)
+        ).values_list('post_id', 'related_id', 'score'):
+            stored[owner].append((score, related_id))
+        for owner, pairs in entering.items():
+            links = stored[owner]
+            weakest = (min(links)[0] if len(links) >= RELATED_POSTS_COUNT
+                       else 0)
+            if max(pairs)[0] > weakest:
+                written[owner] = heapq.nlargest(
+                    RELATED_POSTS_COUNT, links + pairs
+                )
+    _write(written)
+    bump_generation()
+    return set(written)
+
+
+def rebuild(post_model=Post, related_model=RelatedPost):
+    """
+    Recompute every related list; returns the number of links. Migrations
+    pass their historical models.
+    """
+    corpus = Corpus(post_model=post_model)
+    # Inverted indexes standing in for the candidate query
+    by_tag, by_category, by_term = (defaultdict(set) for _ in range(3))
+    for post_id in corpus.categories:
+        for tag_id in corpus.tags[post_id]:
+            by_tag[tag_id].add(post_id)
+        by_category[corpus.categories[post_id]].add(post_id)
+        for term in corpus.vectors[post_id]:
+            by_term[term].add(post_id)
+    by_category.pop(None, None)
+    newest_first = sorted(corpus.published, key=corpus.published.get,
+                          reverse=True)
+    position = {post_id: n for n, post_id in enumerate(newest_first)}
+
+    lists = {}
+    for post_id in corpus.categories:
+        others = set().union(
+            *(by_tag[tag_id] for tag_id in corpus.tags[post_id]),
+            by_category.get(corpus.categories[post_id], ()),
+            *(by_term[term] for term in corpus.key_terms(post_id)),
+        )
+        others.discard(post_id)
+        if len(others) > MAX_CANDIDATES:
+            others = sorted(others, key=position.get)[:MAX_CANDIDATES]
+        lists[post_id] = corpus.neighbours(post_id, others)
+    with transaction.atomic():
+        related_model.objects.all().delete()
+        count = _write(lists, replace=False, model=related_model)
+    bump_generation()
+    return count
+
+
+# Posts changed in the current transaction of each thread, as
+# (changed posts, lists to recompute)
+_local = threading.local()
+# Committed changes waiting for the background refresh
+_queued = (set(), set())
+_queue_lock = threading.Lock()
+_job_queued = False
+# One refresh at a time per process; they rewrite overlapping lists
+_refresh_lock = threading.Lock()
+
+
+def schedule(post_ids, lists_only=False):
+    """
+    Refresh related lists for ``post_ids`` once the current transaction
+    commits; with ``lists_only`` only their own lists are recomputed.
+    Every change of a transaction is refreshed together, once.
+
+    With ``BLOG_RELATED_SYNC`` enabled (tests) the refresh runs when the
+    transaction commits instead of in the background.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = (set(), set())
+    pending[1 if lists_only else 0].update(post_ids)
+    # The first callback to run takes everything; registering one per
+    # call keeps changes left by a rolled back transaction from stalling
+    transaction.on_commit(_committed)
+
+
+def _committed():
+    global _job_queued
+    pending, _local.pending = getattr(_local, 'pending', None), None
+    if pending is None:
+        return
+    if getattr(settings, 'BLOG_RELATED_SYNC', False):
+        with _refresh_lock:
+            refresh(*pending)
+        return
+    with _queue_lock:
+        _queued[0].update(pending[0])
+        _queued[1].update(pending[1])
+        if _job_queued:
+            return
+        _job_queued = True
+    get_executor().submit(_refresh_queued)
+
+
+def _refresh_queued():
+    global _job_queued
+    with _queue_lock:
+        post_ids, lists = set(_queued[0]), set(_queued[1])
+        _queued[0].clear()
+        _queued[1].clear()
+        _job_queued = False
+    close_old_connections()
+    try:
+        with _refresh_lock:
+            refresh(post_ids, lists)
+    except Exception:
+        # Lists stay as they were until the next change or rebuild
+        logger.exception('Could not refresh related posts of %s',
+                         sorted(post_ids | lists))
+    finally:
+        close_old_connections()
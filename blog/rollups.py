@@ -0,0 +1,269 @@
+"""
+Daily analytics rollups.
+
+``PostDailyStats`` and ``AuthorDailyStats`` hold one row per post (or
+author) and day with the views, comments, reactions by type and
+completed reads of that day. They are updated incrementally where the
+events are written:
+
+* views when ``blog.buffers.view_counts`` flushes,
+* comments and reactions by the counter signals in ``blog.signals``,
+* completed reads when ``blog.buffers.reading_progress`` flushes,
+* published posts (authors only) when a post is first published.
+
+The analytics dashboard reads only these tables. ``rebuild_rollups()``
+recomputes everything except views, which are not stored per day
+anywhere else, from the source tables.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest, TruncDate, TruncMonth
+
+from .counters import COUNTER_FIELDS, reaction_field
+from .models import (
+    AuthorDailyStats, Comment, Post, PostDailyStats, PostReaction,
+    ReadingProgress,
+)
+
+# Fields of the rollup tables, in the order charts list them
+POST_FIELDS = ['view_count'] + COUNTER_FIELDS + ['completed_reads']
+AUTHOR_FIELDS = ['published_posts'] + POST_FIELDS
+REACTION_FIELDS = [
+    field for field in COUNTER_FIELDS if field != 'comment_count'
+]
+
+# Longer date ranges are charted by month instead of by day
+MAX_DAILY_POINTS = 92
+# Longest range charted, in days: ten years, i.e. at most 121 months
+MAX_RANGE_DAYS = 3653
+
+
+def _apply(model, owner, deltas):
+    """
+    Add ``deltas``, a mapping of ``(owner_id, date)`` to field deltas, to
+    the rows of ``model``. Missing rows are inserted first so concurrent
+    writers only ever race on the database-side increments.
+    """
+    fields = {field.name for field in model._meta.fields}
+    by_change = defaultdict(lambda: defaultdict(list))
+    for (owner_id, day), changes in deltas.items():
+        changes = tuple(sorted(
+            (field, delta) for field, delta in changes.items()
+            if delta and field in fields
+        ))
+        if owner_id is not None and changes:
+            by_change[day][changes].append(owner_id)
+    if not by_change:
+        return
+    model.objects.bulk_create(
+        [
+            model(**{f'{owner}_id': owner_id, 'date': day})
+            for day, groups in by_change.items()
+            for owner_ids in groups.values()
+            for owner_id in owner_ids
+        ],
+        ignore_conflicts=True,
+    )
+    # One UPDATE per day and distinct set of deltas, e.g. every post
+    # viewed once since the last flush
+    for day, groups in by_change.items():
+        for changes, owner_ids in groups.items():
+            model.objects.filter(
+                **{f'{owner}_id__in': owner_ids, 'date': day}
+            ).update(**{
+                field: Greatest(F(field) + delta, 0)
+                for field, delta in changes
+            })
+
+
+def add(deltas):
+    """
+    Record ``deltas``, a mapping of ``(post_id, date)`` to field deltas,
+    in the post rollups and in the rollups of the posts' authors.
+    """
+    deltas = {key: changes for key, changes in deltas.items() if changes}
+    if not deltas:
+        return
+    authors = dict(
+        Post.objects.filter(
+            pk__in={post_id for post_id, _ in deltas}
+        ).values_list('pk', 'author_id').order_by()
+    )
+    # Posts deleted since the deltas were recorded are skipped
+    deltas = {
+        key: changes for key, changes in deltas.items() if key[0] in authors
+    }
+    by_author = defaultdict(lambda: defaultdict(int))
+    for (post_id, day), changes in deltas.items():
+        for field, delta in changes.items():
+            by_author[authors[post_id], day][field] += delta
+    with transaction.atomic(savepoint=False):
+        _apply(PostDailyStats, 'post', deltas)
+        _apply(AuthorDailyStats, 'author', by_author)
+
+
+def record(post_id, day, **changes):
+    """Record field deltas of one post on ``day``."""
+    add({(post_id, day): changes})
+
+
+def record_published(author_id, day):
+    """Count a newly published post in its author's rollups."""
+    _apply(AuthorDailyStats, 'author', {(author_id, day): {
+        'published_posts': 1
+    }})
+
+
+def _source_counts():
+    """
+    Yield ``((post_id, date), field, count)`` for every rollup field that
+    can be derived from the source tables.
+    """
+    comments = Comment.objects.filter(active=True).annotate(
+        day=TruncDate('created_at')
+    ).values('post_id', 'day').annotate(total=Count('pk')).order_by()
+    for row in comments:
+        yield (row['post_id'], row['day']), 'comment_count', row['total']
+
+    reactions = PostReaction.objects.annotate(
+        day=TruncDate('created_at')
+    ).values('post_id', 'day', 'reaction_type').annotate(
+        total=Count('pk')
+    ).order_by()
+    for row in reactions:
+        field = reaction_field(row['reaction_type'])
+        if field in REACTION_FIELDS:
+            yield (row['post_id'], row['day']), field, row['total']
+
+    # The day a reader finished is not stored; their last read is the
+    # closest approximation
+    completed = ReadingProgress.objects.filter(
+        progress_percentage__gte=ReadingProgress.COMPLETED_PERCENTAGE
+    ).annotate(day=TruncDate('last_read_at')).values(
+        'post_id', 'day'
+    ).annotate(total=Count('pk')).order_by()
+    for row in completed:
+        yield (row['post_id'], row['day']), 'completed_reads', row['total']
+
+
+def rebuild_rollups():
+    """
+    Recompute the rollups from the source tables, keeping recorded views.
+
+    Returns the number of post rollup rows written.
+    """
+    derived = [field for field in POST_FIELDS if field != 'view_count']
+    deltas = defaultdict(dict)
+    for key, field, total in _source_counts():
+        deltas[key][field] = total
+
+    published = Post.objects.published().annotate(
+        day=TruncDate('published_at')
+    ).values('author_id', 'day').annotate(total=Count('pk')).order_by()
+
+    with transaction.atomic():
+        PostDailyStats.objects.update(**dict.fromkeys(derived, 0))
+        # Author rows are rebuilt from the post rows, so views of posts
+        # that changed author move with them
+        AuthorDailyStats.objects.update(**dict.fromkeys(AUTHOR_FIELDS, 0))
+        add(deltas)
+        _apply(AuthorDailyStats, 'author', {
+            (row['author_id'], row['day']): {'published_posts': row['total']}
+            for row in published
+        })
+        views = PostDailyStats.objects.filter(view_count__gt=0).values(
+            'post__author_id', 'date'
+        ).annotate(total=Sum('view_count')).order_by()
+        _apply(AuthorDailyStats, 'author', {
+            (row['post__author_id'], row['date']): {
+                'view_count': row['total']
+            }
+            for row in views
+        })
+        PostDailyStats.objects.filter(
+            **dict.fromkeys(POST_FIELDS, 0)
+        ).delete()
+        AuthorDailyStats.objects.filter(
+            **dict.fromkeys(AUTHOR_FIELDS, 0)
+        ).delete()
+    return PostDailyStats.objects.count()
+
+
+def author_stats(start, end, author=None):
+    """Author rollup rows from ``start`` to ``end`` inclusive."""
+    queryset = AuthorDailyStats.objects.filter(date__range=(start, end))
+    if author is not None:
+        queryset = queryset.filter(author=author)
+    return queryset
+
+
+def totals(start, end, author=None):
+    """Sum of every author rollup field over the date range."""
+    sums = author_stats(start, end, author).aggregate(
+        **{field: Sum(field) for field in AUTHOR_FIELDS}
+    )
+    return {field: value or 0 for field, value in sums.items()}
+
+
+def _months(start, end):
+    """First days of the months from ``start`` to ``end``."""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(date(year, month, 1))
+        # Step by numbers, so the last month of date.max never overflows
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def time_series(start, end, author=None):
+    """
+    Return ``(period, points)`` for charting the date range: ``period`` is
+    ``'day'`` or ``'month'`` and ``points`` has one dict of summed fields
+    per period, including empty ones, keyed by its first ``date``.
+    Ranges longer than ``MAX_RANGE_DAYS`` are cut to their last
+    ``MAX_RANGE_DAYS`` days.
+    """
+    if (end - start).days >= MAX_RANGE_DAYS:
+        start = end - timedelta(days=MAX_RANGE_DAYS - 1)
+    if (end - start).days < MAX_DAILY_POINTS:
+        period, truncate = 'day', F('date')
+        dates = [start + timedelta(days=n)
+                 for n in range((end - start).days + 1)]
+    else:
+        period, truncate = 'month', TruncMonth('date')
+        dates = _months(start, end)
+    rows = author_stats(start, end, author).annotate(
+        period=truncate
+    ).values('period').annotate(
+        **{f'sum_{field}': Sum(field) for field in AUTHOR_FIELDS}
+    ).order_by()
+    by_period = {row['period']: row for row in rows}
+    points = []
+    for day in dates:
+        row = by_period.get(day, {})
+        point = {'date': day}
+        for field in AUTHOR_FIELDS:
+            point[field] = row.get(f'sum_{field}') or 0
+        points.append(point)
+    return period, points
+
+
+def top_posts(start, end, author=None, limit=5):
+    """
+    The ``limit`` most viewed posts over the date range, as dicts with
+    ``title``, ``slug`` and ``views``.
+    """
+    queryset = PostDailyStats.objects.filter(
+        date__range=(start, end), view_count__gt=0
+    )
+    if author is not None:
+        queryset = queryset.filter(post__author=author)
+    return list(
+        queryset.values(title=F('post__title'), slug=F('post__slug'))
+        .annotate(views=Sum('view_count'))
+        .order_by('-views', 'title')[:limit]
+    )
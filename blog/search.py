@@ -0,0 +1,223 @@
+"""
+Full-text search for blog posts.
+
+Posts are indexed from their plain text into a database specific inverted
+index, kept in sync by the Post signals in ``blog.signals``:
+
+* SQLite uses an FTS5 virtual table ranked with ``bm25()``
+* PostgreSQL uses a ``tsvector`` table with a GIN index ranked with
+  ``ts_rank()``
+
+Other databases fall back to case-insensitive substring matching. Views
+should only call ``search_posts()`` so they all share one search path.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# Relative weight of matches in each indexed column
+TITLE_WEIGHT = 10.0
+EXCERPT_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+
+def search_terms(query):
+    """Split a user query into plain word terms, dropping operators."""
+    return _TERM_RE.findall((query or '').lower())
+
+
+def post_document(post):
+    """Return the (title, excerpt, body) text indexed for a post."""
+    return post.title, post.excerpt, post.plain_text
+
+
+class BaseSearchBackend:
+    """
+    Interface shared by all search backends.
+
+    ``search()`` filters a Post queryset down to the matching posts,
+    annotates them with ``search_rank`` (higher is better) and orders
+    them best match first.
+    """
+
+    def index_post(self, post):
+        """Add or refresh a post in the index."""
+
+    def remove_post(self, post_id):
+        """Remove a post from the index."""
+
+    def clear(self):
+        """Remove every post from the index."""
+
+    def rebuild(self, posts):
+        """Reindex every post in ``posts``; returns the number indexed."""
+        count = 0
+        with transaction.atomic():
+            self.clear()
+            for post in posts.iterator():
+                self.index_post(post)
+                count += 1
+        return count
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed substring search for databases without full-text support."""
+
+    def search(self, queryset, query):
+        query = (query or '').strip()
+        if not query:
+            return queryset.none()
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(plain_text__icontains=query) |
+            Q(excerpt__icontains=query)
+        ).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).order_by('-published_at')
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """SQLite FTS5 index with prefix matching and bm25 ranking."""
+    table = 'blog_post_fts'
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, excerpt, body) '
+                f'VALUES (%s, %s, %s, %s)',
+                [post.pk, *post_document(post)]
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match_expression(self, query):
+        # Quote every term so user input can never form FTS5 syntax, and
+        # match prefixes so results appear while the user is typing
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        post_table = queryset.model._meta.db_table
+        matches = RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s',
+            [expression]
+        )
+        # bm25() is lower for better matches; negate so higher is better
+        rank = RawSQL(
+            f'SELECT -bm25({self.table}, {TITLE_WEIGHT}, {EXCERPT_WEIGHT}, '
+            f'{BODY_WEIGHT}) FROM {self.table} WHERE {self.table} MATCH %s '
+            f'AND rowid = {post_table}.id',
+            [expression], output_field=FloatField()
+        )
+        return queryset.filter(pk__in=matches).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-published_at')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL tsvector index (GIN) with ts_rank ranking."""
+    table = 'blog_post_search'
+    config = 'english'
+
+    def index_post(self, post):
+        title, excerpt, body = post_document(post)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (post_id, document) VALUES ('
+                f'%s, '
+                f"setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'D')) "
+                f'ON CONFLICT (post_id) DO UPDATE '
+                f'SET document = EXCLUDED.document',
+                [post.pk, self.config, title, self.config, excerpt,
+                 self.config, body]
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE post_id = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def tsquery(self, query):
+        # Terms are plain words, so they are safe inside to_tsquery()
+        return ' & '.join(f'{term}:*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return queryset.none()
+        post_table = queryset.model._meta.db_table
+        matches = RawSQL(
+            f'SELECT post_id FROM {self.table} '
+            f'WHERE document @@ to_tsquery(%s::regconfig, %s)',
+            [self.config, tsquery]
+        )
+        rank = RawSQL(
+            f'SELECT ts_rank(document, to_tsquery(%s::regconfig, %s)) '
+            f'FROM {self.table} WHERE post_id = {post_table}.id',
+            [self.config, tsquery], output_field=FloatField()
+        )
+        return queryset.filter(pk__in=matches).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-published_at')
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backends = {}
+
+
+def get_search_backend():
+    """
+    Return the search backend for the default database.
+
+    ``BLOG_SEARCH_BACKEND`` may name a backend class explicitly; otherwise
+    it is chosen from the database vendor.
+    """
+    path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+    key = path or connection.vendor
+    if key not in _backends:
+        if path:
+            backend_class = import_string(path)
+        else:
+            backend_class = VENDOR_BACKENDS.get(
+                connection.vendor, SimpleSearchBackend
+            )
+        _backends[key] = backend_class()
+    return _backends[key]
+
+
+def search_posts(queryset, query):
+    """Filter a Post queryset by a user query, best matches first."""
+    return get_search_backend().search(queryset, query)
@@ -0,0 +1,211 @@
+"""
+Synthetic blog data for performance tests and load testing.
+
+``generate()`` fills the database with a realistic, reproducible mix of
+users, categories, tags, posts, threaded comments, reactions, reading
+progress and newsletter subscribers. The same ``seed`` always produces
+the same rows. Rows are written with ``bulk_create``, which sends no
+model signals, and the derived data the signals would normally maintain
+(counters, search index, related posts, analytics rollups) is rebuilt
+once at the end.
+
+Time grows linearly with the sizes: the defaults (1000 posts and about
+14000 other rows) take some 12 seconds on SQLite, half of them spent
+rebuilding related posts, so ``--scale 10`` takes a few minutes.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import related, rollups
+from .cache import bump_generation
+from .counters import rebuild_counters
+from .models import (
+    Category, Comment, NewsletterSubscription, Post, PostReaction,
+    ReadingProgress, REACTION_CHOICES, Tag, UserProfile,
+)
+from .search import get_search_backend
+
+# Password of every generated user
+PASSWORD = 'seeded-password'
+
+WORDS = (
+    'django python query index cache template view model database page '
+    'request response latency server browser feed search tag category '
+    'comment reaction reader author draft publish render static image '
+    'cursor batch buffer signal middleware session token profile archive'
+).split()
+
+BATCH_SIZE = 500
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _paragraphs(rng, count):
+    return ''.join(
+        f'<p>{_sentence(rng, rng.randint(30, 60))}.</p>'
+        for _ in range(count)
+    )
+
+
+@transaction.atomic
+def generate(posts=1000, users=100, categories=10, tags=50, comments=5000,
+             reactions=5000, progress=3000, subscribers=500, seed=0,
+             prefix='seed'):
+    """
+    Create the given number of rows of each kind and return a dict of the
+    counts actually written. About one post in ten is left as a draft.
+    ``prefix`` namespaces usernames, slugs and emails, so several runs
+    with different prefixes can share a database.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'{prefix}-user-{n}', password=password,
+             email=f'{prefix}-user-{n}@example.com',
+             first_name=rng.choice(WORDS).capitalize())
+        for n in range(users)
+    ], batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{prefix}-user-'
+    ).order_by('pk').values_list('pk', flat=True))
+    # A fifth of the users write posts
+    author_ids = user_ids[:max(1, users // 5)]
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_id,
+                    role='author' if user_id in author_ids else 'reader')
+        for user_id in user_ids
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    Category.objects.bulk_create([
+        Category(name=f'{prefix} category {n}',
+                 slug=f'{prefix}-category-{n}',
+                 description=_sentence(rng, 12))
+        for n in range(categories)
+    ])
+    category_ids = list(Category.objects.filter(
+        slug__startswith=f'{prefix}-category-'
+    ).order_by('pk').values_list('pk', flat=True))
+    Tag.objects.bulk_create([
+        Tag(name=f'{prefix} tag {n}', slug=f'{prefix}-tag-{n}')
+        for n in range(tags)
+    ])
+    tag_ids = list(Tag.objects.filter(
+        slug__startswith=f'{prefix}-tag-'
+    ).order_by('pk').values_list('pk', flat=True))
+
+    new_posts, dates = [], []
+    for n in range(posts):
+        published = rng.random() > 0.1
+        created = now - timedelta(minutes=rng.randint(60, 60 * 24 * 365))
+        post = Post(
+            title=_sentence(rng, rng.randint(3, 8)),
+            slug=f'{prefix}-post-{n}',
+            author_id=rng.choice(author_ids),
+            category_id=rng.choice(category_ids) if category_ids else None,
+            content=_paragraphs(rng, rng.randint(3, 12)),
+            excerpt=_sentence(rng, 20) if rng.random() > 0.5 else '',
+            status='published' if published else 'draft',
+            featured=published and rng.random() < 0.05,
+            created_at=created,
+            published_at=created if published else None,
+            view_count=rng.randint(0, 5000) if published else 0,
+        )
+        post.process_content()
+        new_posts.append(post)
+        dates.append(created)
+    Post.objects.bulk_create(new_posts, batch_size=BATCH_SIZE)
+    # auto_now_add replaced the generated creation dates on insert
+    for post, created in zip(new_posts, dates):
+        post.created_at = created
+    Post.objects.bulk_update(
+        new_posts, ['created_at'], batch_size=BATCH_SIZE
+    )
+    post_ids = [post.pk for post in new_posts]
+    published_ids = [post.pk for post in new_posts
+                     if post.status == 'published']
+
+    Post.tags.through.objects.bulk_create([
+        Post.tags.through(post_id=post_id, tag_id=tag_id)
+        for post_id in post_ids
+        for tag_id in rng.sample(tag_ids, min(len(tag_ids),
+                                              rng.randint(0, 4)))
+    ], batch_size=BATCH_SIZE)
+
+    # Comments on published posts, a third of them replies
+    def comment(post_id, parent_id=None):
+        return Comment(
+            post_id=post_id, author_id=rng.choice(user_ids),
+            parent_id=parent_id, content=_sentence(rng, rng.randint(5, 40)),
+            active=rng.random() > 0.05,
+        )
+
+    replies = comments // 3 if published_ids else 0
+    roots = Comment.objects.bulk_create([
+        comment(rng.choice(published_ids))
+        for _ in range(comments - replies)
+    ] if published_ids else [], batch_size=BATCH_SIZE)
+    parents = [root for root in roots if root.pk is not None]
+    if parents:
+        Comment.objects.bulk_create([
+            comment(parent.post_id, parent.pk)
+            for parent in (rng.choice(parents) for _ in range(replies))
+        ], batch_size=BATCH_SIZE)
+    comment_count = Comment.objects.filter(post_id__in=post_ids).count()
+
+    pairs = set()
+    max_pairs = len(user_ids) * len(published_ids)
+    while len(pairs) < min(reactions, max_pairs):
+        pairs.add((rng.choice(user_ids), rng.choice(published_ids)))
+    PostReaction.objects.bulk_create([
+        PostReaction(user_id=user_id, post_id=post_id,
+                     reaction_type=rng.choice(REACTION_CHOICES)[0])
+        for user_id, post_id in sorted(pairs)
+    ], batch_size=BATCH_SIZE)
+
+    reads = set()
+    while len(reads) < min(progress, max_pairs):
+        reads.add((rng.choice(user_ids), rng.choice(published_ids)))
+    ReadingProgress.objects.bulk_create([
+        ReadingProgress(user_id=user_id, post_id=post_id,
+                        progress_percentage=rng.randint(1, 100))
+        for user_id, post_id in sorted(reads)
+    ], batch_size=BATCH_SIZE)
+
+    # Addresses already subscribed are skipped, so count what was added
+    readers = NewsletterSubscription.objects.filter(
+        email__startswith=f'{prefix}-reader-'
+    )
+    subscribed = readers.count()
+    NewsletterSubscription.objects.bulk_create([
+        NewsletterSubscription(email=f'{prefix}-reader-{n}@example.com',
+                               is_active=rng.random() > 0.1)
+        for n in range(subscribers)
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    subscribed = readers.count() - subscribed
+
+    # Derived data normally kept up to date by blog.signals
+    rebuild_counters(Post.objects.filter(pk__in=post_ids))
+    get_search_backend().rebuild(Post.objects.all())
+    related.rebuild()
+    rollups.rebuild_rollups()
+    bump_generation()
+
+    return {
+        'users': len(user_ids),
+        'categories': len(category_ids),
+        'tags': len(tag_ids),
+        'posts': len(post_ids),
+        'comments': comment_count,
+        'reactions': len(pairs),
+        'reading progress': len(reads),
+        'subscribers': subscribed,
+    }
@@ -1,24 +1,232 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import (
+    post_save, post_delete, pre_delete, m2m_changed
+)
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from django.utils import timezone
+from . import counters, related, rollups
+from .cache import bump_generation, bump_reader_state
+from .images import FIELD_KINDS, renditions_ready, schedule
+from .models import (
+    UserProfile, Post, Category, Tag, Comment, PostReaction, RelatedPost
+)
+from .search import get_search_backend
 
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
     Create a UserProfile when a new User is created.
+
+    Later user saves (logins updating last_login, account edits) leave the
+    profile alone: nothing on the profile depends on the user's fields.
     """
     if created:
         UserProfile.objects.create(user=instance)
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+# Image field of each model with renditions (see blog/images.py)
+IMAGE_FIELDS = {UserProfile: 'avatar', Post: 'featured_image'}
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Post)
+def queue_image_renditions(sender, instance, raw=False, update_fields=None,
+                           **kwargs):
     """
-    Save the UserProfile when the User is saved.
+    Generate renditions of new avatars and featured images in the
+    background instead of resizing them inside the request.
     """
-    if hasattr(instance, 'userprofile'):
-        instance.userprofile.save()
-    else:
-        UserProfile.objects.create(user=instance)
+    field_name = IMAGE_FIELDS[sender]
+    if raw or field_name in instance.get_deferred_fields():
+        return
+    if update_fields and field_name not in update_fields:
+        return
+    if sender is UserProfile and not instance.avatar_changed():
+        # Profile edits keeping the avatar need no storage checks
+        return
+    image = getattr(instance, field_name)
+    kind = FIELD_KINDS[field_name]
+    if image and not renditions_ready(image.name, kind):
+        schedule(image.name, kind)
+
+
+# Post fields that feed the full-text search index
+SEARCH_INDEXED_FIELDS = {'title', 'excerpt', 'content'}
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep the full-text search index in sync when a Post is saved.
+    """
+    if raw:
+        return
+    if update_fields and not SEARCH_INDEXED_FIELDS & set(update_fields):
+        return
+    if 'plain_text' in instance.get_deferred_fields():
+        # Saved from a list-mode instance; read the document back instead
+        # of lazily loading the deferred text
+        instance = Post.objects.only(
+            'pk', 'title', 'excerpt', 'plain_text'
+        ).get(pk=instance.pk)
+    get_search_backend().index_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def record_published_post(sender, instance, created, raw=False, **kwargs):
+    """
+    Count a post in its author's analytics rollups when it is published.
+    """
+    publishing = instance.__dict__.pop('_publishing', False)
+    if raw or instance.status != 'published':
+        return
+    if publishing or created:
+        rollups.record_published(
+            instance.author_id, timezone.localdate(instance.published_at)
+        )
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """
+    Remove a deleted Post from the full-text search index.
+    """
+    get_search_backend().remove_post(instance.pk)
+
+
+# Post fields that affect related post recommendations
+RELATED_FIELDS = {'title', 'content', 'category', 'status'}
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_posts(sender, instance, raw=False, update_fields=None,
+                          **kwargs):
+    """
+    Refresh related post lists once a post's text, category or status
+    change is committed.
+    """
+    if raw:
+        return
+    if update_fields and not RELATED_FIELDS & set(update_fields):
+        return
+    related.schedule([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def refresh_related_posts_for_tags(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    """
+    Refresh related post lists when tags are added to or removed from
+    posts.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            related.schedule([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # Changed from the tag side: refresh every post involved
+        related.schedule(pk_set or ())
+    elif action == 'pre_clear':
+        # The posts losing the tag are only known before the clear
+        related.schedule(sender.objects.filter(
+            tag_id=instance.pk
+        ).values_list('post_id', flat=True))
+
+
+@receiver(pre_delete, sender=Post)
+def release_related_posts(sender, instance, **kwargs):
+    """
+    Refill the related lists that include a post being deleted.
+    """
+    related.schedule(RelatedPost.objects.filter(
+        related=instance
+    ).values_list('post_id', flat=True), lists_only=True)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=UserProfile)
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_content_cache(sender, action=None, **kwargs):
+    """
+    Invalidate cached pages and fragments whenever content changes.
+    """
+    # m2m_changed fires before and after each change; once is enough
+    if action is None or action.startswith('post_'):
+        bump_generation()
+
+
+def _counter_deltas(instance, state, sign):
+    """Map a counted (post_id, value) state to counter deltas for it."""
+    post_id, value = state
+    if isinstance(instance, Comment):
+        return post_id, {'comment_count': sign if value else 0}
+    field = counters.reaction_field(value)
+    # Reaction types outside REACTION_CHOICES have no counter
+    return post_id, {field: sign} if field in counters.COUNTER_FIELDS else {}
+
+
+def _adjust_counters(instance, state, sign):
+    """Apply a counted state to the post counters and daily rollups."""
+    post_id, deltas = _counter_deltas(instance, state, sign)
+    counters.adjust(post_id, **deltas)
+    # Counted on the day the comment or reaction was made, once committed
+    # so that deleting a post (cascading to its comments and reactions)
+    # does not recreate rollup rows for it
+    day = timezone.localdate(instance.created_at)
+    transaction.on_commit(lambda: rollups.record(post_id, day, **deltas))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=PostReaction)
+def update_post_counters(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep Post.comment_count and the reaction counters in step with
+    comments and reactions being created, changed or moved.
+    """
+    if raw:
+        return
+    old_state = instance._counted_state
+    new_state = instance.current_counted_state()
+    if old_state is instance.UNKNOWN:
+        # The previous values were not loaded; recount the affected post.
+        # Its rollups are corrected by the next rebuild_rollups run.
+        counters.rebuild_counters(Post.objects.filter(pk=new_state[0]))
+    elif old_state != new_state:
+        if old_state is not None:
+            _adjust_counters(instance, old_state, -1)
+        _adjust_counters(instance, new_state, 1)
+    instance.remember_counted_state()
+
+
+@receiver(post_save, sender=PostReaction)
+@receiver(post_delete, sender=PostReaction)
+def invalidate_reader_state(sender, instance, raw=False, **kwargs):
+    """
+    Make pages showing the reader's own reactions revalidate after a
+    reaction of theirs changes.
+    """
+    if raw:
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_reader_state([user_id]))
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=PostReaction)
+def release_post_counters(sender, instance, **kwargs):
+    """
+    Decrement the counters when a comment or reaction is deleted,
+    including rows removed by cascades.
+    """
+    state = instance._counted_state
+    if state is instance.UNKNOWN or state is None:
+        state = instance.current_counted_state()
+    _adjust_counters(instance, state, -1)
@@ -0,0 +1,74 @@
+"""
+XML sitemaps of published content.
+
+``SITEMAPS`` lists one section per kind of page. ``sitemap.xml`` is a
+sitemap index pointing at the sections; sections with more than
+``Sitemap.limit`` (50,000) URLs are split into numbered pages by the
+index, as the sitemap protocol requires.
+"""
+from django.contrib.sitemaps import Sitemap
+from django.db.models import Max, Q
+from django.urls import reverse
+
+from .models import Category, Post, Tag
+
+
+class PostSitemap(Sitemap):
+    changefreq = 'weekly'
+    priority = 0.8
+
+    def items(self):
+        return Post.objects.published().only(
+            'slug', 'updated_at'
+        ).order_by('pk')
+
+    def lastmod(self, post):
+        return post.updated_at
+
+
+class _PublishedPostsSitemap(Sitemap):
+    """Listing pages, last modified when their newest post changed."""
+    changefreq = 'daily'
+    priority = 0.5
+    model = None
+
+    def items(self):
+        published = Q(post__status='published')
+        return self.model.objects.annotate(
+            last_post_update=Max('post__updated_at', filter=published)
+        ).filter(last_post_update__isnull=False).only(
+            'slug'
+        ).order_by('pk')
+
+    def lastmod(self, obj):
+        return obj.last_post_update
+
+
+class CategorySitemap(_PublishedPostsSitemap):
+    model = Category
+
+
+class TagSitemap(_PublishedPostsSitemap):
+    model = Tag
+
+
+class StaticViewSitemap(Sitemap):
+    changefreq = 'monthly'
+    priority = 0.3
+
+    def items(self):
+        return [
+            'blog:landing_page', 'blog:post_list', 'blog:about',
+            'blog:contact',
+        ]
+
+    def location(self, name):
+        return reverse(name)
+
+
+SITEMAPS = {
+    'posts': PostSitemap,
+    'categories': CategorySitemap,
+    'tags': TagSitemap,
+    'pages': StaticViewSitemap,
+}
@@ -0,0 +1,56 @@
+from django import template
+from django.core.cache import cache
+
+from blog.cache import get_timeout, make_key
+
+register = template.Library()
+
+
+class AnonymousCacheNode(template.Node):
+    def __init__(self, nodelist, name):
+        self.nodelist = nodelist
+        self.name = name
+
+    def render(self, context):
+        request = context.get('request')
+        # Logged-in users see personalised markup (edit links, profile
+        # menus), so only anonymous GET renders are shared
+        if (request is None or request.method != 'GET' or
+                request.user.is_authenticated):
+            return self.nodelist.render(context)
+
+        key = make_key(f'page:{self.name}', request.get_full_path())
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(key, html, get_timeout())
+        return html
+
+
+@register.tag('cache_anonymous')
+def do_cache_anonymous(parser, token):
+    """
+    Cache the enclosed markup for anonymous visitors.
+
+    Usage::
+
+        {% load blog_cache %}
+        {% cache_anonymous 'post_list' %}
+            ... expensive markup ...
+        {% endcache_anonymous %}
+
+    The entry is keyed on the name, the full request path (so pagination
+    and filters get their own entries) and the content generation, so any
+    edit to posts, categories, tags or comments invalidates it.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires exactly one argument (a name)."
+        )
+    name = bits[1]
+    if name[0] == name[-1] and name[0] in ('"', "'"):
+        name = name[1:-1]
+    nodelist = parser.parse(('endcache_anonymous',))
+    parser.delete_first_token()
+    return AnonymousCacheNode(nodelist, name)
@@ -0,0 +1,73 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from blog.images import (
+    FIELD_KINDS, RENDITIONS, rendition_name, renditions_ready
+)
+
+register = template.Library()
+
+
+def _name_and_kind(image):
+    """Storage name and rendition kind of a model image or upload name."""
+    field = getattr(image, 'field', None)
+    if field is not None:
+        return image.name, FIELD_KINDS[field.name]
+    # Plain names are CKEditor uploads
+    return str(image), 'upload'
+
+
+def _rendition_urls(image, size):
+    """(fallback URL, WebP URL or None) of ``image`` at ``size``."""
+    name, kind = _name_and_kind(image)
+    if not name:
+        return '', None
+    if size not in RENDITIONS[kind]:
+        raise template.TemplateSyntaxError(
+            f"Unknown {kind} rendition '{size}'; expected one of "
+            f"{', '.join(RENDITIONS[kind])}."
+        )
+    if not renditions_ready(name, kind):
+        return default_storage.url(name), None
+    return (
+        default_storage.url(rendition_name(name, size)),
+        default_storage.url(rendition_name(name, size, webp=True)),
+    )
+
+
+@register.filter
+def rendition(image, size):
+    """
+    URL of the ``size`` rendition of an image, or of the original until
+    its renditions have been generated.
+
+    Usage::
+
+        {% load blog_images %}
+        <img src="{{ post.featured_image|rendition:'card' }}">
+    """
+    return _rendition_urls(image, size)[0]
+
+
+@register.simple_tag
+def picture(image, size, **attrs):
+    """
+    Render a ``<picture>`` serving the WebP rendition where supported and
+    the JPEG/PNG rendition elsewhere. Keyword arguments become attributes
+    of the ``<img>``; images load lazily unless ``loading`` is given.
+
+    Usage::
+
+        {% picture post.featured_image 'card' alt=post.title %}
+    """
+    src, webp = _rendition_urls(image, size)
+    attrs.setdefault('loading', 'lazy')
+    img = format_html('<img src="{}"{}>', src, flatatt(attrs))
+    if webp is None:
+        return img
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">{}</picture>',
+        webp, img
+    )
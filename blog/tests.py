@@ -1,7 +1,56 @@
-from django.test import TestCase, Client
-from django.contrib.auth.models import User
-from django.urls import reverse
-from .models import Post, Comment, Category, Tag
+import base64
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.utils import timezone
+from PIL import Image
+from . import (
+    instrumentation, loadtest, newsletter, reader_state, related, rollups,
+    seed, trending,
+)
+from .backends import ProfileBackend
+from .buffers import (
+    ReadingProgressBuffer, ViewCountBuffer, reading_progress, view_counts,
+)
+from .cache import get_generation, make_key
+from .counters import find_drift
+from .images import (
+    ORIGINAL_LIMITS, RENDITIONS, rendition_name, renditions_ready,
+)
+from .models import (
+    Post, Comment, Category, Tag, PostReaction, ReadingProgress,
+    DeferredContentError, PostDailyStats, AuthorDailyStats, PostViewBucket,
+    RelatedPost, NewsletterSubscription, StagedView, UserProfile,
+    REPLY_INDENT_LEVELS,
+)
+from .pagination import CursorPaginator, InvalidCursor, SEARCH_ORDERING
+from .search import search_posts
+from .sitemaps import PostSitemap
+from .utils import html_to_text
 from .forms import CustomUserCreationForm, PostForm, PostSearchForm
 
 
@@ -26,6 +75,136 @@ class UserProfileModelTest(TestCase):
         self.assertEqual(str(self.user.userprofile), expected)
 
 
+class ProfileBackendTest(TestCase):
+    """Test request.user comes with its profile."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author', password='pw')
+        cls.user.userprofile.role = 'author'
+        cls.user.userprofile.save()
+
+    def test_get_user_joins_the_profile(self):
+        """Test loading the user also loads its profile."""
+        backend = ProfileBackend()
+        with self.assertNumQueries(1):
+            user = backend.get_user(self.user.pk)
+            self.assertTrue(user.userprofile.can_create_posts())
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(backend.get_user(self.user.pk))
+        self.assertIsNone(backend.get_user(0))
+
+    def test_role_checks_reuse_the_request_user(self):
+        """Test views and templates check roles without profile queries."""
+        self.client.force_login(self.user)
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.client.get(reverse('blog:post_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [sql for sql in statements if 'FROM "blog_userprofile"' in sql],
+            []
+        )
+
+    def test_earlier_sessions_stay_signed_in(self):
+        """Test sessions from ModelBackend survive; sign-ins use ours."""
+        self.client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        response = self.client.get(reverse('blog:post_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+
+        self.client.logout()
+        self.assertTrue(self.client.login(username='author', password='pw'))
+        self.assertEqual(
+            self.client.session[BACKEND_SESSION_KEY],
+            'blog.backends.ProfileBackend'
+        )
+
+    def test_users_without_a_profile_still_sign_in(self):
+        """Test a missing profile reads as no profile, not an error."""
+        self.user.userprofile.delete()
+        user = ProfileBackend().get_user(self.user.pk)
+        self.assertEqual(user, self.user)
+        self.assertFalse(hasattr(user, 'userprofile'))
+
+
+class ProfileSyncTest(TestCase):
+    """Test user saves leave the profile and its avatar alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pw')
+        profile = cls.user.userprofile
+        profile.avatar.name = 'avatars/reader.png'
+        profile.save()
+
+    def test_login_costs_a_bounded_number_of_queries(self):
+        """Test signing in writes no profile and checks no image."""
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if 'SAVEPOINT' not in sql:
+                statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with mock.patch('blog.signals.renditions_ready') as ready, \
+                connection.execute_wrapper(record):
+            response = self.client.post(reverse('blog:login'), {
+                'username': 'reader', 'password': 'pw',
+            })
+        self.assertEqual(response.status_code, 302)
+        # The user, its last_login and the new session (savepoints aside)
+        self.assertLessEqual(len(statements), 5, statements)
+        self.assertEqual(
+            [sql for sql in statements if '"blog_userprofile"' in sql], []
+        )
+        ready.assert_not_called()
+
+    def test_user_saves_do_not_save_the_profile(self):
+        """Test saving a user is one query, whatever changed."""
+        user = User.objects.select_related('userprofile').get(pk=self.user.pk)
+        user.first_name = 'Renamed'
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_avatar_is_processed_only_when_changed(self):
+        """Test profile saves check renditions only for a new avatar."""
+        profile = UserProfile.objects.get(user=self.user)
+        with mock.patch('blog.signals.renditions_ready',
+                        return_value=False) as ready, \
+                mock.patch('blog.signals.schedule') as schedule:
+            profile.bio = 'Reads a lot.'
+            profile.save()
+            ready.assert_not_called()
+            profile.avatar.name = 'avatars/new.png'
+            profile.save()
+            schedule.assert_called_once_with('avatars/new.png', 'avatar')
+            profile.save()
+            schedule.assert_called_once()
+
+    def test_registration_sets_the_role_on_the_new_profile(self):
+        """Test registering updates the profile the signal created."""
+        form = CustomUserCreationForm(data={
+            'username': 'newauthor', 'email': 'new@example.com',
+            'first_name': 'New', 'last_name': 'Author', 'role': 'author',
+            'password1': 'Sup3r-secret-pw', 'password2': 'Sup3r-secret-pw',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        user = form.save()
+        self.assertEqual(
+            UserProfile.objects.get(user=user).role, 'author'
+        )
+        self.assertEqual(UserProfile.objects.filter(user=user).count(), 1)
+
+
 class CategoryModelTest(TestCase):
     """Test cases for Category model."""
 
@@ -103,6 +282,32 @@ class PostModelTest(TestCase):
                                kwargs={'slug': self.post.slug})
         self.assertEqual(self.post.get_absolute_url(), expected_url)
 
+    def test_content_is_processed_on_save(self):
+        """Test plain text and reading time ignore HTML markup."""
+        self.post.content = (
+            '<p class="lead" style="color: red">' +
+            'word ' * 450 + '</p><script>var x = 1;</script>'
+        )
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertNotIn('<p', self.post.plain_text)
+        self.assertNotIn('var x', self.post.plain_text)
+        self.assertEqual(self.post.word_count, 450)
+        self.assertEqual(self.post.get_reading_time(), 2)
+
+    def test_process_post_content_command(self):
+        """Test the backfill command fills rows written without save()."""
+        Post.objects.filter(pk=self.post.pk).update(
+            content='<h2>Fresh</h2><p>words here</p>', plain_text='',
+            word_count=0
+        )
+        out = StringIO()
+        call_command('process_post_content', stdout=out)
+        self.assertIn('Processed content of 1 post(s)', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.plain_text, 'Fresh words here')
+        self.assertEqual(self.post.word_count, 3)
+
 
 class CommentModelTest(TestCase):
     """Test cases for Comment model."""
@@ -339,3 +544,2570 @@ class SearchFunctionalityTest(TestCase):
         form_data = {'query': ''}
         form = PostSearchForm(data=form_data)
         self.assertTrue(form.is_valid())  # Empty search should be valid
+
+
+class ViewCountBufferTest(TestCase):
+    """Test cases for the write-behind post view counter."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.post = Post.objects.create(
+            title='Popular Post',
+            content='Everyone reads this.',
+            author=self.user,
+            status='published'
+        )
+        self.other_post = Post.objects.create(
+            title='Quiet Post',
+            content='Nobody reads this.',
+            author=self.user,
+            status='published'
+        )
+        view_counts.drain()
+
+    @override_settings(BLOG_VIEW_COUNT_FLUSH_THRESHOLD=1000,
+                       BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_detail_view_buffers_views(self):
+        """Test detail views are buffered rather than written per hit."""
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        for _ in range(3):
+            self.client.get(url)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 0)
+        self.assertEqual(view_counts.pending_for(self.post.pk), 3)
+
+        call_command('flush_view_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 3)
+        self.assertEqual(view_counts.pending_for(self.post.pk), 0)
+
+    @override_settings(BLOG_VIEW_COUNT_FLUSH_THRESHOLD=5,
+                       BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_threshold_triggers_batched_flush(self):
+        """Test reaching the threshold writes all pending posts at once."""
+        for _ in range(3):
+            view_counts.record(self.post.pk)
+        view_counts.record(self.other_post.pk)
+        # Staging insert; savepoint, staged rows, existing posts, one
+        # UPDATE per distinct increment (+3, +2), the same for the post
+        # rollups, the authors, their rollup and the trending buckets,
+        # deleting the staged rows, release
+        with self.assertNumQueries(17):
+            view_counts.record(self.other_post.pk)
+
+        self.post.refresh_from_db()
+        self.other_post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 3)
+        self.assertEqual(self.other_post.view_count, 2)
+
+    def test_flush_uses_database_side_increment(self):
+        """Test a flush adds to the stored value instead of replacing it."""
+        Post.objects.filter(pk=self.post.pk).update(view_count=10)
+        view_counts.record(self.post.pk)
+        view_counts.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 11)
+
+    def test_no_increments_lost_under_concurrency(self):
+        """Test concurrent recording and flushing never drops a view."""
+        written = {}
+        write_lock = threading.Lock()
+
+        class RecordingBuffer(ViewCountBuffer):
+            threshold = 7
+            interval = 3600
+
+            # The threads hand their views over here instead of to the
+            # staging table, which they cannot reach inside this test's
+            # transaction
+            def stage(self):
+                batch = self.drain()
+                with write_lock:
+                    for post_id, count in batch.items():
+                        written[post_id] = written.get(post_id, 0) + count
+
+            def apply(self):
+                return 0
+
+        buffer = RecordingBuffer()
+        threads_count, hits_per_thread = 8, 500
+
+        def hammer():
+            for i in range(hits_per_thread):
+                buffer.record(self.post.pk if i % 2 else self.other_post.pk)
+
+        threads = [threading.Thread(target=hammer)
+                   for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        buffer.flush()
+
+        expected = threads_count * hits_per_thread // 2
+        self.assertEqual(written[self.post.pk], expected)
+        self.assertEqual(written[self.other_post.pk], expected)
+
+    def test_failed_flush_keeps_pending_views(self):
+        """Test views stay staged if the write fails."""
+        class FailingBuffer(ViewCountBuffer):
+            def write(self, batch):
+                raise RuntimeError('database unavailable')
+
+        buffer = FailingBuffer()
+        buffer.record(self.post.pk)
+        buffer.record(self.post.pk)
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+        self.assertEqual(
+            sum(StagedView.objects.values_list('count', flat=True)), 2
+        )
+        view_counts.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 2)
+        self.assertFalse(StagedView.objects.exists())
+
+    @override_settings(BLOG_VIEW_COUNT_FLUSH_THRESHOLD=1000,
+                       BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_command_writes_views_of_other_processes(self):
+        """Test the command applies views staged by worker processes."""
+        worker = ViewCountBuffer()
+        for _ in range(3):
+            worker.record(self.post.pk)
+        # What the worker's timer does within a second
+        worker.tick()
+        self.assertEqual(worker.pending_for(self.post.pk), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 0)
+
+        call_command('flush_view_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 3)
+
+    @override_settings(BLOG_VIEW_COUNT_FLUSH_THRESHOLD=1000,
+                       BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_timer_writes_views_of_idle_workers(self):
+        """Test a timer tick writes views once the interval has passed."""
+        worker = ViewCountBuffer()
+        worker.record(self.post.pk)
+        with self.settings(BLOG_VIEW_COUNT_FLUSH_INTERVAL=0):
+            worker.tick()
+            self.post.refresh_from_db()
+            self.assertEqual(self.post.view_count, 1)
+            # Nothing left: idle ticks cost no queries
+            with self.assertNumQueries(0):
+                worker.tick()
+
+    def test_views_of_deleted_posts_are_dropped(self):
+        """Test staged views of a deleted post are discarded."""
+        view_counts.record(self.other_post.pk)
+        view_counts.stage()
+        self.other_post.delete()
+        view_counts.flush()
+        self.assertFalse(StagedView.objects.exists())
+
+
+class FullTextSearchTest(TestCase):
+    """Test cases for the full-text search backend."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.title_match = Post.objects.create(
+            title='Django Tutorial',
+            content='<p>Learn the <strong>basics</strong> of web apps.</p>',
+            author=self.user,
+            status='published'
+        )
+        self.body_match = Post.objects.create(
+            title='Python Basics',
+            content='<p>Python pairs well with</p><p>django projects.</p>',
+            author=self.user,
+            status='published'
+        )
+        self.published = Post.objects.filter(status='published')
+
+    def test_html_to_text(self):
+        """Test tags are stripped without merging adjacent words."""
+        self.assertEqual(
+            html_to_text('<p>one</p><p>two &amp; three</p>'),
+            'one two & three'
+        )
+
+    def test_title_matches_rank_first(self):
+        """Test results are ranked with title matches above body ones."""
+        results = list(search_posts(self.published, 'django'))
+        self.assertEqual(results, [self.title_match, self.body_match])
+
+    def test_markup_is_not_indexed(self):
+        """Test HTML tag names do not match searches."""
+        self.assertFalse(search_posts(self.published, 'strong').exists())
+        self.assertTrue(search_posts(self.published, 'basics').exists())
+
+    def test_prefix_and_operator_characters(self):
+        """Test prefix matching and that query syntax is neutralised."""
+        self.assertEqual(search_posts(self.published, 'tutor').count(), 1)
+        self.assertEqual(
+            search_posts(self.published, '"django" (*').count(), 2
+        )
+        self.assertFalse(search_posts(self.published, '***').exists())
+
+    def test_index_follows_save_and_delete(self):
+        """Test the index is updated when posts change or are deleted."""
+        self.title_match.title = 'Flask Tutorial'
+        self.title_match.save()
+        self.assertEqual(
+            list(search_posts(self.published, 'flask')), [self.title_match]
+        )
+        self.body_match.delete()
+        self.assertFalse(search_posts(self.published, 'pairs').exists())
+
+    def test_views_share_search_path(self):
+        """Test the post list and advanced search use the index."""
+        response = self.client.get(reverse('blog:post_list'),
+                                   {'query': 'tutorial'})
+        self.assertEqual(list(response.context['posts']), [self.title_match])
+        response = self.client.get(reverse('blog:advanced_search'),
+                                   {'query': 'tutorial'})
+        self.assertEqual(list(response.context['posts']), [self.title_match])
+
+
+class PageCacheTest(TestCase):
+    """Test cases for page caching and signal-driven invalidation."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.category = Category.objects.create(name='Technology')
+        self.tag = Tag.objects.create(name='Django')
+        self.post = Post.objects.create(
+            title='Cached Post',
+            content='Cached content.',
+            author=self.user,
+            category=self.category,
+            status='published',
+            featured=True
+        )
+        self.post.tags.add(self.tag)
+
+    def test_anonymous_landing_page_is_cached(self):
+        """Test a repeated anonymous landing page request runs no queries."""
+        url = reverse('blog:landing_page')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Cached Post')
+
+    def test_post_edit_invalidates_cached_pages(self):
+        """Test readers see an edit immediately."""
+        self.client.get(reverse('blog:landing_page'))
+        self.client.get(reverse('blog:post_list'))
+
+        self.post.title = 'Edited Post'
+        self.post.save()
+
+        for name in ('blog:landing_page', 'blog:post_list'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, 'Edited Post')
+            self.assertNotContains(response, 'Cached Post')
+
+    def test_related_models_invalidate_cache(self):
+        """Test category, tag and comment changes bump the generation."""
+        generation = get_generation()
+        self.category.name = 'Science'
+        self.category.save()
+        self.assertNotEqual(get_generation(), generation)
+
+        generation = get_generation()
+        self.post.tags.remove(self.tag)
+        self.assertNotEqual(get_generation(), generation)
+
+        generation = get_generation()
+        Comment.objects.create(
+            post=self.post, author=self.user, content='Nice post!'
+        )
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_authenticated_pages_are_not_shared(self):
+        """Test cached anonymous markup is never served to users."""
+        self.user.userprofile.role = 'author'
+        self.user.userprofile.save()
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertNotContains(response, 'Create New Post')
+
+        self.client.login(username='author', password='authorpass123')
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertContains(response, 'Create New Post')
+
+    def test_category_and_tag_pages(self):
+        """Test category and tag listings render their posts."""
+        response = self.client.get(self.category.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Cached Post')
+        response = self.client.get(self.tag.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Cached Post')
+
+
+@override_settings(BLOG_VIEW_COUNT_FLUSH_THRESHOLD=1000,
+                   BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+class CommentTreeTest(TestCase):
+    """Test cases for single-query comment thread loading."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.post = Post.objects.create(
+            title='Discussed Post',
+            content='Lots to talk about.',
+            author=self.user,
+            status='published'
+        )
+
+    def add_thread(self, depth, prefix):
+        """Create a comment with a chain of nested replies by new users."""
+        parent = None
+        for level in range(depth):
+            commenter = User.objects.create_user(
+                username=f'{prefix}-{level}', password='commenterpass123'
+            )
+            parent = Comment.objects.create(
+                post=self.post, author=commenter, parent=parent,
+                content=f'{prefix} level {level}'
+            )
+        return parent
+
+    def detail_query_count(self):
+        cache.clear()
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_tree_is_assembled_in_one_query(self):
+        """Test nested replies are attached at any depth."""
+        self.add_thread(4, 'deep')
+        hidden = self.add_thread(2, 'hidden')
+        hidden.parent.active = False
+        hidden.parent.save()
+
+        with self.assertNumQueries(1):
+            roots = Comment.objects.tree_for_post(self.post)
+            node, depth = roots[0], 1
+            while node.thread_replies:
+                self.assertEqual(node.author.userprofile.role, 'reader')
+                node, depth = node.thread_replies[0], depth + 1
+
+        self.assertEqual(len(roots), 1)
+        self.assertEqual(depth, 4)
+        self.assertEqual(node.content, 'deep level 3')
+
+    def test_threads_are_flattened_for_templates(self):
+        """Test replies render in order, indented up to a limit."""
+        deepest = self.add_thread(7, 'deep')
+        Comment.objects.create(
+            post=self.post, author=deepest.author, parent=deepest.parent,
+            content='deep sibling'
+        )
+        root, = Comment.objects.tree_for_post(self.post)
+        self.assertEqual(
+            [(reply.content, reply.depth) for reply in root.flat_replies],
+            [(f'deep level {level}', level) for level in range(1, 7)] +
+            [('deep sibling', 6)]
+        )
+        self.assertEqual(root.flat_replies[-1].indent, REPLY_INDENT_LEVELS)
+
+        _, response = self.detail_query_count()
+        self.assertContains(response, 'deep level 6')
+        self.assertContains(response, 'comment-reply-depth-4', count=4)
+        self.assertNotContains(response, 'comment-reply-depth-5')
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        """Test rendering more threads does not add queries."""
+        self.add_thread(2, 'first')
+        baseline, _ = self.detail_query_count()
+
+        for i in range(5):
+            self.add_thread(3, f'more{i}')
+        count, response = self.detail_query_count()
+
+        self.assertEqual(count, baseline)
+        self.assertContains(response, 'more4 level 2')
+
+
+class PostCounterTest(TestCase):
+    """Test cases for the denormalized comment and reaction counters."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.reader = User.objects.create_user(
+            username='reader', password='readerpass123'
+        )
+        self.post = Post.objects.create(
+            title='Counted Post',
+            content='Count me.',
+            author=self.user,
+            status='published'
+        )
+
+    def assertCounts(self, **expected):
+        self.post.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(self.post, field), value, field)
+        self.assertFalse(find_drift().exists())
+
+    def test_comment_lifecycle_updates_count(self):
+        """Test creating, hiding, moving and deleting comments."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, content='First'
+        )
+        reply = Comment.objects.create(
+            post=self.post, author=self.user, content='Reply', parent=comment
+        )
+        self.assertCounts(comment_count=2)
+
+        reply.active = False
+        reply.save()
+        self.assertCounts(comment_count=1)
+
+        other = Post.objects.create(
+            title='Other Post', content='Other.', author=self.user
+        )
+        moved = Comment.objects.get(pk=comment.pk)
+        moved.post = other
+        moved.save()
+        other.refresh_from_db()
+        self.assertEqual(other.comment_count, 1)
+        self.assertCounts(comment_count=0)
+
+        # Deleting the parent cascades to the reply
+        moved.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.comment_count, 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_deferred_comment_save_recounts(self):
+        """Test saving a comment loaded without its counted fields."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, content='Hidden later'
+        )
+        Comment.objects.filter(pk=comment.pk).update(active=False)
+        deferred = Comment.objects.only('content').get(pk=comment.pk)
+        deferred.content = 'Edited'
+        deferred.save()
+        self.assertCounts(comment_count=0)
+
+    def test_reaction_lifecycle_updates_counts(self):
+        """Test adding, switching and removing reactions."""
+        reaction = PostReaction.objects.create(
+            post=self.post, user=self.reader, reaction_type='like'
+        )
+        self.assertCounts(like_count=1, love_count=0)
+        self.assertEqual(self.post.get_reaction_total(), 1)
+
+        reaction.reaction_type = 'love'
+        reaction.save()
+        self.assertCounts(like_count=0, love_count=1)
+
+        reaction.delete()
+        self.assertCounts(like_count=0, love_count=0)
+
+    def test_admin_bulk_actions_keep_counts(self):
+        """Test the moderation actions, which use bulk updates."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com',
+            password='adminpass123'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(
+                post=self.post, author=self.reader, content='Moderate me'
+            )
+        rollup = PostDailyStats.objects.get(post=self.post)
+        self.client.force_login(admin)
+        url = reverse('admin:blog_comment_changelist')
+
+        generation = get_generation()
+        self.client.post(url, {
+            'action': 'make_inactive', '_selected_action': [comment.pk],
+        })
+        self.assertCounts(comment_count=0)
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.comment_count, 0)
+        self.assertNotEqual(get_generation(), generation)
+
+        generation = get_generation()
+        for _ in range(2):
+            self.client.post(url, {
+                'action': 'make_active', '_selected_action': [comment.pk],
+            })
+        self.assertCounts(comment_count=1)
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.comment_count, 1)
+        self.assertEqual(
+            AuthorDailyStats.objects.get(author=self.user).comment_count, 1
+        )
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_rebuild_command_detects_and_fixes_drift(self):
+        """Test --check reports drift and a rebuild repairs it."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, content='Counted'
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            comment_count=7, like_count=3
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_post_counters', check=True,
+                         stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_post_counters', stdout=out)
+        self.assertIn('1 had drifted', out.getvalue())
+        self.assertCounts(comment_count=1, like_count=0)
+
+        out = StringIO()
+        call_command('rebuild_post_counters', check=True, stdout=out)
+        self.assertIn('All counters are correct', out.getvalue())
+
+
+class AdminChangelistQueryTest(TestCase):
+    """Test cases for the admin changelist query budget."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com',
+            password='adminpass123'
+        )
+        self.client.force_login(self.admin)
+        self.batches = 0
+
+    def add_rows(self, count):
+        """Create posts with categories, tags and threaded comments."""
+        for _ in range(count):
+            self.batches += 1
+            n = self.batches
+            category = Category.objects.create(
+                name=f'Category {n}', slug=f'category-{n}'
+            )
+            tag = Tag.objects.create(name=f'Tag {n}', slug=f'tag-{n}')
+            commenter = User.objects.create_user(
+                username=f'commenter-{n}', password='commenterpass123'
+            )
+            post = Post.objects.create(
+                title=f'Admin Post {n}', content='Content', author=commenter,
+                category=category, status='published'
+            )
+            post.tags.add(tag)
+            parent = Comment.objects.create(
+                post=post, author=commenter, content='Parent'
+            )
+            Comment.objects.create(
+                post=post, author=self.admin, content='Reply', parent=parent
+            )
+
+    def changelist_queries(self, model, **params):
+        url = reverse(f'admin:blog_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_changelists_run_constant_queries(self):
+        """Test query counts do not grow with the number of rows."""
+        self.add_rows(2)
+        baseline = {
+            model: self.changelist_queries(model)[0]
+            for model in ('category', 'tag', 'post', 'comment')
+        }
+        self.add_rows(5)
+        for model, expected in baseline.items():
+            # The post filter sidebar lists one link per post, not a query
+            count, _ = self.changelist_queries(model)
+            self.assertEqual(count, expected, model)
+
+    def test_changelists_sort_by_counts(self):
+        """Test the annotated columns are sortable."""
+        self.add_rows(2)
+        busy = Category.objects.get(slug='category-1')
+        Post.objects.create(
+            title='Extra', slug='extra', content='Content',
+            author=self.admin, category=busy
+        )
+        # post_count is the fourth column
+        _, response = self.changelist_queries('category', o='-4')
+        categories = list(response.context['cl'].result_list)
+        self.assertEqual(categories[0], busy)
+        self.assertEqual(categories[0].post_total, 2)
+
+        _, response = self.changelist_queries('comment', o='5')
+        self.assertContains(response, 'Reply to: commenter-1')
+
+
+class PostListModeTest(TestCase):
+    """Test cases for list-mode post loading without the content column."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.category = Category.objects.create(name='Technology')
+        self.tag = Tag.objects.create(name='Django')
+        self.post = Post.objects.create(
+            title='Long Post',
+            content='<p>SECRET-BODY-MARKER ' + 'filler ' * 500 + '</p>',
+            author=self.user,
+            category=self.category,
+            status='published'
+        )
+        self.post.tags.add(self.tag)
+
+    def test_for_list_defers_heavy_columns(self):
+        """Test content is not selected and cannot be lazily loaded."""
+        with CaptureQueriesContext(connection) as queries:
+            post = Post.objects.published().for_list().get()
+            self.assertEqual(post.author.username, 'author')
+            self.assertEqual(post.category.name, 'Technology')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"content"', queries[0]['sql'])
+        self.assertTrue(post.summary.startswith('SECRET-BODY-MARKER filler'))
+        self.assertLessEqual(len(post.summary), Post.LIST_SUMMARY_LENGTH)
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(DeferredContentError):
+                post.content
+
+    def test_list_mode_post_can_still_be_saved(self):
+        """Test saving a list-mode post leaves its content untouched."""
+        post = Post.objects.for_list().get()
+        post.featured = True
+        post.save()
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.featured)
+        self.assertIn('SECRET-BODY-MARKER', self.post.content)
+        self.assertEqual(self.post.word_count, 501)
+
+    def test_list_pages_do_not_load_content(self):
+        """Test list pages render without selecting the content column."""
+        urls = [
+            reverse('blog:landing_page'),
+            reverse('blog:post_list'),
+            reverse('blog:post_list') + '?query=secret',
+            reverse('blog:category_detail', args=[self.category.slug]),
+            reverse('blog:tag_detail', args=[self.tag.slug]),
+            reverse('blog:advanced_search') + '?query=secret',
+        ]
+        for url in urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertContains(response, 'Long Post', msg_prefix=url)
+            for query in queries:
+                self.assertNotIn('"blog_post"."content"', query['sql'], url)
+
+
+class CursorPaginationTest(TestCase):
+    """Test cases for keyset pagination of post listings."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.category = Category.objects.create(name='Technology')
+        self.tag = Tag.objects.create(name='Django')
+        published_at = timezone.now()
+        for i in range(25):
+            post = Post.objects.create(
+                title=f'Paged Post {i:02d}',
+                content=f'Django pagination number {i}',
+                author=self.user,
+                category=self.category,
+                status='published',
+                # Groups of five share a timestamp to exercise tie-breaking
+                published_at=published_at - timedelta(hours=i // 5)
+            )
+            post.tags.add(self.tag)
+
+    def walk(self, url, context_name='page_obj'):
+        """Follow next links from ``url``; return titles and pages."""
+        titles, pages = [], []
+        querystring = url.partition('?')[2]
+        path = url.partition('?')[0]
+        while querystring is not None:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'{path}?{querystring}')
+            self.assertEqual(response.status_code, 200)
+            for query in queries:
+                # Paginator.count would run SELECT COUNT(*) AS "__count"
+                self.assertNotIn('__count', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'].upper())
+            page = response.context[context_name]
+            titles.extend(post.title for post in page)
+            pages.append(page)
+            querystring = page.next_querystring() if page.has_next() else None
+        return titles, pages
+
+    def test_pages_cover_every_post_once(self):
+        """Test walking next links visits each post once, newest first."""
+        expected = list(Post.objects.order_by(
+            '-published_at', '-pk').values_list('title', flat=True))
+        for url in (
+            reverse('blog:post_list'),
+            reverse('blog:category_detail', args=[self.category.slug]),
+            reverse('blog:tag_detail', args=[self.tag.slug]),
+        ):
+            titles, pages = self.walk(url)
+            self.assertEqual(titles, expected, url)
+            self.assertEqual(len(pages), 3)
+            self.assertFalse(pages[0].has_previous())
+
+    def test_previous_links_return_to_earlier_pages(self):
+        """Test previous links rebuild the same pages backwards."""
+        _, pages = self.walk(reverse('blog:post_list'))
+        response = self.client.get(
+            reverse('blog:post_list') + '?' + pages[2].previous_querystring()
+        )
+        page = response.context['page_obj']
+        self.assertEqual(list(page), list(pages[1]))
+        self.assertTrue(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_search_results_page_by_rank(self):
+        """Test search and filter parameters survive cursor links."""
+        url = reverse('blog:post_list') + '?query=django&tag=django'
+        titles, pages = self.walk(url)
+        self.assertEqual(sorted(titles), sorted(
+            Post.objects.values_list('title', flat=True)))
+        self.assertIn('query=django', pages[0].next_querystring())
+        self.assertIn('tag=django', pages[0].next_querystring())
+
+        titles, pages = self.walk(
+            reverse('blog:advanced_search') + '?query=pagination',
+            context_name='posts'
+        )
+        self.assertEqual(len(titles), 25)
+        self.assertEqual(len(pages), 5)
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Test a tampered cursor falls back to the first page."""
+        response = self.client.get(
+            reverse('blog:post_list') + '?after=not-a-cursor'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_malformed_cursors_show_first_page(self):
+        """Test well-encoded cursors with bad values are rejected."""
+        def cursor(values):
+            return base64.urlsafe_b64encode(
+                json.dumps(values).encode()).decode().rstrip('=')
+
+        now = timezone.now().isoformat()
+        payloads = (
+            [5, 5], [[1], {}], [None, None], [now, None], [now, 'x'],
+            [now, True], ['yesterday', 1], [now], [now, 1, 2], {'a': 1},
+        )
+        search_payloads = (
+            ['high', now, 1], [None, now, 1], [[0.5], now, 1],
+        )
+        url = reverse('blog:post_list')
+        for values in payloads + search_payloads:
+            for params in (f'after={cursor(values)}',
+                           f'before={cursor(values)}',
+                           f'query=django&after={cursor(values)}'):
+                with self.subTest(params=params, values=values):
+                    response = self.client.get(f'{url}?{params}')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertFalse(
+                        response.context['page_obj'].has_previous()
+                    )
+
+    def test_cursor_values_take_their_key_types(self):
+        """Test cursor values are coerced to the field or annotation type."""
+        paginator = CursorPaginator(
+            search_posts(Post.objects.all(), 'django'), 10, SEARCH_ORDERING
+        )
+        now = timezone.now()
+        rank, published_at, pk = paginator.decode_cursor(
+            base64.urlsafe_b64encode(json.dumps(
+                ['1.5', now.isoformat(), '7']).encode()).decode()
+        )
+        self.assertEqual((rank, published_at, pk), (1.5, now, 7))
+        with self.assertRaises(InvalidCursor):
+            paginator.decode_cursor(base64.urlsafe_b64encode(json.dumps(
+                ['best', now.isoformat(), 7]).encode()).decode())
+
+
+def make_image_file(name='photo.jpg', size=(1200, 900), fmt='JPEG'):
+    """An uploaded image of ``size`` for image field tests."""
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 60)).save(buffer, fmt)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type=f'image/{fmt.lower()}'
+    )
+
+
+class ImageRenditionTest(TestCase):
+    """Test cases for the background image rendition pipeline."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, BLOG_IMAGE_SYNC=True
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+
+    def open_rendition(self, name, size, webp=False):
+        with default_storage.open(rendition_name(name, size, webp)) as f:
+            image = Image.open(f)
+            image.load()
+        return image
+
+    def test_featured_image_renditions(self):
+        """Test every size is generated as JPEG and WebP."""
+        post = Post.objects.create(
+            title='Pictured', content='Body', author=self.user,
+            status='published', featured_image=make_image_file()
+        )
+        name = post.featured_image.name
+        for size, pixels in RENDITIONS['featured'].items():
+            jpeg = self.open_rendition(name, size)
+            webp = self.open_rendition(name, size, webp=True)
+            self.assertEqual(jpeg.format, 'JPEG')
+            self.assertEqual(webp.format, 'WEBP')
+            self.assertLessEqual(max(jpeg.size), pixels)
+        # The original is stored untouched
+        with default_storage.open(name) as f:
+            self.assertEqual(Image.open(f).size, (1200, 900))
+
+        html = Template(
+            "{% load blog_images %}{% picture post.featured_image 'card' "
+            "alt=post.title %}"
+        ).render(Context({'post': post}))
+        webp_url = default_storage.url(rendition_name(name, 'card', True))
+        self.assertIn(f'srcset="{webp_url}"', html)
+        self.assertIn('alt="Pictured"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_avatar_is_processed_after_commit(self):
+        """Test avatar work is queued off the request path."""
+        profile = self.user.userprofile
+        with self.settings(BLOG_IMAGE_SYNC=False):
+            with self.captureOnCommitCallbacks() as callbacks:
+                profile.avatar = make_image_file('me.png', fmt='PNG')
+                profile.save()
+            name = profile.avatar.name
+            self.assertEqual(len(callbacks), 1)
+            self.assertFalse(renditions_ready(name, 'avatar'))
+            template = Template(
+                '{% load blog_images %}{{ avatar|rendition:"small" }}'
+            )
+            self.assertEqual(
+                template.render(Context({'avatar': profile.avatar})),
+                profile.avatar.url
+            )
+
+            callbacks[0]()
+            deadline = time.monotonic() + 10
+            while (not renditions_ready(name, 'avatar') and
+                   time.monotonic() < deadline):
+                time.sleep(0.05)
+
+        self.assertEqual(self.open_rendition(name, 'large').format, 'PNG')
+        self.assertEqual(self.open_rendition(name, 'small').size, (64, 48))
+
+    def test_avatar_original_is_capped(self):
+        """Test oversized avatars are shrunk in storage, keeping format."""
+        profile = self.user.userprofile
+        profile.avatar = make_image_file('me.jpg', size=(3000, 2000))
+        profile.save()
+        limit = ORIGINAL_LIMITS['avatar']
+        with default_storage.open(profile.avatar.name) as f:
+            original = Image.open(f)
+            self.assertEqual(original.format, 'JPEG')
+            self.assertEqual(original.size, (limit, limit * 2 // 3))
+        self.assertEqual(self.open_rendition(
+            profile.avatar.name, 'small'
+        ).size, (64, 43))
+
+    def test_ckeditor_uploads_get_renditions(self):
+        """Test images uploaded through CKEditor are processed too."""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('ckeditor_upload'), {'upload': make_image_file()}
+        )
+        self.assertEqual(response.status_code, 200)
+        url = response.json()['url']
+        name = url[len(default_storage.base_url):]
+        self.assertTrue(renditions_ready(name, 'upload'))
+        self.assertLessEqual(
+            max(self.open_rendition(name, 'medium', webp=True).size), 800
+        )
+
+
+@override_settings(BLOG_READING_PROGRESS_FLUSH_THRESHOLD=1000,
+                   BLOG_READING_PROGRESS_FLUSH_INTERVAL=3600)
+class ReadingProgressBatchTest(TestCase):
+    """Test cases for batched reading progress ingestion."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='readerpass123'
+        )
+        self.posts = [
+            Post.objects.create(
+                title=f'Long Read {i}', content='Words', author=self.user,
+                status='published'
+            )
+            for i in range(3)
+        ]
+        self.draft = Post.objects.create(
+            title='Draft', content='Words', author=self.user
+        )
+        self.url = reverse('blog:record_reading_progress')
+        reading_progress.drain()
+        self.addCleanup(reading_progress.drain)
+
+    def send(self, updates):
+        return self.client.post(
+            self.url, json.dumps({'updates': updates}),
+            content_type='application/json'
+        )
+
+    def progress(self):
+        return dict(ReadingProgress.objects.values_list(
+            'post_id', 'progress_percentage'))
+
+    def test_batches_are_buffered_and_coalesced(self):
+        """Test many updates cost no writes until one bulk flush."""
+        self.client.force_login(self.user)
+        first, second, third = self.posts
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send([
+                {'post': first.pk, 'progress': 30},
+                {'post': first.pk, 'progress': 70},
+                {'post': first.pk, 'progress': 40},
+                {'post': second.pk, 'progress': 250},
+                {'post': self.draft.pk, 'progress': 50},
+                {'post': 'bogus', 'progress': 10},
+            ])
+        self.assertEqual(response.json(), {
+            'status': 'success', 'accepted': 5
+        })
+        self.assertFalse(any(
+            'blog_readingprogress' in query['sql'] for query in queries
+        ))
+        self.send([{'post': third.pk, 'progress': 10}])
+
+        # Staging insert; savepoint, staged rows, published posts, users,
+        # rows of new readers, locked stored progress, one bulk update,
+        # the completed read of the second post in the rollups, deleting
+        # the staged rows, release
+        with self.assertNumQueries(15):
+            self.assertEqual(reading_progress.flush(), 4)
+        self.assertEqual(self.progress(), {
+            first.pk: 70, second.pk: 100, third.pk: 10,
+        })
+
+    def test_flush_keeps_highest_progress(self):
+        """Test a lower later update does not reduce stored progress."""
+        self.client.force_login(self.user)
+        post = self.posts[0]
+        self.send([{'post': post.pk, 'progress': 80}])
+        reading_progress.flush()
+        self.send([{'post': post.pk, 'progress': 20}])
+        reading_progress.flush()
+        self.assertEqual(self.progress(), {post.pk: 80})
+        self.assertEqual(ReadingProgress.objects.count(), 1)
+
+    def test_progress_staged_by_workers_is_merged_once(self):
+        """Test the command merges every worker's progress by maximum."""
+        post = self.posts[0]
+        workers = [ReadingProgressBuffer() for _ in range(2)]
+        workers[0].record(self.user.pk, post.pk, 95)
+        workers[1].record(self.user.pk, post.pk, 92)
+        for worker in workers:
+            worker.stage()
+        call_command('flush_reading_progress', stdout=StringIO())
+        self.assertEqual(self.progress(), {post.pk: 95})
+        self.assertEqual(
+            PostDailyStats.objects.get(post=post).completed_reads, 1
+        )
+
+        # A stored higher value is never lowered nor completed again
+        workers[0].record(self.user.pk, post.pk, 99)
+        workers[0].stage()
+        ReadingProgress.objects.update(progress_percentage=100)
+        reading_progress.flush()
+        self.assertEqual(self.progress(), {post.pk: 100})
+        self.assertEqual(
+            PostDailyStats.objects.get(post=post).completed_reads, 1
+        )
+
+    def test_invalid_requests(self):
+        """Test anonymous, malformed and oversized batches are refused."""
+        self.assertEqual(self.send([]).status_code, 403)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.url, 'not json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        too_many = [{'post': self.posts[0].pk, 'progress': 5}] * 51
+        self.assertEqual(self.send(too_many).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_single_update_endpoint_uses_buffer(self):
+        """Test the per-post endpoint records into the same buffer."""
+        self.client.force_login(self.user)
+        post = self.posts[0]
+        response = self.client.post(
+            reverse('blog:update_reading_progress', args=[post.slug]),
+            {'progress': '60'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ReadingProgress.objects.exists())
+        reading_progress.flush()
+        self.assertEqual(self.progress(), {post.pk: 60})
+
+
+class AnalyticsRollupTest(TestCase):
+    """Test cases for the daily analytics rollups and the dashboard."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='authorpass123'
+        )
+        self.user.userprofile.role = 'author'
+        self.user.userprofile.save()
+        self.other = User.objects.create_user(
+            username='other', password='otherpass123'
+        )
+        self.reader = User.objects.create_user(
+            username='reader', password='readerpass123'
+        )
+        self.post = Post.objects.create(
+            title='Rolled Up', content='Words', author=self.user,
+            status='published'
+        )
+        self.other_post = Post.objects.create(
+            title='Elsewhere', content='Words', author=self.other,
+            status='published'
+        )
+        self.today = timezone.localdate()
+        view_counts.drain()
+        reading_progress.drain()
+        self.addCleanup(view_counts.drain)
+        self.addCleanup(reading_progress.drain)
+
+    def post_stats(self, post=None):
+        return PostDailyStats.objects.filter(
+            post=post or self.post, date=self.today
+        ).first()
+
+    def author_stats(self, author=None):
+        return AuthorDailyStats.objects.get(
+            author=author or self.user, date=self.today
+        )
+
+    def test_published_posts_are_counted_once(self):
+        """Test publishing counts a post once, however often it is saved."""
+        self.assertEqual(self.author_stats().published_posts, 1)
+        draft = Post.objects.create(
+            title='Later', content='Words', author=self.user
+        )
+        self.assertEqual(self.author_stats().published_posts, 1)
+        draft.status = 'published'
+        draft.save()
+        draft.save()
+        self.assertEqual(self.author_stats().published_posts, 2)
+
+    def test_view_flush_updates_rollups(self):
+        """Test buffered views reach the post and author rollups."""
+        for post in (self.post, self.post, self.other_post):
+            view_counts.record(post.pk)
+        view_counts.flush()
+        self.assertEqual(self.post_stats().view_count, 2)
+        self.assertEqual(self.author_stats().view_count, 2)
+        self.assertEqual(self.author_stats(self.other).view_count, 1)
+
+    def test_comment_and_reaction_signals_update_rollups(self):
+        """Test rollups follow comments and reactions once committed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(
+                post=self.post, author=self.reader, content='Nice'
+            )
+            reaction = PostReaction.objects.create(
+                post=self.post, user=self.reader, reaction_type='like'
+            )
+        stats = self.post_stats()
+        self.assertEqual((stats.comment_count, stats.like_count), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.active = False
+            comment.save()
+            reaction.reaction_type = 'love'
+            reaction.save()
+        stats = self.post_stats()
+        self.assertEqual(
+            (stats.comment_count, stats.like_count, stats.love_count),
+            (0, 0, 1)
+        )
+        self.assertEqual(self.author_stats().love_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reaction.delete()
+        self.assertEqual(self.author_stats().love_count, 0)
+
+    def test_deleting_post_drops_its_rollups(self):
+        """Test cascaded comment deletes do not recreate rollup rows."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, author=self.reader, content='Nice'
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+        self.assertFalse(PostDailyStats.objects.exists())
+
+    def test_completed_reads_are_counted_once(self):
+        """Test a reader completes a post only the first time."""
+        reading_progress.record(self.reader.pk, self.post.pk, 50)
+        reading_progress.flush()
+        self.assertIsNone(self.post_stats())
+        for percentage in (95, 100):
+            reading_progress.record(self.reader.pk, self.post.pk, percentage)
+            reading_progress.flush()
+        self.assertEqual(self.post_stats().completed_reads, 1)
+        self.assertEqual(self.author_stats().completed_reads, 1)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Test rebuilding recomputes derived fields and keeps views."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, author=self.reader, content='Nice'
+            )
+            PostReaction.objects.create(
+                post=self.post, user=self.reader, reaction_type='wow'
+            )
+        view_counts.record(self.post.pk, 7)
+        view_counts.flush()
+        fields = rollups.AUTHOR_FIELDS
+        before = list(AuthorDailyStats.objects.values(*fields))
+
+        PostDailyStats.objects.update(comment_count=5, wow_count=0)
+        AuthorDailyStats.objects.update(published_posts=9)
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(
+            list(AuthorDailyStats.objects.values(*fields)), before
+        )
+        stats = self.post_stats()
+        self.assertEqual(
+            (stats.view_count, stats.comment_count, stats.wow_count),
+            (7, 1, 1)
+        )
+
+    def test_dashboard_reads_only_rollups(self):
+        """Test the dashboard aggregates rollups, never the post tables."""
+        view_counts.record(self.post.pk, 4)
+        view_counts.record(self.other_post.pk, 9)
+        view_counts.flush()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog:analytics_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        aggregates = [
+            query['sql'] for query in queries if 'SUM(' in query['sql']
+        ]
+        self.assertTrue(aggregates)
+        self.assertTrue(all('dailystats' in sql for sql in aggregates))
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] and 'blog_post' in query['sql']
+            for query in queries
+        ))
+        # Authors see only their own posts
+        self.assertEqual(response.context['totals']['view_count'], 4)
+        self.assertEqual(
+            response.context['popular_posts'],
+            [{'title': 'Rolled Up', 'slug': self.post.slug, 'views': 4}]
+        )
+        chart = response.context['chart']
+        self.assertEqual(chart['period'], 'day')
+        self.assertEqual(len(chart['labels']), 30)
+        self.assertEqual(chart['series']['view_count'][-1], 4)
+
+    def test_dashboard_date_ranges(self):
+        """Test explicit, reversed and long date ranges."""
+        view_counts.record(self.post.pk, 4)
+        view_counts.flush()
+        self.client.force_login(self.user)
+        url = reverse('blog:analytics_dashboard')
+        yesterday = self.today - timedelta(days=1)
+
+        response = self.client.get(url, {
+            'start': self.today.isoformat(), 'end': yesterday.isoformat()
+        })
+        self.assertEqual(response.context['start'], yesterday)
+        self.assertEqual(response.context['chart']['series']['view_count'],
+                         [0, 4])
+
+        response = self.client.get(url, {'end': yesterday.isoformat()})
+        self.assertEqual(response.context['totals']['view_count'], 0)
+
+        response = self.client.get(url, {
+            'start': (self.today - timedelta(days=365)).isoformat(),
+            'end': 'not-a-date',
+        })
+        chart = response.context['chart']
+        self.assertEqual(chart['period'], 'month')
+        self.assertEqual(chart['labels'][-1],
+                         self.today.replace(day=1).isoformat())
+        self.assertEqual(chart['series']['view_count'][-1], 4)
+
+    def test_dashboard_ignores_out_of_range_dates(self):
+        """Test extreme dates fall back to the default range."""
+        self.client.force_login(self.user)
+        url = reverse('blog:analytics_dashboard')
+        default_start = self.today - timedelta(days=29)
+        cases = (
+            ({'start': '9999-01-01', 'end': '9999-12-31'}, default_start),
+            ({'end': '0001-01-05'}, default_start),
+            ({'start': '0001-01-01'}, default_start),
+            ({'start': '9999-12-31'}, default_start),
+        )
+        for params, start in cases:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['start'], start)
+                self.assertEqual(response.context['end'], self.today)
+
+        oldest = self.today - timedelta(days=rollups.MAX_RANGE_DAYS - 1)
+        response = self.client.get(url, {'start': oldest.isoformat()})
+        chart = response.context['chart']
+        self.assertEqual(chart['period'], 'month')
+        self.assertLessEqual(len(chart['labels']), 122)
+
+    def test_time_series_at_the_ends_of_the_calendar(self):
+        """Test month steps and long spans cannot overflow or explode."""
+        period, points = rollups.time_series(
+            date(9999, 1, 1), date(9999, 12, 31)
+        )
+        self.assertEqual(period, 'month')
+        self.assertEqual(points[-1]['date'], date(9999, 12, 1))
+        self.assertEqual(len(points), 12)
+        _, points = rollups.time_series(date(1, 1, 1), date(9999, 12, 31))
+        self.assertLessEqual(len(points), 122)
+
+
+class TrendingPostsTest(TestCase):
+    """Test cases for hourly view buckets and trending scores."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author', password='authorpass123'
+        )
+        self.old_favourite, self.rising, self.draft = [
+            Post.objects.create(
+                title=title, content='Words', author=self.user,
+                status=status
+            )
+            for title, status in (('Old Favourite', 'published'),
+                                  ('Rising Star', 'published'),
+                                  ('Hidden Draft', 'draft'))
+        ]
+        self.hour = trending.current_hour()
+        view_counts.drain()
+        self.addCleanup(view_counts.drain)
+
+    def test_flush_fills_current_hour_bucket(self):
+        """Test buffered views accumulate in one bucket per post and hour."""
+        view_counts.record(self.rising.pk, 2)
+        view_counts.flush()
+        view_counts.record(self.rising.pk)
+        view_counts.flush()
+        bucket = PostViewBucket.objects.get()
+        self.assertEqual(
+            (bucket.post, bucket.hour, bucket.views),
+            (self.rising, self.hour, 3)
+        )
+
+    def test_scores_decay_with_age(self):
+        """Test recent views outweigh more numerous older ones."""
+        trending.add_views({self.old_favourite.pk: 10},
+                           self.hour - timedelta(hours=48))
+        trending.add_views({self.rising.pk: 4, self.draft.pk: 50})
+        # Outside the window
+        trending.add_views({self.old_favourite.pk: 1000},
+                           self.hour - timedelta(hours=72))
+
+        scores = trending.trending_scores()
+        self.assertEqual(
+            [post_id for post_id, _ in scores],
+            [self.rising.pk, self.old_favourite.pk]
+        )
+        self.assertAlmostEqual(scores[0][1], 4)
+        self.assertAlmostEqual(scores[1][1], 2.5)
+
+    def test_trending_sections_render(self):
+        """Test the landing page and post list sidebar list trending posts."""
+        trending.add_views({self.rising.pk: 4})
+        for url in (reverse('blog:landing_page'), reverse('blog:post_list')):
+            response = self.client.get(url)
+            self.assertEqual(
+                response.context['trending_posts'], [self.rising]
+            )
+            self.assertContains(response, 'Trending')
+
+    def test_prune_command_drops_old_buckets(self):
+        """Test pruning keeps only the buckets inside the window."""
+        trending.add_views({self.rising.pk: 1})
+        trending.add_views({self.rising.pk: 1},
+                           self.hour - timedelta(hours=100))
+        call_command('prune_view_buckets', stdout=StringIO())
+        self.assertEqual(
+            list(PostViewBucket.objects.values_list('hour', flat=True)),
+            [self.hour]
+        )
+
+
+@override_settings(BLOG_RELATED_SYNC=True)
+class RelatedPostsTest(TestCase):
+    """Test cases for precomputed related post recommendations."""
+
+    def setUp(self):
+        cache.clear()
+        # Changes left by earlier tests, whose transactions rolled back
+        related._local.pending = None
+        self.user = User.objects.create_user(
+            username='author', password='authorpass123'
+        )
+        self.python = Category.objects.create(name='Python')
+        self.cooking = Category.objects.create(name='Cooking')
+        self.django_tag = Tag.objects.create(name='django')
+        self.orm_tag = Tag.objects.create(name='orm')
+
+    def create_post(self, title, content, category, tags=(), **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title=title, content=f'<p>{content}</p>', author=self.user,
+                category=category, status=kwargs.pop('status', 'published'),
+                **kwargs
+            )
+            post.tags.set(tags)
+        return post
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).values_list(
+            'related__title', flat=True))
+
+    def test_term_vector_is_derived_from_text(self):
+        """Test saving content stores its most frequent meaningful terms."""
+        post = self.create_post(
+            'Querysets', 'Django querysets are lazy; querysets chain.',
+            self.python
+        )
+        self.assertEqual(post.term_vector['querysets'], 3)
+        self.assertNotIn('are', post.term_vector)
+
+    def test_title_only_saves_refresh_the_term_vector(self):
+        """Test saving just the title also updates the derived terms."""
+        post = self.create_post('Querysets', 'Lazy evaluation.', self.python)
+        post.title = 'Middleware'
+        post.save(update_fields=['title'])
+        post.refresh_from_db()
+        self.assertIn('middleware', post.term_vector)
+        self.assertNotIn('querysets', post.term_vector)
+
+        listed = Post.objects.for_list().get(pk=post.pk)
+        listed.title = 'Signals'
+        listed.save()
+        post.refresh_from_db()
+        self.assertIn('signals', post.term_vector)
+        self.assertIn('lazy', post.term_vector)
+
+    def test_neighbours_ranked_by_tags_category_and_text(self):
+        """Test the most similar posts are stored in rank order."""
+        base = self.create_post(
+            'Django ORM tips', 'Queryset annotations and database indexes.',
+            self.python, [self.django_tag, self.orm_tag]
+        )
+        close = self.create_post(
+            'More ORM tricks', 'Database indexes speed up queryset filters.',
+            self.python, [self.django_tag, self.orm_tag]
+        )
+        same_category = self.create_post(
+            'Python packaging', 'Wheels and virtual environments.',
+            self.python
+        )
+        self.create_post(
+            'Sourdough bread', 'Flour, water and patience.', self.cooking
+        )
+        self.assertEqual(
+            self.related(base), [close.title, same_category.title]
+        )
+        # The earlier post's list gained the later, closer posts
+        self.assertEqual(self.related(close)[0], base.title)
+
+    def test_lists_follow_status_and_tag_changes(self):
+        """Test unpublishing, retagging and deleting refresh the lists."""
+        first = self.create_post('First', 'Alpha', self.cooking,
+                                 [self.django_tag])
+        second = self.create_post('Second', 'Beta', self.python,
+                                  [self.django_tag])
+        self.assertEqual(self.related(first), ['Second'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.tags.clear()
+        self.assertEqual(self.related(first), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.tags.add(self.django_tag)
+        self.assertEqual(self.related(first), ['Second'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = 'draft'
+            second.save()
+        self.assertEqual(self.related(first), [])
+        self.assertEqual(self.related(second), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = 'published'
+            second.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.related(first), [])
+
+    def test_detail_page_reads_related_in_one_query(self):
+        """Test the post page serves related posts from the stored list."""
+        base = self.create_post('Base', 'Shared words here', self.python,
+                                [self.django_tag])
+        self.create_post('Match', 'Shared words too', self.python,
+                         [self.django_tag])
+        url = base.get_absolute_url()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(
+            [post.title for post in response.context['related_posts']],
+            ['Match']
+        )
+        related_queries = [
+            query['sql'] for query in queries
+            if 'blog_relatedpost' in query['sql']
+        ]
+        self.assertEqual(len(related_queries), 1)
+
+    def test_rebuild_command(self):
+        """Test the rebuild command restores lists from scratch."""
+        base = self.create_post('Base', 'Shared words', self.python)
+        self.create_post('Match', 'Shared words', self.python)
+        RelatedPost.objects.all().delete()
+        call_command('rebuild_related_posts', stdout=StringIO())
+        self.assertEqual(self.related(base), ['Match'])
+
+    def test_one_refresh_per_commit(self):
+        """Test a post saved with its tags is refreshed once, together."""
+        with mock.patch.object(related, 'refresh') as refresh:
+            post = self.create_post('Base', 'Words', self.python,
+                                    [self.django_tag, self.orm_tag])
+        refresh.assert_called_once_with({post.pk}, set())
+
+        with mock.patch.object(related, 'refresh') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                post.title = 'Renamed'
+                post.save()
+                post.tags.remove(self.orm_tag)
+        refresh.assert_called_once_with({post.pk}, set())
+
+    def test_tag_side_changes_refresh_the_posts_involved(self):
+        """Test clearing a tag's posts refreshes them without a rebuild."""
+        first = self.create_post('First', 'Alpha', self.cooking,
+                                 [self.django_tag])
+        second = self.create_post('Second', 'Beta', self.python,
+                                  [self.django_tag])
+        self.assertEqual(self.related(first), ['Second'])
+
+        with mock.patch.object(related, 'rebuild') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.django_tag.post_set.clear()
+        rebuild.assert_not_called()
+        self.assertEqual(self.related(first), [])
+        self.assertEqual(self.related(second), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django_tag.post_set.add(first, second)
+        self.assertEqual(self.related(first), ['Second'])
+
+    def test_candidates_share_a_tag_category_or_term(self):
+        """Test posts with nothing in common are never scored."""
+        base = self.create_post('Base', 'Queryset indexes', self.python)
+        term = self.create_post('Term', 'Queryset caching', self.cooking)
+        tagged = self.create_post('Tagged', 'Flour', self.cooking,
+                                  [self.django_tag])
+        base.tags.add(self.django_tag)
+        category = self.create_post('Category', 'Wheels', self.python)
+        self.create_post('Unrelated', 'Sourdough', self.cooking)
+        corpus = related.Corpus([base.pk])
+        self.assertEqual(
+            related._candidates(corpus, base.pk),
+            {term.pk, tagged.pk, category.pk}
+        )
+
+    @override_settings(BLOG_RELATED_SYNC=False)
+    def test_refresh_runs_in_the_background(self):
+        """Test commits hand the refresh to the worker pool."""
+        executor = mock.Mock()
+        with mock.patch.object(related, 'get_executor',
+                               return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    title='Queued', content='Words', author=self.user,
+                    status='published'
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                post.tags.add(self.django_tag)
+        # The second commit joins the refresh still waiting to run
+        executor.submit.assert_called_once_with(related._refresh_queued)
+        # The worker's connection handling would end the test transaction
+        with mock.patch.object(related, 'refresh') as refresh, \
+                mock.patch.object(related, 'close_old_connections'):
+            related._refresh_queued()
+        refresh.assert_called_once_with({post.pk}, set())
+
+
+class SitemapFeedTest(TestCase):
+    """Test cases for sitemaps and RSS/Atom feeds."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author', first_name='Ada', last_name='Lovelace',
+            password='authorpass123'
+        )
+        self.category = Category.objects.create(name='Python')
+        self.tag = Tag.objects.create(name='django')
+        self.post = Post.objects.create(
+            title='Feed Me', content='<p>Syndicated words</p>',
+            author=self.user, category=self.category, status='published'
+        )
+        self.post.tags.add(self.tag)
+        self.draft = Post.objects.create(
+            title='Secret Draft', content='Hidden', author=self.user
+        )
+
+    def test_sitemap_index_and_sections(self):
+        """Test the index links every section and posts carry lastmod."""
+        response = self.client.get(reverse('blog:sitemap'))
+        self.assertEqual(response.status_code, 200)
+        for section in ('posts', 'categories', 'tags', 'pages'):
+            self.assertContains(response, f'sitemap-{section}.xml')
+
+        response = self.client.get(
+            reverse('blog:sitemap_section', args=['posts'])
+        )
+        self.assertContains(response, self.post.get_absolute_url())
+        self.assertContains(
+            response, f'<lastmod>{self.post.updated_at.date()}'
+        )
+        self.assertNotContains(response, self.draft.slug)
+
+        response = self.client.get(
+            reverse('blog:sitemap_section', args=['tags'])
+        )
+        self.assertContains(response, self.tag.get_absolute_url())
+
+    def test_sitemap_splits_large_sections(self):
+        """Test sections past the URL limit are paged in the index."""
+        Post.objects.create(
+            title='Second', content='More', author=self.user,
+            status='published'
+        )
+        with mock.patch.object(PostSitemap, 'limit', 1):
+            response = self.client.get(reverse('blog:sitemap'))
+        self.assertContains(response, 'sitemap-posts.xml?p=2')
+
+    def test_feeds_list_published_posts(self):
+        """Test site, category, tag and author feeds in both formats."""
+        urls = [
+            reverse('blog:post_feed'),
+            reverse('blog:post_feed_atom'),
+            reverse('blog:category_feed', args=[self.category.slug]),
+            reverse('blog:category_feed_atom', args=[self.category.slug]),
+            reverse('blog:tag_feed', args=[self.tag.slug]),
+            reverse('blog:tag_feed_atom', args=[self.tag.slug]),
+            reverse('blog:author_feed', args=[self.user.username]),
+            reverse('blog:author_feed_atom', args=[self.user.username]),
+        ]
+        for url in urls:
+            response = self.client.get(url)
+            self.assertContains(response, 'Feed Me')
+            self.assertContains(response, 'Syndicated words')
+            self.assertNotContains(response, 'Secret Draft')
+        self.assertEqual(
+            self.client.get(
+                reverse('blog:tag_feed', args=['missing'])
+            ).status_code, 404
+        )
+
+    def test_unchanged_feed_is_not_modified(self):
+        """Test revalidation costs a 304 without queries until an edit."""
+        url = reverse('blog:post_feed')
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, 304)
+
+        self.post.title = 'Fresh Title'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Fresh Title')
+
+    def test_cached_feed_runs_no_queries(self):
+        """Test a repeated request is served from the response cache."""
+        url = reverse('blog:sitemap_section', args=['posts'])
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+
+class ConditionalGetTest(TestCase):
+    """Test cases for ETag / Last-Modified validation of post pages."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author', password='authorpass123'
+        )
+        self.category = Category.objects.create(name='Python')
+        self.tag = Tag.objects.create(name='django')
+        self.post = Post.objects.create(
+            title='Validated', content='Words', author=self.user,
+            category=self.category, status='published'
+        )
+        self.post.tags.add(self.tag)
+        self.urls = {
+            'detail': self.post.get_absolute_url(),
+            'category': self.category.get_absolute_url(),
+            'tag': self.tag.get_absolute_url(),
+            'landing': reverse('blog:landing_page'),
+        }
+        view_counts.drain()
+        self.addCleanup(view_counts.drain)
+
+    def revalidate(self, url, response):
+        return self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Test every page answers a matching revalidation with a 304."""
+        for name, url in self.urls.items():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertEqual(
+                self.revalidate(url, response).status_code, 304, name
+            )
+
+    def test_detail_revalidation_costs_one_query(self):
+        """Test a 304 of a post page runs only the validator query."""
+        url = self.urls['detail']
+        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            not_modified = self.revalidate(url, response)
+        self.assertEqual(not_modified.status_code, 304)
+        # Revalidated views are still counted
+        self.assertEqual(view_counts.pending_for(self.post.pk), 2)
+
+    def test_comments_and_reactions_change_detail_page(self):
+        """Test engagement invalidates the post page validators."""
+        url = self.urls['detail']
+        response = self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, content='New comment'
+        )
+        response = self.revalidate(url, response)
+        self.assertContains(response, 'New comment')
+
+        PostReaction.objects.create(post=self.post, user=self.user)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_author_and_related_posts_change_detail_page(self):
+        """Test the author box and related posts invalidate the page."""
+        url = self.urls['detail']
+        response = self.client.get(url)
+        profile = self.user.userprofile
+        profile.bio = 'Writes about validators'
+        profile.save()
+        response = self.revalidate(url, response)
+        self.assertContains(response, 'Writes about validators')
+
+        Post.objects.create(
+            title='Neighbour', content='Words', author=self.user,
+            category=self.category, status='published'
+        )
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Neighbour')
+        related.refresh([self.post.pk])
+        self.assertContains(self.revalidate(url, response), 'Neighbour')
+
+    def test_new_posts_change_listing_pages(self):
+        """Test publishing into a category refreshes its page."""
+        url = self.urls['category']
+        response = self.client.get(url)
+        Post.objects.create(
+            title='Newcomer', content='Words', author=self.user,
+            category=self.category, status='published'
+        )
+        self.assertContains(self.revalidate(url, response), 'Newcomer')
+
+    def test_author_changes_listing_pages(self):
+        """Test an author's new name refreshes category and tag pages."""
+        responses = {
+            name: self.client.get(self.urls[name])
+            for name in ('category', 'tag')
+        }
+        # As the profile form does: the name and then the profile
+        self.user.first_name = 'Ada'
+        self.user.last_name = 'Lovelace'
+        self.user.save()
+        self.user.userprofile.save()
+        for name, response in responses.items():
+            self.assertContains(
+                self.revalidate(self.urls[name], response), 'Ada Lovelace'
+            )
+
+    def test_featured_and_trending_change_landing_page(self):
+        """Test featuring a post or a new trending list refreshes it."""
+        url = self.urls['landing']
+        response = self.client.get(url)
+        self.post.featured = True
+        self.post.save()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['featured_posts']),
+                         [self.post])
+
+        trending.add_views({self.post.pk: 3})
+        # The trending list expires on its own timeout
+        cache.delete(make_key('trending_posts', 5))
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['trending_posts'], [self.post])
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_validators_depend_on_visitor(self):
+        """Test logged-in users never get an anonymous visitor's copy."""
+        url = self.urls['detail']
+        anonymous = self.client.get(url)
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], anonymous['ETag'])
+
+    def test_pages_showing_messages_are_not_stored(self):
+        """Test a page rendering a flash message gets no validators."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('blog:add_comment', args=[self.post.slug]),
+            {'content': 'Hello there'}, follow=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(list(response.context['messages']))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+
+class NewsletterDispatchTest(TestCase):
+    """Test cases for building and mailing newsletter issues."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author', password='authorpass123'
+        )
+        self.post = Post.objects.create(
+            title='Digest Worthy', content='<p>Fresh words</p>',
+            excerpt='A post for subscribers', author=self.user,
+            status='published'
+        )
+        self.subscriptions = [
+            NewsletterSubscription.objects.create(
+                email=f'reader{n}@example.com'
+            )
+            for n in range(5)
+        ]
+        NewsletterSubscription.objects.create(
+            email='gone@example.com', is_active=False
+        )
+
+    def test_build_issue_collects_new_posts_once(self):
+        """Test an issue holds the posts published since the last one."""
+        issue = newsletter.build_issue()
+        self.assertEqual(list(issue.posts.all()), [self.post])
+        self.assertIsNone(newsletter.build_issue())
+
+        later = Post.objects.create(
+            title='Later Post', content='More', author=self.user,
+            status='published'
+        )
+        self.assertEqual(list(newsletter.build_issue().posts.all()), [later])
+
+    def test_dispatch_renders_once_and_personalises(self):
+        """Test bodies are rendered once and each carries its own link."""
+        issue = newsletter.build_issue()
+        with mock.patch(
+            'blog.newsletter.render_to_string',
+            wraps=newsletter.render_to_string
+        ) as render:
+            sent, failed = newsletter.dispatch(issue, batch_size=2)
+        self.assertEqual((sent, failed), (5, 0))
+        self.assertEqual(render.call_count, 2)
+
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(s.email for s in self.subscriptions)
+        )
+        message = mail.outbox[0]
+        # Tokens are timestamped, so compare what they sign
+        url = message.extra_headers['List-Unsubscribe'].strip('<>')
+        token = url.rstrip('/').rsplit('/', 1)[-1]
+        self.assertEqual(newsletter.subscription_from_token(token),
+                         self.subscriptions[0].pk)
+        self.assertIn('Digest Worthy', message.body)
+        self.assertIn(url, message.body)
+        self.assertIn(url, message.alternatives[0][0])
+        issue.refresh_from_db()
+        self.assertEqual(issue.status, 'sent')
+
+    def test_dispatch_reuses_one_connection(self):
+        """Test each batch goes out in one call over one connection."""
+        issue = newsletter.build_issue()
+        backend = mail.get_connection()
+        with mock.patch.object(backend, 'open',
+                               wraps=backend.open) as opened, \
+                mock.patch.object(backend, 'send_messages',
+                                  wraps=backend.send_messages) as sends:
+            newsletter.dispatch(issue, batch_size=2, connection=backend)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(
+            [len(call.args[0]) for call in sends.call_args_list], [2, 2, 1]
+        )
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_resume_skips_delivered_and_retries_failed(self):
+        """Test a second run sends only to recipients not yet sent to."""
+        issue = newsletter.build_issue()
+        backend = mail.get_connection()
+        failing = self.subscriptions[3].email
+        real_send = backend.send_messages
+
+        def send_messages(messages):
+            if [failing] in (message.to for message in messages):
+                raise ConnectionError('mailbox unavailable')
+            return real_send(messages)
+
+        with mock.patch.object(backend, 'send_messages', send_messages), \
+                self.assertLogs('blog.newsletter', 'WARNING'):
+            self.assertEqual(
+                newsletter.dispatch(issue, batch_size=2, connection=backend),
+                (4, 1)
+            )
+        issue.refresh_from_db()
+        self.assertEqual(issue.status, 'sending')
+        delivery = issue.deliveries.get(status='failed')
+        self.assertIn('mailbox unavailable', delivery.error)
+
+        mail.outbox = []
+        self.assertEqual(newsletter.dispatch(issue), (1, 0))
+        self.assertEqual([m.to for m in mail.outbox], [[failing]])
+        self.assertEqual(issue.deliveries.filter(status='sent').count(), 5)
+
+    def test_unsubscribe_link(self):
+        """Test the signed link deactivates only its subscription."""
+        subscription = self.subscriptions[0]
+        token = newsletter.unsubscribe_token(subscription.pk)
+        url = reverse('blog:newsletter_unsubscribe', args=[token])
+        # Opening the link only asks for confirmation
+        response = self.client.get(url)
+        self.assertContains(response, '<form method="post">')
+        subscription.refresh_from_db()
+        self.assertTrue(subscription.is_active)
+
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('blog:post_list'))
+        subscription.refresh_from_db()
+        self.assertFalse(subscription.is_active)
+
+        self.client.post(
+            reverse('blog:newsletter_unsubscribe', args=[token + 'x'])
+        )
+        self.assertEqual(
+            NewsletterSubscription.objects.filter(is_active=True).count(), 4
+        )
+
+    def test_send_newsletter_command(self):
+        """Test the command builds and sends an issue."""
+        out = StringIO()
+        call_command('send_newsletter', stdout=out)
+        self.assertIn('sent 5 message(s)', out.getvalue())
+        self.assertEqual(len(mail.outbox), 5)
+        call_command('send_newsletter', stdout=out)
+        self.assertIn('No posts published', out.getvalue())
+
+
+class ReactionToggleTest(TestCase):
+    """Test cases for toggling reactions and the reaction JSON API."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader', password='readerpass123'
+        )
+        self.post = Post.objects.create(
+            title='Reactable', content='Words', author=self.user,
+            status='published'
+        )
+        self.url = reverse('blog:add_reaction', args=[self.post.slug])
+        self.client.force_login(self.user)
+
+    def react(self, reaction_type):
+        return self.client.post(
+            self.url, {'reaction_type': reaction_type},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+    def test_toggle_adds_switches_and_removes(self):
+        """Test repeated clicks add, switch and remove one reaction."""
+        response = self.react('like')
+        self.assertEqual(response.json()['reaction'], 'like')
+        self.assertEqual(response.json()['counts']['like'], 1)
+
+        data = self.react('love').json()
+        self.assertEqual(data['reaction'], 'love')
+        self.assertEqual(data['counts']['like'], 0)
+        self.assertEqual(data['counts']['love'], 1)
+
+        data = self.react('love').json()
+        self.assertIsNone(data['reaction'])
+        self.assertEqual(set(data['counts'].values()), {0})
+        self.assertFalse(PostReaction.objects.exists())
+        self.assertFalse(find_drift().exists())
+
+    def test_toggle_writes_once(self):
+        """Test a switch is one locked read and one update of the row."""
+        PostReaction.objects.toggle(self.post, self.user, 'like')
+        with CaptureQueriesContext(connection) as queries:
+            PostReaction.objects.toggle(self.post, self.user, 'wow')
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if 'blog_postreaction' in query['sql'].split(' WHERE')[0]
+        ]
+        self.assertEqual(len(writes), 2)
+        self.assertTrue(writes[1].startswith('UPDATE'))
+
+    def test_concurrent_first_click_toggles_existing_row(self):
+        """Test losing the insert race toggles the row that won it."""
+        PostReaction.objects.create(
+            post=self.post, user=self.user, reaction_type='like'
+        )
+        empty = PostReaction.objects.none()
+        with mock.patch.object(
+            PostReaction.objects, 'select_for_update',
+            side_effect=[empty, PostReaction.objects.all()]
+        ):
+            result = PostReaction.objects.toggle(self.post, self.user, 'like')
+        self.assertIsNone(result)
+        self.assertFalse(PostReaction.objects.exists())
+
+    def test_form_post_redirects(self):
+        """Test clients without scripts are redirected back to the post."""
+        response = self.client.post(self.url, {'reaction_type': 'laugh'})
+        self.assertRedirects(response, self.post.get_absolute_url())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.laugh_count, 1)
+
+    def test_rejects_unknown_reactions_and_get(self):
+        """Test invalid reaction types and GET requests change nothing."""
+        self.assertEqual(self.react('meh').status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertFalse(PostReaction.objects.exists())
+
+    def test_detail_page_marks_the_current_reaction(self):
+        """Test the reader's reaction button is rendered active."""
+        self.react('love')
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertContains(
+            response, 'reaction-btn active" data-reaction="love" '
+                      'aria-pressed="true"'
+        )
+        self.assertContains(response, 'aria-pressed="false"', count=2)
+
+        self.client.logout()
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertNotContains(response, 'reaction-btn active')
+
+
+class ReaderStateTest(TestCase):
+    """Test cases for the reader's reactions and progress on lists."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='reader', password='readerpass123'
+        )
+        self.category = Category.objects.create(name='Python')
+        self.posts = [
+            Post.objects.create(
+                title=f'Listed {n}', content='Words', author=self.user,
+                category=self.category, status='published', featured=n < 2
+            )
+            for n in range(4)
+        ]
+        PostReaction.objects.create(
+            post=self.posts[0], user=self.user, reaction_type='love'
+        )
+        ReadingProgress.objects.create(
+            post=self.posts[1], user=self.user, progress_percentage=60
+        )
+        self.client.force_login(self.user)
+
+    def test_attach_loads_state_in_two_queries(self):
+        """Test every list on a page shares the same two queries."""
+        featured = list(Post.objects.filter(featured=True).for_list())
+        everything = list(Post.objects.for_list())
+        reading_progress.record(self.user.pk, self.posts[2].pk, 30)
+        with self.assertNumQueries(2):
+            reader_state.attach(self.user, featured, everything)
+        by_pk = {post.pk: post for post in everything}
+        self.assertEqual(by_pk[self.posts[0].pk].user_reaction, 'love')
+        self.assertEqual(by_pk[self.posts[1].pk].user_progress, 60)
+        # Progress still in the write-behind buffer is shown too
+        self.assertEqual(by_pk[self.posts[2].pk].user_progress, 30)
+        self.assertIsNone(by_pk[self.posts[3].pk].user_reaction)
+        self.assertEqual(
+            {post.pk: post.user_progress for post in featured},
+            {self.posts[0].pk: None, self.posts[1].pk: 60}
+        )
+        reading_progress.drain()
+
+    def test_attach_skips_anonymous_visitors(self):
+        """Test anonymous visitors get empty state without queries."""
+        posts = list(Post.objects.for_list())
+        with self.assertNumQueries(0):
+            reader_state.attach(AnonymousUser(), posts)
+        self.assertIsNone(posts[0].user_reaction)
+
+    def test_list_pages_show_reader_state(self):
+        """Test the listings render the reader's badges."""
+        for url in (reverse('blog:landing_page'), reverse('blog:post_list'),
+                    self.category.get_absolute_url()):
+            response = self.client.get(url)
+            self.assertContains(response, 'You reacted: Love')
+            self.assertContains(response, "You've read 60%")
+
+    def test_trending_posts_show_reader_state(self):
+        """Test trending lists carry the reader's badges too."""
+        trending.add_views({self.posts[0].pk: 5})
+        # Besides the featured and recent posts, or the main list
+        for url, badges in ((reverse('blog:landing_page'), 3),
+                            (reverse('blog:post_list'), 2)):
+            response = self.client.get(url)
+            trending_posts = response.context['trending_posts']
+            self.assertEqual(trending_posts, [self.posts[0]])
+            self.assertEqual(trending_posts[0].user_reaction, 'love')
+            self.assertContains(response, 'You reacted: Love', count=badges)
+
+    def test_reader_state_queries_do_not_grow_with_posts(self):
+        """Test a longer category page runs no extra queries."""
+        url = self.category.get_absolute_url()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        for n in range(4):
+            post = Post.objects.create(
+                title=f'More {n}', content='Words', author=self.user,
+                category=self.category, status='published'
+            )
+            PostReaction.objects.create(
+                post=post, user=self.user, reaction_type='like'
+            )
+        cache.clear()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(after), len(before))
+
+    def test_reacting_invalidates_validators(self):
+        """Test a page revalidated after reacting is rendered again."""
+        url = self.category.get_absolute_url()
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            PostReaction.objects.toggle(self.posts[3], self.user, 'wow')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'You reacted: Wow')
+
+
+class InstrumentationTest(TestCase):
+    """Test cases for the request instrumentation middleware."""
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.stats.reset()
+        self.user = User.objects.create_user(
+            username='author', password='authorpass123'
+        )
+        self.post = Post.objects.create(
+            title='Measured', content='Words', author=self.user,
+            status='published'
+        )
+
+    def test_records_queries_and_timings_per_route(self):
+        """Test each routed request is recorded under its URL name."""
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get('/no-such-page/')
+
+        routes = instrumentation.stats.summary()
+        self.assertEqual(list(routes), ['blog:post_detail'])
+        figures = routes['blog:post_detail']
+        self.assertEqual(figures['requests'], 2)
+        self.assertGreater(figures['queries']['p50'], 0)
+        self.assertGreater(figures['db']['p50'], 0)
+        self.assertGreater(figures['template']['p50'], 0)
+        self.assertGreaterEqual(
+            figures['total']['p99'], figures['template']['p99']
+        )
+
+    def test_samples_are_bounded(self):
+        """Test only the latest samples of a route are kept."""
+        with self.settings(BLOG_INSTRUMENTATION_SAMPLES=3):
+            instrumentation.stats.reset()
+            for n in range(5):
+                instrumentation.stats.add('route', (n, 0, 0, n))
+        figures = instrumentation.stats.summary()['route']
+        self.assertEqual((figures['requests'], figures['samples']), (5, 3))
+        self.assertEqual(figures['queries']['p50'], 3)
+        self.assertEqual(figures['queries']['p99'], 4)
+
+    def test_server_timing_header(self):
+        """Test the measurements are sent to clients only when enabled."""
+        url = reverse('blog:post_list')
+        self.assertFalse(self.client.get(url).has_header('Server-Timing'))
+        with self.settings(BLOG_SERVER_TIMING=True):
+            response = self.client.get(url)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, '
+            r'total;dur=[\d.]+$'
+        )
+
+    def test_stats_endpoint_is_staff_only(self):
+        """Test only staff can read the percentiles."""
+        url = reverse('blog:instrumentation_stats')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(self.post.get_absolute_url())
+        data = self.client.get(url).json()
+        self.assertIn('blog:post_detail', data['routes'])
+        self.assertIn('p95', data['routes']['blog:post_detail']['total'])
+
+
+@override_settings(BLOG_VIEW_COUNT_FLUSH_THRESHOLD=1000,
+                   BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+class PostObjectLoadingTest(TestCase):
+    """Test the post views load the post and the requester once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pw')
+        cls.author.userprofile.role = 'author'
+        cls.author.userprofile.save()
+        cls.other = User.objects.create_user('other', password='pw')
+        cls.admin = User.objects.create_user('admin', password='pw')
+        cls.admin.userprofile.role = 'admin'
+        cls.admin.userprofile.save()
+        category = Category.objects.create(name='Django', slug='django')
+        cls.post = Post.objects.create(
+            title='Loaded once', slug='loaded-once', author=cls.author,
+            category=category, content='<p>Body</p>', status='published',
+        )
+        cls.post.tags.add(Tag.objects.create(name='orm', slug='orm'))
+
+    def request(self, user, method, name, data=None):
+        """Make a request as ``user``; returns (response, SQL run)."""
+        self.client.force_login(user)
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        url = reverse(f'blog:{name}', args=[self.post.slug])
+        with connection.execute_wrapper(record):
+            response = getattr(self.client, method)(url, data or {})
+        return response, statements
+
+    def assertLoadedOnce(self, statements):
+        """Assert the post was read once and no profile on its own."""
+        posts = [sql for sql in statements
+                 if sql.startswith('SELECT "blog_post"."id", ') and
+                 '"blog_post"."slug" = %s' in sql]
+        self.assertEqual(len(posts), 1, posts)
+        reads = [sql for sql in statements
+                 if sql.startswith('SELECT "blog_userprofile"')]
+        self.assertEqual(reads, [])
+
+    def test_views_load_the_post_once(self):
+        """Test each view fetches the post and the profiles once."""
+        cases = (
+            (self.other, 'post_detail', 7),
+            (self.author, 'post_edit', 6),
+            (self.author, 'post_delete', 3),
+        )
+        for user, name, queries in cases:
+            with self.subTest(view=name):
+                cache.clear()
+                response, statements = self.request(user, 'get', name)
+                self.assertEqual(response.status_code, 200)
+                self.assertLoadedOnce(statements)
+                self.assertEqual(len(statements), queries, statements)
+        view_counts.drain()
+
+    def test_edit_submission_reuses_the_post(self):
+        """Test saving an edit loads the post once."""
+        response, statements = self.request(
+            self.author, 'post', 'post_edit', {
+                'title': 'Edited', 'slug': self.post.slug,
+                'content': '<p>New body</p>', 'status': 'published',
+                'category': self.post.category_id,
+                'tags': [tag.pk for tag in self.post.tags.all()],
+            }
+        )
+        self.assertRedirects(response, self.post.get_absolute_url(),
+                             fetch_redirect_response=False)
+        self.assertLoadedOnce(statements)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'Edited')
+
+    def test_non_owners_are_turned_away(self):
+        """Test the permission check needs only the post."""
+        cases = (('get', 'post_edit', 4), ('post', 'post_delete', 3))
+        for method, name, queries in cases:
+            with self.subTest(view=name, method=method):
+                response, statements = self.request(self.other, method, name)
+                self.assertRedirects(
+                    response, self.post.get_absolute_url(),
+                    fetch_redirect_response=False,
+                )
+                self.assertLoadedOnce(statements)
+                self.assertEqual(len(statements), queries, statements)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_moderators_pass_the_permission_check(self):
+        """Test admins may delete posts they did not write."""
+        response, _ = self.request(self.admin, 'post', 'post_delete')
+        self.assertRedirects(response, reverse('blog:post_list'),
+                             fetch_redirect_response=False)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+
+
+# Most queries each URL name may run with a cold cache, as
+# (visitor, method, budget). Every URL in blog/urls.py needs an entry, so
+# new views get a budget when they are added. Budgets hold a couple of
+# queries of headroom; a view going over them usually means a template
+# or queryset change brought back per-row queries.
+QUERY_BUDGETS = {
+    'register': ('anonymous', 'get', 2),
+    'profile': ('author', 'get', 7),
+    'edit_profile': ('author', 'get', 5),
+    'login': ('anonymous', 'get', 2),
+    'logout': ('reader', 'post', 6),
+    'password_reset': ('anonymous', 'get', 2),
+    'password_reset_done': ('anonymous', 'get', 2),
+    'password_reset_confirm': ('anonymous', 'get', 3),
+    'password_reset_complete': ('anonymous', 'get', 2),
+    'landing_page': ('reader', 'get', 11),
+    'post_list': ('reader', 'get', 12),
+    'post_create': ('author', 'get', 6),
+    'post_detail': ('reader', 'get', 9),
+    'post_edit': ('author', 'get', 8),
+    'post_delete': ('author', 'get', 5),
+    'add_comment': ('reader', 'post', 9),
+    'delete_comment': ('reader', 'get', 10),
+    'category_detail': ('reader', 'get', 9),
+    'tag_detail': ('reader', 'get', 9),
+    'about': ('anonymous', 'get', 2),
+    'contact': ('anonymous', 'get', 2),
+    'newsletter_subscribe': ('anonymous', 'post', 4),
+    'newsletter_unsubscribe': ('anonymous', 'get', 3),
+    'add_reaction': ('reader', 'post', 12),
+    'analytics_dashboard': ('author', 'get', 8),
+    'instrumentation_stats': ('staff', 'get', 4),
+    'advanced_search': ('reader', 'get', 8),
+    'update_reading_progress': ('reader', 'post', 5),
+    'record_reading_progress': ('reader', 'post', 4),
+    'sitemap': ('anonymous', 'get', 8),
+    'sitemap_section': ('anonymous', 'get', 4),
+    'post_feed': ('anonymous', 'get', 3),
+    'post_feed_atom': ('anonymous', 'get', 3),
+    'category_feed': ('anonymous', 'get', 4),
+    'category_feed_atom': ('anonymous', 'get', 4),
+    'tag_feed': ('anonymous', 'get', 4),
+    'tag_feed_atom': ('anonymous', 'get', 4),
+    'author_feed': ('anonymous', 'get', 4),
+    'author_feed_atom': ('anonymous', 'get', 4),
+    'terms': ('anonymous', 'get', 2),
+    'privacy': ('anonymous', 'get', 2),
+}
+
+
+@override_settings(
+    # Keep buffered writes out of the measured requests
+    BLOG_VIEW_COUNT_FLUSH_THRESHOLD=10 ** 6,
+    BLOG_VIEW_COUNT_FLUSH_INTERVAL=10 ** 6,
+    BLOG_READING_PROGRESS_FLUSH_THRESHOLD=10 ** 6,
+    BLOG_READING_PROGRESS_FLUSH_INTERVAL=10 ** 6,
+)
+class QueryBudgetTest(TestCase):
+    """
+    Query budgets of every URL against a seeded database of thousands of
+    rows. Set BLOG_QUERY_BUDGET_REPORT to a file path to also write the
+    query counts and timings of each URL there as JSON.
+    """
+    # Filled by the budget test; not test data, so shared by every test
+    report = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        seed.generate(posts=300, users=50, comments=3000, reactions=2000,
+                      progress=1500, subscribers=100)
+        # The most discussed post, and users to view it as
+        cls.post = Post.objects.published().order_by(
+            '-comment_count', 'pk'
+        ).select_related('author', 'category').first()
+        cls.visitors = {
+            'anonymous': None,
+            'author': cls.post.author,
+            'reader': User.objects.filter(
+                userprofile__role='reader'
+            ).order_by('pk').first(),
+            'staff': User.objects.create_user(
+                username='staff', password='staffpass123', is_staff=True
+            ),
+        }
+        tag = cls.post.tags.first() or Tag.objects.order_by('pk').first()
+        comment = Comment.objects.create(
+            post=cls.post, author=cls.visitors['reader'], content='Mine'
+        )
+        subscription = NewsletterSubscription.objects.order_by('pk').first()
+        reader = cls.visitors['reader']
+        cls.kwargs = {
+            'password_reset_confirm': {
+                'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+                'token': default_token_generator.make_token(reader),
+            },
+            'delete_comment': {'comment_id': comment.pk},
+            'newsletter_unsubscribe': {
+                'token': newsletter.unsubscribe_token(subscription.pk)
+            },
+            'sitemap_section': {'section': 'posts'},
+        }
+        for name in ('post_detail', 'post_edit', 'post_delete',
+                     'add_comment', 'add_reaction',
+                     'update_reading_progress'):
+            cls.kwargs[name] = {'slug': cls.post.slug}
+        for name in ('category_detail', 'category_feed',
+                     'category_feed_atom'):
+            cls.kwargs[name] = {'slug': cls.post.category.slug}
+        for name in ('tag_detail', 'tag_feed', 'tag_feed_atom'):
+            cls.kwargs[name] = {'slug': tag.slug}
+        for name in ('author_feed', 'author_feed_atom'):
+            cls.kwargs[name] = {'username': cls.post.author.username}
+        cls.data = {
+            'add_comment': {'content': 'Measured comment'},
+            'add_reaction': {'reaction_type': 'wow'},
+            'newsletter_subscribe': {'email': 'budget@example.com'},
+            'update_reading_progress': {'progress': '40'},
+        }
+
+    def setUp(self):
+        # Views and progress buffered by earlier tests refer to rows rolled
+        # back with them; flushing them here would skew the counts
+        view_counts.drain()
+        reading_progress.drain()
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.environ.get('BLOG_QUERY_BUDGET_REPORT')
+        if path and cls.report:
+            with open(path, 'w') as report:
+                json.dump(cls.report, report, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    def measure(self, name):
+        """Request URL ``name`` cold; returns (response, queries, ms)."""
+        visitor, method, _ = QUERY_BUDGETS[name]
+        self.client.logout()
+        if self.visitors[visitor] is not None:
+            self.client.force_login(self.visitors[visitor])
+        cache.clear()
+        instrumentation.stats.reset()
+        url = reverse(f'blog:{name}', kwargs=self.kwargs.get(name))
+        if name == 'record_reading_progress':
+            response = self.client.post(
+                url, json.dumps({'updates': [
+                    {'post': self.post.pk, 'progress': 55}
+                ]}), content_type='application/json'
+            )
+        else:
+            response = getattr(self.client, method)(
+                url, self.data.get(name, {})
+            )
+        figures = instrumentation.stats.summary()[f'blog:{name}']
+        return (response, figures['queries']['max'],
+                figures['total']['max'])
+
+    def test_every_url_has_a_budget(self):
+        """Test no URL of the blog app is left without a query budget."""
+        names = {
+            pattern.name for pattern in get_resolver('blog.urls').url_patterns
+        }
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_views_stay_within_query_budgets(self):
+        """Test every URL runs at most its budgeted number of queries."""
+        for name, (visitor, method, budget) in QUERY_BUDGETS.items():
+            with self.subTest(url=name, visitor=visitor):
+                response, queries, milliseconds = self.measure(name)
+                self.report[name] = {
+                    'status': response.status_code, 'queries': queries,
+                    'budget': budget, 'ms': milliseconds,
+                }
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(
+                    queries, budget,
+                    f'{name} ran {queries} queries, over its budget of '
+                    f'{budget}'
+                )
+
+
+class LoadTestToolsTest(TestCase):
+    """Test the synthetic data command and the load-test driver."""
+
+    def test_generate_fake_data_command(self):
+        """Test the command writes the requested scale of data."""
+        out = StringIO()
+        call_command(
+            'generate_fake_data', posts=20, users=10, categories=2, tags=4,
+            comments=30, reactions=15, progress=10, subscribers=6,
+            scale=0.5, stdout=out,
+        )
+        self.assertEqual(Post.objects.count(), 10)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(NewsletterSubscription.objects.count(), 3)
+        self.assertIn(seed.PASSWORD, out.getvalue())
+
+    def test_generate_counts_rows_actually_written(self):
+        """Test the summary leaves out subscribers that already existed."""
+        NewsletterSubscription.objects.create(
+            email='seed-reader-1@example.com'
+        )
+        counts = seed.generate(posts=4, users=2, comments=3, reactions=2,
+                               progress=2, subscribers=3)
+        self.assertEqual(counts['subscribers'], 2)
+        self.assertEqual(NewsletterSubscription.objects.count(), 3)
+
+    def test_url_mix_is_reproducible_and_resolves(self):
+        """Test a seed replays the same paths and every path is served."""
+        seed.generate(posts=20, users=5, comments=10, reactions=5,
+                      progress=5, subscribers=1)
+        first, second = (
+            loadtest.URLMix(random.Random(3), signed_in=True)
+            for _ in range(2)
+        )
+        self.assertEqual([first.draw() for _ in range(50)],
+                         [second.draw() for _ in range(50)])
+        mix = loadtest.URLMix(random.Random(3), signed_in=True)
+        self.client.login(username='seed-user-0', password=seed.PASSWORD)
+        seen = set()
+        for _ in range(200):
+            name, path = mix.draw()
+            if name in seen:
+                continue
+            seen.add(name)
+            with self.subTest(page=name):
+                self.assertEqual(self.client.get(path).status_code, 200)
+        self.assertEqual(
+            seen,
+            {name for name, _ in loadtest.PUBLIC_MIX + loadtest.READER_MIX}
+        )
+        view_counts.drain()
+
+    def test_report_percentiles(self):
+        """Test the report summarises latencies per page and overall."""
+        report = loadtest.Report()
+        report.start()
+        for ms in range(1, 101):
+            report.add('post_detail', ms / 1000, 200)
+        report.add('about', 0.5, 500)
+        report.stop()
+        rows = {row[0]: row for row in report.rows()}
+        self.assertEqual(rows['post_detail'][1:3], (100, 0))
+        self.assertAlmostEqual(rows['post_detail'][3]['p90'], 90)
+        self.assertEqual(rows['about'][2], 1)
+        self.assertEqual(rows['all'][1:3], (101, 1))
+        self.assertEqual(report.rows()[-1][0], 'all')
+        self.assertGreater(report.throughput, 0)
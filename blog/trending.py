@@ -0,0 +1,112 @@
+"""
+Trending posts from hourly view buckets.
+
+Every view count buffer flush adds the flushed views to the current
+hour's ``PostViewBucket`` of each post. A post's trending score is the
+sum of its recent buckets, each weighted by how long ago its hour was::
+
+    score = sum(views * 0.5 ** (age_in_hours / TRENDING_HALF_LIFE))
+
+over the last ``TRENDING_WINDOW`` hours, so a view from a day ago counts
+half as much as one from the current hour. The score is computed by the
+database over at most ``TRENDING_WINDOW`` buckets per post, never from
+individual views, and the resulting list is cached.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .cache import cached
+from .models import Post, PostViewBucket
+
+# Hours of buckets that contribute to the score
+TRENDING_WINDOW = 72
+# Hours after which a view is worth half as much
+TRENDING_HALF_LIFE = 24
+
+
+def current_hour(now=None):
+    """Start of the hour containing ``now`` (default: the current time)."""
+    now = now or timezone.now()
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def add_views(counts, hour=None):
+    """
+    Add ``counts``, a mapping of post id to views, to the buckets of
+    ``hour`` (default: the current hour).
+    """
+    hour = hour or current_hour()
+    by_increment = defaultdict(list)
+    for post_id, views in counts.items():
+        if views:
+            by_increment[views].append(post_id)
+    if not by_increment:
+        return
+    with transaction.atomic(savepoint=False):
+        PostViewBucket.objects.bulk_create(
+            [
+                PostViewBucket(post_id=post_id, hour=hour)
+                for post_ids in by_increment.values() for post_id in post_ids
+            ],
+            ignore_conflicts=True,
+        )
+        for views, post_ids in by_increment.items():
+            PostViewBucket.objects.filter(
+                post_id__in=post_ids, hour=hour
+            ).update(views=F('views') + views)
+
+
+def trending_scores(limit=5, now=None):
+    """
+    Return up to ``limit`` ``(post_id, score)`` pairs of published posts,
+    highest score first.
+    """
+    hour = current_hour(now)
+    # One weight per bucket hour in the window
+    weight = Case(
+        *[
+            When(hour=hour - timedelta(hours=age),
+                 then=Value(0.5 ** (age / TRENDING_HALF_LIFE)))
+            for age in range(TRENDING_WINDOW)
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    scores = PostViewBucket.objects.filter(
+        hour__gt=hour - timedelta(hours=TRENDING_WINDOW),
+        hour__lte=hour,
+        post__status='published',
+    ).values('post').annotate(
+        score=Sum(F('views') * weight, output_field=FloatField())
+    ).order_by('-score', '-post')[:limit]
+    return [(row['post'], row['score']) for row in scores]
+
+
+def get_trending_posts(limit=5):
+    """
+    Posts with the highest trending scores in list mode, each with a
+    ``trending_score`` attribute. Cached like other page fragments.
+    """
+    def build():
+        scores = trending_scores(limit)
+        posts = Post.objects.published().for_list().in_bulk(
+            [post_id for post_id, _ in scores]
+        )
+        trending = []
+        for post_id, score in scores:
+            if post_id in posts:
+                posts[post_id].trending_score = score
+                trending.append(posts[post_id])
+        return trending
+    return cached('trending_posts', build, limit)
+
+
+def prune_buckets(keep_hours=TRENDING_WINDOW):
+    """Delete buckets older than ``keep_hours``; returns the count."""
+    cutoff = current_hour() - timedelta(hours=keep_hours)
+    deleted, _ = PostViewBucket.objects.filter(hour__lte=cutoff).delete()
+    return deleted
@@ -83,6 +83,9 @@ urlpatterns = [
     # Newsletter subscription (AJAX endpoint)
     path('newsletter/subscribe/', views.newsletter_subscribe,
          name='newsletter_subscribe'),
+    # Signed link included in every newsletter
+    path('newsletter/unsubscribe/<str:token>/', views.newsletter_unsubscribe,
+         name='newsletter_unsubscribe'),
 
     # Post reactions system (AJAX endpoint for like/love/etc)
     path('post/<slug:slug>/react/', views.add_reaction, name='add_reaction'),
@@ -90,6 +93,10 @@ urlpatterns = [
     # Analytics dashboard (author/admin only)
     path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
 
+    # Request timing percentiles per view (staff only, JSON)
+    path('instrumentation/', views.instrumentation_stats,
+         name='instrumentation_stats'),
+
     # Advanced search with multiple filters
     path('search/', views.advanced_search, name='advanced_search'),
 
@@ -97,6 +104,29 @@ urlpatterns = [
     # Updates user's reading progress percentage for a post
     path('post/<slug:slug>/progress/', views.update_reading_progress,
          name='update_reading_progress'),
+    # Batched reading progress from static/js/main.js
+    path('progress/', views.record_reading_progress,
+         name='record_reading_progress'),
+
+    # === SITEMAPS AND FEEDS ===
+    # Sitemap index, pointing at one sitemap per section
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    path('sitemap-<section>.xml', views.sitemap_section,
+         name='sitemap_section'),
+    # RSS and Atom feeds for the site, categories, tags and authors
+    path('feed/', views.post_feed, name='post_feed'),
+    path('feed/atom/', views.post_feed_atom, name='post_feed_atom'),
+    path('category/<slug:slug>/feed/', views.category_feed,
+         name='category_feed'),
+    path('category/<slug:slug>/feed/atom/', views.category_feed_atom,
+         name='category_feed_atom'),
+    path('tag/<slug:slug>/feed/', views.tag_feed, name='tag_feed'),
+    path('tag/<slug:slug>/feed/atom/', views.tag_feed_atom,
+         name='tag_feed_atom'),
+    path('author/<str:username>/feed/', views.author_feed,
+         name='author_feed'),
+    path('author/<str:username>/feed/atom/', views.author_feed_atom,
+         name='author_feed_atom'),
 
     # === LEGAL PAGES ===
     path('terms/', views.terms_of_service_view, name='terms'),
@@ -0,0 +1,61 @@
+import re
+from collections import Counter
+from html import unescape
+
+# Script/style bodies are not readable text and must not be indexed
+_NON_TEXT_ELEMENT_RE = re.compile(
+    r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL
+)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Average adult reading speed
+WORDS_PER_MINUTE = 200
+
+_WORD_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+
+# Common English words that say nothing about what a post is about
+STOP_WORDS = frozenset('''
+    about above after again against all also and any are because been
+    before being below between both but can could did does doing down
+    during each few for from further had has have having her here hers
+    herself him himself his how into its itself just more most myself
+    nor not now off once only other our ours ourselves out over own same
+    she should some such than that the their theirs them themselves then
+    there these they this those through too under until very was were
+    what when where which while who whom why will with would you your
+    yours yourself yourselves use using used one two get like make way
+'''.split())
+
+# Distinct terms kept in a post's term vector
+TERM_VECTOR_SIZE = 40
+
+
+def html_to_text(html):
+    """
+    Convert rich text HTML (e.g. CKEditor content) to plain text.
+
+    Tags are replaced with spaces rather than removed so that words in
+    adjacent block elements (``<p>one</p><p>two</p>``) stay separate.
+    """
+    if not html:
+        return ''
+    text = _NON_TEXT_ELEMENT_RE.sub(' ', html)
+    text = _TAG_RE.sub(' ', text)
+    return ' '.join(unescape(text).split())
+
+
+def estimate_reading_time(word_count):
+    """Reading time in whole minutes for ``word_count`` words (minimum 1)."""
+    return max(1, round(word_count / WORDS_PER_MINUTE))
+
+
+def term_vector(text, size=TERM_VECTOR_SIZE):
+    """
+    Return the ``size`` most frequent meaningful words of ``text`` as a
+    ``{term: count}`` dict, used to compare posts by their wording.
+    """
+    counts = Counter(
+        word for word in _WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS
+    )
+    return dict(counts.most_common(size))
@@ -1,47 +1,155 @@
+import json
+from datetime import date, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.sitemaps import views as sitemap_views
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.http import JsonResponse
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, DeleteView
 )
 from django.urls import reverse_lazy
+from django.utils import timezone
 
-from .models import Post, Comment, Category, Tag
+from . import feeds, instrumentation, newsletter, reader_state, rollups
+from .buffers import reading_progress, view_counts
+from .cache import (
+    cached, cached_response, content_conditional, get_generation,
+    get_generation_time,
+)
+from .conditional import ConditionalPageMixin, Validator, conditional_page
+from .counters import COUNTER_FIELDS, reaction_field
+from .pagination import (
+    CursorPaginationMixin, CursorPaginator, POST_ORDERING, SEARCH_ORDERING
+)
+from .models import (
+    Post, Comment, Category, Tag, NewsletterSubscription, PostReaction,
+    REACTION_CHOICES
+)
+from .search import search_posts
+from .sitemaps import SITEMAPS
+from .trending import get_trending_posts
 from .forms import (
     CustomUserCreationForm, UserUpdateForm, UserProfileForm,
     CommentForm, PostForm, PostSearchForm
 )
 
 
+# Cached fragments shared by several pages
+def get_featured_posts():
+    """Latest three featured posts, cached until content changes."""
+    return cached('featured_posts', lambda: list(
+        Post.objects.published().for_list().filter(
+            featured=True).order_by('-published_at')[:3]
+    ))
+
+
+def get_sidebar_categories():
+    """All categories with their published post counts, cached."""
+    return cached('sidebar_categories', lambda: list(
+        Category.objects.annotate(published_post_count=Count(
+            'post', filter=Q(post__status='published')))
+    ))
+
+
+def get_sidebar_tags():
+    """All tags, cached until content changes."""
+    return cached('sidebar_tags', lambda: list(Tag.objects.all()))
+
+
 # Landing Page
+def _landing_page_validator(request):
+    # Every post on the page is published; a later edit or a change in
+    # their number alters it, and so does any other content change, such
+    # as a post becoming featured. Cached until the next content change.
+    def build():
+        latest = Post.objects.published().aggregate(
+            last_update=Max('updated_at'), total=Count('pk')
+        )
+        last_modified = max(
+            value for value in (latest['last_update'], get_generation_time())
+            if value
+        )
+        return Validator(last_modified, latest['total'], get_generation())
+    validator = cached('landing_page_validator', build)
+    # Trending posts follow views rather than content changes: their own
+    # cache entry can be rebuilt within a generation
+    trending = tuple(post.pk for post in get_trending_posts())
+    return Validator(validator.last_modified, *validator.state, trending)
+
+
+@conditional_page(_landing_page_validator)
 def landing_page(request):
     """
     Landing page view with featured posts and site overview.
     """
-    # Get featured posts and recent posts
-    featured_posts = Post.objects.filter(
-        status='published', featured=True
-    ).order_by('-published_at')[:3]
+    # Featured posts, recent posts and the post count are cached until
+    # the next content change (see blog/cache.py)
+    featured_posts = get_featured_posts()
 
-    recent_posts = Post.objects.filter(
-        status='published'
-    ).order_by('-published_at')[:6]
+    recent_posts = cached('recent_posts', lambda: list(
+        Post.objects.published().for_list().order_by('-published_at')[:6]
+    ))
 
     # Get post count for stats
-    total_posts = Post.objects.filter(status='published').count()
+    total_posts = cached(
+        'published_post_count',
+        Post.objects.filter(status='published').count
+    )
+
+    trending_posts = get_trending_posts()
+
+    # The reader's reactions and progress on every card, in two queries
+    reader_state.attach(
+        request.user, featured_posts, recent_posts, trending_posts
+    )
 
     context = {
         'featured_posts': featured_posts,
+        'trending_posts': trending_posts,
         'recent_posts': recent_posts,
         'total_posts': total_posts,
     }
     return render(request, 'blog/landing_page.html', context)
 
 
+# Sitemaps and feeds look the same to every visitor: whole responses are
+# cached and revalidated against the content generation (see cache.py)
+def published_view(name, view):
+    return content_conditional(cached_response(name)(view))
+
+
+def _sitemap_index(request):
+    return sitemap_views.index(
+        request, SITEMAPS, sitemap_url_name='blog:sitemap_section'
+    )
+
+
+def _sitemap_section(request, section):
+    return sitemap_views.sitemap(request, SITEMAPS, section=section)
+
+
+sitemap_index = published_view('sitemap_index', _sitemap_index)
+sitemap_section = published_view('sitemap_section', _sitemap_section)
+post_feed = published_view('post_feed', feeds.LatestPostsFeed())
+post_feed_atom = published_view('post_feed_atom', feeds.LatestPostsAtomFeed())
+category_feed = published_view('category_feed', feeds.CategoryFeed())
+category_feed_atom = published_view(
+    'category_feed_atom', feeds.CategoryAtomFeed())
+tag_feed = published_view('tag_feed', feeds.TagFeed())
+tag_feed_atom = published_view('tag_feed_atom', feeds.TagAtomFeed())
+author_feed = published_view('author_feed', feeds.AuthorFeed())
+author_feed_atom = published_view('author_feed_atom', feeds.AuthorAtomFeed())
+
+
 # Authentication Views
 def register_view(request):
     """
@@ -73,7 +181,7 @@ def profile_view(request):
     """
     user_posts = Post.objects.filter(
         author=request.user
-    ).order_by('-created_at')
+    ).for_list().order_by('-created_at')
     paginator = Paginator(user_posts, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -118,7 +226,7 @@ def edit_profile_view(request):
 
 
 # Blog Views
-class PostListView(ListView):
+class PostListView(CursorPaginationMixin, ListView):
     """
     Main blog post listing view with search and filtering.
     """
@@ -128,18 +236,16 @@ class PostListView(ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        # Optimize database queries with select_related and prefetch_related
-        queryset = Post.objects.filter(status='published').select_related(
-            'author', 'category').prefetch_related('tags')
+        # Card fields only (no content column), with author and category
+        # joined and tags prefetched
+        queryset = Post.objects.published().for_list().prefetch_related(
+            'tags')
 
-        # Search functionality - case-insensitive matching
+        # Full-text search through the shared search backend; results
+        # are ranked best match first instead of by date
         query = self.request.GET.get('query')
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(excerpt__icontains=query)
-            )
+            queryset = search_posts(queryset, query)
 
         # Category filtering using slug for SEO-friendly URLs
         category = self.request.GET.get('category')
@@ -151,75 +257,160 @@ class PostListView(ListView):
         if tag:
             queryset = queryset.filter(tags__slug=tag)
 
+        if query:
+            return queryset
         return queryset.order_by('-published_at')
 
+    def get_cursor_ordering(self):
+        # Pages of search results follow the relevance ranking
+        if self.request.GET.get('query'):
+            return SEARCH_ORDERING
+        return POST_ORDERING
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_form'] = PostSearchForm(self.request.GET)
-        context['categories'] = Category.objects.all()
-        context['tags'] = Tag.objects.all()
-        context['featured_posts'] = Post.objects.filter(
-            status='published', featured=True)[:3]
+        context['categories'] = get_sidebar_categories()
+        context['tags'] = get_sidebar_tags()
+        context['featured_posts'] = get_featured_posts()
+        context['trending_posts'] = get_trending_posts()
+        reader_state.attach(
+            self.request.user, context['posts'], context['trending_posts']
+        )
         return context
 
 
-class PostDetailView(DetailView):
+class PostObjectMixin:
     """
-    Individual blog post view with comments.
+    Load the post of a single-post view once per request.
+
+    The post comes with its author, the author's profile, its category and
+    its tags in two queries, and ``get_object()`` returns the same instance
+    to permission checks in ``dispatch()``, to form handling and to the
+    template. ``can_moderate()`` reads the requester's profile, which
+    ``blog.backends.ProfileBackend`` loads with ``request.user``.
     """
     model = Post
+
+    def get_queryset(self):
+        return Post.objects.select_related(
+            'author__userprofile', 'category'
+        ).prefetch_related('tags')
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_post'):
+            self._post = super().get_object()
+        return self._post
+
+    def can_moderate(self):
+        user = self.request.user
+        return (user.is_authenticated and hasattr(user, 'userprofile') and
+                user.userprofile.can_moderate())
+
+
+class PostOwnerRequiredMixin(PostObjectMixin):
+    """
+    Let only the post's author and moderators past ``dispatch()``; others
+    are sent back to the post with ``denied_message``.
+    """
+    denied_message = 'You can only change your own posts.'
+
+    def dispatch(self, request, *args, **kwargs):
+        post = self.get_object()
+        # Compare ids so the check needs neither the author nor, for the
+        # author, the requester's profile
+        if post.author_id != request.user.pk and not self.can_moderate():
+            messages.error(request, self.denied_message)
+            return redirect('blog:post_detail', slug=post.slug)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class PostDetailView(PostObjectMixin, ConditionalPageMixin, DetailView):
+    """
+    Individual blog post view with comments.
+    """
     template_name = 'blog/post_detail.html'
     context_object_name = 'post'
 
     def get_queryset(self):
-        # Optimize database queries by using select_related for ForeignKey
-        # fields (author, category) and prefetch_related for ManyToMany
-        # fields (tags). This reduces database hits from N+1 to 2-3 queries
-        queryset = Post.objects.select_related(
-            'author', 'category').prefetch_related('tags')
-
         # Show published posts to everyone, but allow authors and admins
         # to view their own draft posts
+        queryset = super().get_queryset()
         if self.request.user.is_authenticated:
-            # If user is logged in, show published posts OR posts they authored
-            # OR if they're admin, show all posts
-            if (hasattr(self.request.user, 'userprofile') and
-                    self.request.user.userprofile.can_moderate()):
-                # Admins can see all posts regardless of status
-                return queryset
-            else:
-                # Regular users see published posts + their own drafts
-                from django.db.models import Q
-                return queryset.filter(
-                    Q(status='published') | Q(author=self.request.user)
-                )
-        else:
-            # Anonymous users only see published posts
-            return queryset.filter(status='published')
+            # The reader's own reaction, to render its button as active
+            queryset = queryset.annotate(user_reaction=Subquery(
+                PostReaction.objects.filter(
+                    post=OuterRef('pk'), user=self.request.user
+                ).values('reaction_type')[:1]
+            ))
+        if self.can_moderate():
+            # Admins can see all posts regardless of status
+            return queryset
+        if self.request.user.is_authenticated:
+            # Regular users see published posts + their own drafts
+            return queryset.filter(
+                Q(status='published') | Q(author=self.request.user)
+            )
+        # Anonymous users only see published posts
+        return queryset.filter(status='published')
+
+    def get_validator(self):
+        # The post, its counters, the author's profile and the latest
+        # comment and reaction; one query over rows the page is about to
+        # render anyway. The related posts and commenters' profiles are
+        # covered by the content generation, which their changes bump
+        latest_comment = Comment.objects.filter(
+            post=OuterRef('pk')).order_by('-updated_at').values(
+            'updated_at')[:1]
+        latest_reaction = PostReaction.objects.filter(
+            post=OuterRef('pk')).order_by('-created_at').values(
+            'created_at')[:1]
+        row = self.get_queryset().prefetch_related(None).filter(
+            slug=self.kwargs['slug']
+        ).annotate(
+            last_comment=Subquery(latest_comment),
+            last_reaction=Subquery(latest_reaction),
+        ).values_list(
+            'pk', 'updated_at', 'last_comment', 'last_reaction',
+            'author__userprofile__updated_at', *COUNTER_FIELDS
+        ).first()
+        if row is None:
+            return None
+        self.validated_pk = row[0]
+        last_modified = max(
+            value for value in (*row[1:5], get_generation_time()) if value
+        )
+        return Validator(last_modified, *row, get_generation())
+
+    def not_modified_response(self, response):
+        # A revalidated page is still a view of the post
+        view_counts.record(self.validated_pk)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-
-        # Increment view count atomically to avoid race conditions
-        # Using update() instead of save() prevents race conditions when
-        # multiple users view the same post simultaneously
-        Post.objects.filter(pk=post.pk).update(view_count=post.view_count + 1)
-
-        # Get top-level comments only (replies are handled in template)
-        # parent=None filters for top-level comments, child replies are
-        # accessed via the 'replies' related manager in the template for
-        # hierarchical display. select_related('author') prevents N+1 queries
-        comments = Comment.objects.filter(
-            post=post, active=True, parent=None
-        ).select_related('author').order_by('created_at')
-
-        context['comments'] = comments
+        post = self.object
+
+        # Record the view in the write-behind buffer instead of updating
+        # the row on every hit. Buffered views are flushed in batched
+        # F('view_count') + n updates; add the pending ones for display
+        view_counts.record(post.pk)
+        post.view_count += view_counts.pending_for(post.pk)
+
+        # Load every active comment with its author in one query and
+        # assemble the reply threads in Python; the template walks
+        # comment.thread_replies instead of querying replies per comment
+        context['comments'] = Comment.objects.tree_for_post(post)
         context['comment_form'] = CommentForm()
-        # Show related posts from same category
-        context['related_posts'] = Post.objects.filter(
-            status='published', category=post.category
-        ).exclude(pk=post.pk)[:3]
+        # Closest posts by tags, category and wording, precomputed in
+        # RelatedPost (see blog/related.py) and cached per post
+        context['related_posts'] = cached(
+            'related_posts', lambda: list(Post.objects.published().filter(
+                related_from__post=post
+            ).for_list().order_by('related_from__rank')[:3]), post.pk
+        )
 
         return context
 
@@ -250,26 +441,20 @@ class PostCreateView(CreateView):
     def form_valid(self, form):
         form.instance.author = self.request.user
         messages.success(self.request, 'Post created successfully!')
-        return super().form_valid(form)
+        # One transaction: the post and its tags are refreshed together
+        # in the related lists (see blog.related.schedule)
+        with transaction.atomic():
+            return super().form_valid(form)
 
 
 @method_decorator(login_required, name='dispatch')
-class PostUpdateView(UpdateView):
+class PostUpdateView(PostOwnerRequiredMixin, UpdateView):
     """
     Update blog post view (author or admin only).
     """
-    model = Post
     form_class = PostForm
     template_name = 'blog/post_form.html'
-
-    def dispatch(self, request, *args, **kwargs):
-        post = self.get_object()
-        # Only post author or admin can edit posts
-        if (request.user != post.author and
-                not request.user.userprofile.can_moderate()):
-            messages.error(request, 'You can only edit your own posts.')
-            return redirect('blog:post_detail', slug=post.slug)
-        return super().dispatch(request, *args, **kwargs)
+    denied_message = 'You can only edit your own posts.'
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -278,26 +463,22 @@ class PostUpdateView(UpdateView):
 
     def form_valid(self, form):
         messages.success(self.request, 'Post updated successfully!')
-        return super().form_valid(form)
+        with transaction.atomic():
+            return super().form_valid(form)
 
 
 @method_decorator(login_required, name='dispatch')
-class PostDeleteView(DeleteView):
+class PostDeleteView(PostOwnerRequiredMixin, DeleteView):
     """
     Delete blog post view (author or admin only).
     """
-    model = Post
     template_name = 'blog/post_confirm_delete.html'
     success_url = reverse_lazy('blog:post_list')
+    denied_message = 'You can only delete your own posts.'
 
-    def dispatch(self, request, *args, **kwargs):
-        post = self.get_object()
-        # Only post author or admin can delete posts
-        if (request.user != post.author and
-                not request.user.userprofile.can_moderate()):
-            messages.error(request, 'You can only delete your own posts.')
-            return redirect('blog:post_detail', slug=post.slug)
-        return super().dispatch(request, *args, **kwargs)
+    def get_queryset(self):
+        # The confirmation page shows no tags
+        return super().get_queryset().prefetch_related(None)
 
     def delete(self, request, *args, **kwargs):
         messages.success(request, 'Post deleted successfully!')
@@ -353,7 +534,31 @@ def delete_comment_view(request, comment_id):
 
 
 # Category and Tag Views
-class CategoryDetailView(ListView):
+def _listing_validator(model, slug, *fields):
+    """
+    Validator of a category or tag page: its displayed ``fields`` plus the
+    latest update and number of its published posts and the content
+    generation (the sidebar and post cards show other content), cached
+    until the next content change.
+    """
+    def build():
+        published = Q(post__status='published')
+        row = model.objects.filter(slug=slug).annotate(
+            last_update=Max('post__updated_at', filter=published),
+            total=Count('post', filter=published),
+        ).values_list('last_update', 'total', *fields).first()
+        # False rather than None, so missing pages are cached too
+        if row is None:
+            return False
+        last_modified = max(
+            value for value in (row[0], get_generation_time()) if value
+        )
+        return Validator(last_modified, *row[1:], get_generation())
+    return cached('listing_validator', build, model.__name__, slug) or None
+
+
+class CategoryDetailView(ConditionalPageMixin, CursorPaginationMixin,
+                         ListView):
     """
     Posts by category view.
     """
@@ -362,19 +567,26 @@ class CategoryDetailView(ListView):
     context_object_name = 'posts'
     paginate_by = 10
 
+    def get_validator(self):
+        return _listing_validator(
+            Category, self.kwargs['slug'], 'name', 'description'
+        )
+
     def get_queryset(self):
         self.category = get_object_or_404(Category, slug=self.kwargs['slug'])
-        return Post.objects.filter(
-            category=self.category, status='published'
-        ).order_by('-published_at')
+        return Post.objects.published().filter(
+            category=self.category
+        ).for_list().order_by('-published_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
+        reader_state.attach(self.request.user, context['posts'])
         return context
 
 
-class TagDetailView(ListView):
+class TagDetailView(ConditionalPageMixin, CursorPaginationMixin,
+                    ListView):
     """
     Posts by tag view.
     """
@@ -383,15 +595,19 @@ class TagDetailView(ListView):
     context_object_name = 'posts'
     paginate_by = 10
 
+    def get_validator(self):
+        return _listing_validator(Tag, self.kwargs['slug'], 'name')
+
     def get_queryset(self):
         self.tag = get_object_or_404(Tag, slug=self.kwargs['slug'])
-        return Post.objects.filter(
-            tags=self.tag, status='published'
-        ).order_by('-published_at')
+        return Post.objects.published().filter(
+            tags=self.tag
+        ).for_list().order_by('-published_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['tag'] = self.tag
+        reader_state.attach(self.request.user, context['posts'])
         return context
 
 
@@ -430,51 +646,112 @@ def newsletter_subscribe(request):
     return redirect('blog:post_list')
 
 
+def newsletter_unsubscribe(request, token):
+    """
+    Deactivate the subscription signed into a newsletter's unsubscribe
+    link.
+
+    Opening the link only asks for confirmation; the form on that page
+    posts back here. Mail scanners and link previews fetch links in
+    messages, and must not unsubscribe anyone by doing so.
+    """
+    subscription_id = newsletter.subscription_from_token(token)
+    if subscription_id is None:
+        messages.error(request, 'This unsubscribe link is not valid.')
+        return redirect('blog:post_list')
+    if request.method != 'POST':
+        return render(request, 'blog/newsletter_unsubscribe.html')
+    NewsletterSubscription.objects.filter(pk=subscription_id).update(
+        is_active=False
+    )
+    messages.success(request, 'You have been unsubscribed.')
+    return redirect('blog:post_list')
+
+
 # Reaction Views
+REACTION_LABELS = dict(REACTION_CHOICES)
+
+
+def _wants_json(request):
+    return (request.headers.get('X-Requested-With') == 'XMLHttpRequest' or
+            'application/json' in request.headers.get('Accept', ''))
+
+
 @login_required
+@require_POST
 def add_reaction(request, slug):
     """
-    Add or update reaction to a post.
+    Toggle the current user's reaction to a post.
+
+    Clicking the current reaction again removes it; another type replaces
+    it. Scripts (``X-Requested-With: XMLHttpRequest`` or
+    ``Accept: application/json``) get the user's reaction and the post's
+    per-type counts as JSON so the buttons update in place; plain form
+    posts are redirected back to the post.
     """
-    post = get_object_or_404(Post, slug=slug, status='published')
+    post = get_object_or_404(
+        Post.objects.published().only('pk', 'slug'), slug=slug
+    )
     reaction_type = request.POST.get('reaction_type', 'like')
+    if reaction_type not in REACTION_LABELS:
+        if _wants_json(request):
+            return JsonResponse(
+                {'status': 'error', 'message': 'Unknown reaction.'},
+                status=400
+            )
+        messages.error(request, 'Unknown reaction.')
+        return redirect('blog:post_detail', slug=slug)
+
+    current = PostReaction.objects.toggle(post, request.user, reaction_type)
+
+    if _wants_json(request):
+        counts = Post.objects.filter(pk=post.pk).values(
+            *(reaction_field(choice) for choice in REACTION_LABELS)
+        ).get()
+        return JsonResponse({
+            'status': 'success',
+            'reaction': current,
+            'counts': {
+                choice: counts[reaction_field(choice)]
+                for choice in REACTION_LABELS
+            },
+        })
+    if current is None:
+        messages.success(request, 'Reaction removed!')
+    else:
+        messages.success(request, f'Reacted with {current}!')
+    return redirect('blog:post_detail', slug=slug)
 
-    try:
-        from .models import PostReaction
-        # Use get_or_create to avoid duplicate reactions
-        # This atomic operation either gets existing reaction or creates new
-        # defaults= only applies if creating new record, not when getting
-        # existing. Returns tuple: (object, boolean) where boolean indicates
-        # if created
-        reaction, created = PostReaction.objects.get_or_create(
-            post=post,
-            user=request.user,
-            defaults={'reaction_type': reaction_type}
-        )
 
-        if not created:
-            # Toggle reaction - remove if same type, update if different
-            if reaction.reaction_type == reaction_type:
-                # Remove reaction if clicking same type
-                reaction.delete()
-                messages.success(request, 'Reaction removed!')
-            else:
-                # Update reaction type
-                reaction.reaction_type = reaction_type
-                reaction.save()
-                messages.success(
-                    request, f'Reaction updated to {reaction_type}!')
-        else:
-            messages.success(request, f'Added {reaction_type} reaction!')
-    except Exception:
-        # Handle case where PostReaction table doesn't exist
-        messages.warning(
-            request, 'Reactions feature temporarily unavailable.')
+# Analytics Views
+# Days shown by the analytics dashboard when no range is given
+ANALYTICS_DEFAULT_DAYS = 30
 
-    return redirect('blog:post_detail', slug=slug)
+
+def _analytics_range(params):
+    """
+    Inclusive ``(start, end)`` dates from the ``start`` and ``end`` query
+    parameters (YYYY-MM-DD), defaulting to the last 30 days. Dates in the
+    future or more than ``rollups.MAX_RANGE_DAYS`` ago are ignored, which
+    also bounds the span of the range.
+    """
+    today = timezone.localdate()
+    earliest = today - timedelta(days=rollups.MAX_RANGE_DAYS - 1)
+
+    def parse(name):
+        try:
+            value = date.fromisoformat(params.get(name, ''))
+        except ValueError:
+            return None
+        return value if earliest <= value <= today else None
+
+    end = parse('end') or today
+    start = parse('start') or max(
+        earliest, end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    )
+    return (start, end) if start <= end else (end, start)
 
 
-# Analytics Views
 @login_required
 def analytics_dashboard(request):
     """
@@ -493,57 +770,74 @@ def analytics_dashboard(request):
             request, 'Profile setup required. Please contact admin.')
         return redirect('blog:post_list')
 
-    from django.db.models import Sum
-
-    # Get user's posts if author, all posts if admin
+    # Admins see the whole site, authors their own posts
     if request.user.userprofile.can_moderate():
-        posts = Post.objects.filter(status='published')
+        author = None
+        reactions = PostReaction.objects.all()
     else:
-        posts = Post.objects.filter(
-            author=request.user, status='published'
-        )
-
-    # Calculate analytics
-    total_posts = posts.count()
-    total_views = posts.aggregate(Sum('view_count'))['view_count__sum'] or 0
-
-    # Try to get reaction data, handle if table doesn't exist
-    try:
-        from .models import PostReaction
-        total_reactions = PostReaction.objects.filter(post__in=posts).count()
-        recent_reactions = PostReaction.objects.filter(
-            post__in=posts
-        ).select_related('user', 'post')[:10]
-    except Exception:
-        # Handle case where PostReaction table doesn't exist
-        # (e.g., local development without proper migrations)
-        total_reactions = 0
-        recent_reactions = []
-
-    # Popular posts
-    popular_posts = posts.order_by('-view_count')[:5]
+        author = request.user
+        reactions = PostReaction.objects.filter(post__author=author)
+
+    # Every aggregate is read from the daily rollups (see blog.rollups)
+    start, end = _analytics_range(request.GET)
+    totals = rollups.totals(start, end, author)
+    period, points = rollups.time_series(start, end, author)
+    reaction_totals = [
+        (label, totals[reaction_field(reaction_type)])
+        for reaction_type, label in REACTION_CHOICES
+    ]
 
     context = {
-        'total_posts': total_posts,
-        'total_views': total_views,
-        'total_reactions': total_reactions,
-        'popular_posts': popular_posts,
-        'recent_reactions': recent_reactions,
+        'start': start,
+        'end': end,
+        'totals': totals,
+        'total_reactions': sum(count for _, count in reaction_totals),
+        'reaction_totals': reaction_totals,
+        'reaction_choices': REACTION_CHOICES,
+        'popular_posts': rollups.top_posts(start, end, author),
+        'recent_reactions': reactions.select_related(
+            'user', 'post').only(
+            'reaction_type', 'created_at', 'user__username',
+            'post__title', 'post__slug')[:10],
+        'chart': {
+            'period': period,
+            'labels': [point['date'].isoformat() for point in points],
+            'series': {
+                field: [point[field] for point in points]
+                for field in rollups.AUTHOR_FIELDS
+            },
+        },
     }
 
     return render(request, 'blog/analytics_dashboard.html', context)
 
 
+@staff_member_required
+def instrumentation_stats(request):
+    """
+    Query counts and timing percentiles per URL name recorded by this
+    worker process (see blog/instrumentation.py). ``?reset=1`` starts
+    over after returning the current figures.
+    """
+    routes = instrumentation.stats.summary()
+    if request.GET.get('reset'):
+        instrumentation.stats.reset()
+    return JsonResponse({
+        'percentiles': list(instrumentation.PERCENTILES),
+        'routes': routes,
+    })
+
+
 # Advanced Search View
 def advanced_search(request):
     """
     Advanced search view with filters.
     """
-    from django.db import models as django_models
     from .forms import AdvancedSearchForm
 
     form = AdvancedSearchForm(request.GET or None)
-    posts = Post.objects.filter(status='published')
+    posts = Post.objects.published().for_list()
+    ordering = POST_ORDERING
 
     if form.is_valid():
         query = form.cleaned_data.get('query')
@@ -555,14 +849,10 @@ def advanced_search(request):
 
         # Apply search filters if provided
         if query:
-            # Use Q objects for complex OR logic across multiple fields
-            # icontains performs case-insensitive substring matching
-            # The | operator creates OR conditions between the Q objects
-            posts = posts.filter(
-                django_models.Q(title__icontains=query) |
-                django_models.Q(content__icontains=query) |
-                django_models.Q(excerpt__icontains=query)
-            )
+            # Same full-text search path as the post list, ranked by
+            # relevance
+            posts = search_posts(posts, query)
+            ordering = SEARCH_ORDERING
 
         if author:
             posts = posts.filter(author=author)
@@ -580,11 +870,10 @@ def advanced_search(request):
         if date_to:
             posts = posts.filter(created__lte=date_to)
 
-    # Pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(posts.distinct(), 6)
-    page = request.GET.get('page')
-    posts = paginator.get_page(page)
+    # Cursor pagination seeks on the sort key instead of OFFSET + COUNT
+    posts = CursorPaginator(posts.distinct(), 6, ordering).get_page(
+        request.GET
+    )
 
     context = {
         'form': form,
@@ -595,31 +884,72 @@ def advanced_search(request):
     return render(request, 'blog/advanced_search.html', context)
 
 
-# Reading Progress View
+# Reading Progress Views
+# Most progress updates a reader can send in one batch
+MAX_PROGRESS_BATCH = 50
+
+
+def _parse_progress(value):
+    """Clamp a reported percentage to 0-100; None if it is not a number."""
+    try:
+        return min(100, max(0, int(float(value))))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
 @login_required
 def update_reading_progress(request, slug):
     """
     Update reading progress for a post.
-    """
-    from django.http import JsonResponse
 
-    post = get_object_or_404(Post, slug=slug, status='published')
-    progress = request.POST.get('progress', 0)
-
-    from .models import ReadingProgress
-    # Use get_or_create to track reading progress per user per post
-    reading_progress, created = ReadingProgress.objects.get_or_create(
-        post=post,
-        user=request.user,
-        defaults={'progress_percentage': progress}
+    Single-update endpoint kept for older clients; like the batch endpoint
+    it only records the progress in the write-behind buffer.
+    """
+    post_id = get_object_or_404(
+        Post.objects.published().values_list('pk', flat=True), slug=slug
     )
+    progress = _parse_progress(request.POST.get('progress', 0))
+    if progress is not None:
+        reading_progress.record(request.user.pk, post_id, progress)
+    return JsonResponse({'status': 'success'})
 
-    # Update progress if record already exists
-    if not created:
-        reading_progress.progress_percentage = progress
-        reading_progress.save()
 
-    return JsonResponse({'status': 'success'})
+@require_POST
+def record_reading_progress(request):
+    """
+    Accept a batch of reading progress updates for the current reader.
+
+    Expects a JSON body ``{"updates": [{"post": <id>, "progress": <0-100>}]}``.
+    Updates are coalesced per reader and post in a write-behind buffer and
+    written in bulk (see blog/buffers.py), so the request itself runs no
+    queries; invalid entries are skipped.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Authentication required.'},
+            status=403
+        )
+    try:
+        updates = json.loads(request.body)['updates']
+    except (ValueError, KeyError, TypeError):
+        updates = None
+    if not isinstance(updates, list) or len(updates) > MAX_PROGRESS_BATCH:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Invalid progress batch.'},
+            status=400
+        )
+
+    accepted = 0
+    for update in updates:
+        if not isinstance(update, dict):
+            continue
+        post_id = update.get('post')
+        progress = _parse_progress(update.get('progress'))
+        if type(post_id) is not int or progress is None:
+            continue
+        reading_progress.record(request.user.pk, post_id, progress)
+        accepted += 1
+    return JsonResponse({'status': 'success', 'accepted': accepted})
 
 
 # Legal Pages Views
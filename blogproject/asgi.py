@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogproject.settings')
 
 application = get_asgi_application()
+
+# Write buffered views and reading progress while the worker is idle
+from blog.buffers import start_timer  # noqa: E402
+
+start_timer()
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogproject.settings')
 
 application = get_wsgi_application()
+
+# Write buffered views and reading progress while the worker is idle
+from blog.buffers import start_timer  # noqa: E402
+
+start_timer()
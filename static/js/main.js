@@ -7,6 +7,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeImageLazyLoading();
     initializeSearchFilters();
     initializeFormValidation();
+    initializeReactions();
     
     console.log('Blog JavaScript initialized');
 });
@@ -254,6 +255,134 @@ function debounce(func, wait) {
     };
 }
 
+// Reading Progress Queue
+// Scroll progress is collected per post, keeping the highest percentage,
+// and sent to the server in batches instead of one request per scroll
+// step. Pending progress is sent every flushInterval milliseconds and
+// when the page is hidden or unloaded.
+const readingProgressQueue = {
+    url: null,
+    pending: {},
+    timer: null,
+    flushInterval: 15000
+};
+
+function queueReadingProgress(url, postId, progress) {
+    const queue = readingProgressQueue;
+    queue.url = url;
+    queue.pending[postId] = Math.max(queue.pending[postId] || 0, progress);
+
+    if (!queue.timer) {
+        queue.timer = setTimeout(flushReadingProgress, queue.flushInterval);
+    }
+}
+
+function flushReadingProgress() {
+    const queue = readingProgressQueue;
+    clearTimeout(queue.timer);
+    queue.timer = null;
+
+    const updates = Object.keys(queue.pending).map(postId => ({
+        post: Number(postId),
+        progress: queue.pending[postId]
+    }));
+    if (!queue.url || updates.length === 0) {
+        return;
+    }
+    queue.pending = {};
+
+    // keepalive lets the request finish while the page is unloading
+    fetch(queue.url, {
+        method: 'POST',
+        keepalive: true,
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCsrfToken()
+        },
+        body: JSON.stringify({ updates: updates })
+    }).catch(() => {
+        // Put the updates back so the next flush retries them
+        updates.forEach(update => {
+            queue.pending[update.post] = Math.max(
+                queue.pending[update.post] || 0, update.progress
+            );
+        });
+    });
+}
+
+function getCsrfToken() {
+    const input = document.querySelector('[name=csrfmiddlewaretoken]');
+    if (input) {
+        return input.value;
+    }
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
+document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'hidden') {
+        flushReadingProgress();
+    }
+});
+window.addEventListener('pagehide', flushReadingProgress);
+
+// Reactions
+// Reaction forms are posted in the background; the server toggles the
+// reaction and answers with the new counts, which are written into the
+// buttons instead of reloading the whole post page.
+function initializeReactions() {
+    const container = document.querySelector('.reaction-buttons');
+    if (!container) {
+        return;
+    }
+
+    container.addEventListener('submit', function(e) {
+        const form = e.target;
+        e.preventDefault();
+        const button = form.querySelector('.reaction-btn');
+        button.disabled = true;
+
+        fetch(form.action, {
+            method: 'POST',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': getCsrfToken()
+            },
+            body: new FormData(form)
+        })
+        .then(response => {
+            // The server answered: posting the form again would toggle
+            // the reaction a second time, so only report the failure
+            if (!response.ok) {
+                console.error('Reaction failed:', response.statusText);
+                return;
+            }
+            return response.json()
+                .then(data => updateReactionButtons(container, data))
+                .catch(error => console.error('Reaction failed:', error));
+        }, () => {
+            // The request never reached the server: fall back to a
+            // regular form post
+            form.submit();
+        })
+        .finally(() => {
+            button.disabled = false;
+        });
+    });
+}
+
+function updateReactionButtons(container, data) {
+    container.querySelectorAll('.reaction-btn').forEach(button => {
+        const reaction = button.getAttribute('data-reaction');
+        const count = button.querySelector('.reaction-count');
+        if (count && reaction in data.counts) {
+            count.textContent = data.counts[reaction];
+        }
+        button.classList.toggle('active', reaction === data.reaction);
+        button.setAttribute('aria-pressed', reaction === data.reaction);
+    });
+}
+
 // Reading Time Calculator
 function calculateReadingTime(text) {
     const wordsPerMinute = 200;
@@ -372,5 +501,7 @@ window.BlogJS = {
     copyToClipboard,
     calculateReadingTime,
     printPage,
-    toggleDarkMode
+    toggleDarkMode,
+    queueReadingProgress,
+    flushReadingProgress
 };
\ No newline at end of file